@@ -1,8 +1,34 @@
 #!/usr/bin/env python
 
 from .port_handler import *
+from .packet_frame import *
+from .frame_decoder import *
+from .rtt_estimator import *
 from .protocol_packet_handler import *
 from .group_sync_write import *
 from .group_sync_read import *
+from .group_reg_write import *
+from .servo_state import *
 from .sts import *
 from .scscl import *
+from .command_mailbox import *
+from .register_cache import *
+from .histogram import *
+from .control_loop import *
+from .write_behind import *
+from .servo_cluster import *
+from .baud_rate import *
+from .bus_metrics import *
+from .bus_scan import *
+from .retry_policy import *
+from .virtual_bus import *
+from .bus_capture import *
+from .async_port_handler import *
+from .async_packet_handler import *
+
+try:
+    from .register_codec import *
+    from .state_ring import *
+    from .telemetry_history import *
+except ImportError:  # NumPy not installed, the batch codec, state ring and history are optional
+    pass
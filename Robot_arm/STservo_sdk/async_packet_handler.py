@@ -0,0 +1,480 @@
+#!/usr/bin/env python
+
+import asyncio
+import weakref
+
+from .stservo_def import *
+from .protocol_packet_handler import *
+from .group_sync_write import *
+from .sts import *
+from .scscl import *
+
+
+class async_protocol_packet_handler(protocol_packet_handler):
+    # protocol_packet_handler on an AsyncPortHandler. Packing, checksums,
+    # decoding and response timeouts are the synchronous ones; only the waits
+    # for the bus and for status bytes are awaited. Methods that just pass on
+    # the result of another call (write1ByteTxRx, sts.WritePosEx, ...) are
+    # inherited and return an awaitable.
+    def __init__(self, portHandler, protocol_end):
+        protocol_packet_handler.__init__(self, portHandler, protocol_end)
+        self.task_frames = weakref.WeakKeyDictionary()
+
+    def getTxFrame(self, instruction):
+        # every task packs into its own buffers, a task waiting for the bus
+        # must not see its packet overwritten by the next one
+        task = asyncio.current_task()
+        frames = self.task_frames.get(task)
+        if frames is None:
+            frames = {}
+            self.task_frames[task] = frames
+
+        frame = frames.get(instruction)
+        if frame is None:
+            frame = PacketFrame(instruction)
+            frames[instruction] = frame
+        return frame
+
+    async def txPacket(self, txpacket):
+        priority, _ = self.getBusPriority(txpacket)
+        await self.portHandler.acquireBusAsync(priority)
+
+        result = self.writePacket(txpacket)
+        if result != COMM_SUCCESS:
+            self.portHandler.releaseBus()
+
+        return result
+
+    async def rxPacket(self):
+        rxpacket, result = await self.receivePacket()
+
+        self.portHandler.releaseBus()
+        return rxpacket, result
+
+    async def receivePacket(self):
+        rxpacket = bytearray()
+        result = COMM_TX_FAIL
+        decoder = self.rx_decoder
+
+        while True:
+            if decoder.frames:
+                rxpacket, result = decoder.frames.popleft()
+                break
+
+            decoder.feed(await self.portHandler.readPortAsync(decoder.waitLength()))
+            if decoder.frames:
+                continue
+
+            # check timeout
+            if self.portHandler.isPacketTimeout():
+                if decoder.pending() == 0:
+                    result = COMM_RX_TIMEOUT
+                else:
+                    result = COMM_RX_CORRUPT
+                break
+
+        return rxpacket, result
+
+    async def txRxPacket(self, txpacket):
+        if self.retry_policy is not None and txpacket[PKT_ID] != BROADCAST_ID:
+            return await self.retry_policy.runAsync(self, lambda: self.txRxPacketOnce(txpacket),
+                                                    lambda outcome: outcome[1])
+        return await self.txRxPacketOnce(txpacket)
+
+    async def txRxPacketOnce(self, txpacket):
+        rxpacket = None
+        error = 0
+
+        # tx packet
+        result = await self.txPacket(txpacket)
+        if result != COMM_SUCCESS:
+            return rxpacket, result, error
+
+        # (ID == Broadcast ID) == no need to wait for status packet or not available
+        if (txpacket[PKT_ID] == BROADCAST_ID):
+            self.portHandler.releaseBus()
+            return rxpacket, result, error
+
+        # set packet timeout
+        if txpacket[PKT_INSTRUCTION] == INST_READ:
+            self.setResponseTimeout(txpacket[PKT_ID], INST_READ, txpacket[PKT_PARAMETER0 + 1] + 6)
+        else:
+            self.setResponseTimeout(txpacket[PKT_ID], txpacket[PKT_INSTRUCTION], 6)  # HEADER0 HEADER1 ID LENGTH ERROR CHECKSUM
+
+        # rx packet
+        status_length = self.getStatusLength(txpacket)
+        try:
+            while True:
+                rxpacket, result = await self.receivePacket()
+                if result != COMM_SUCCESS or self.isStatusPacket(rxpacket, txpacket[PKT_ID], status_length):
+                    break
+
+            self.updateResponseTime(result, rxpacket)
+        finally:
+            self.portHandler.releaseBus()
+
+        if result == COMM_SUCCESS:
+            error = rxpacket[PKT_ERROR]
+
+        return rxpacket, result, error
+
+    async def ping(self, sts_id):
+        model_number = 0
+        error = 0
+
+        if sts_id >= BROADCAST_ID:
+            return model_number, COMM_NOT_AVAILABLE, error
+
+        txpacket = self.getTxFrame(INST_PING).pack(sts_id)
+
+        rxpacket, result, error = await self.txRxPacket(txpacket)
+
+        if result == COMM_SUCCESS:
+            data_read, result, error = await self.readTxRx(sts_id, 3, 2)  # Address 3 : Model Number
+            if result == COMM_SUCCESS:
+                model_number = self.sts_makeword(data_read[0], data_read[1])
+
+        return model_number, result, error
+
+    async def action(self, sts_id):
+        txpacket = self.getTxFrame(INST_ACTION).pack(sts_id)
+
+        _, result, _ = await self.txRxPacket(txpacket)
+
+        return result
+
+    async def readTx(self, sts_id, address, length):
+        if sts_id >= BROADCAST_ID:
+            return COMM_NOT_AVAILABLE
+
+        txpacket = self.getTxFrame(INST_READ).packAddress(sts_id, address, (length,), 1)
+
+        result = await self.txPacket(txpacket)
+
+        # set packet timeout
+        if result == COMM_SUCCESS:
+            self.setResponseTimeout(sts_id, INST_READ, length + 6)
+
+        return result
+
+    async def readRx(self, sts_id, length):
+        result = COMM_TX_FAIL
+        error = 0
+
+        rxpacket = None
+        data = []
+
+        try:
+            while True:
+                rxpacket, result = await self.receivePacket()
+
+                if result != COMM_SUCCESS or self.isStatusPacket(rxpacket, sts_id, length + 2):
+                    break
+
+            self.updateResponseTime(result, rxpacket)
+        finally:
+            self.portHandler.releaseBus()
+
+        if result == COMM_SUCCESS:
+            error = rxpacket[PKT_ERROR]
+
+            data.extend(rxpacket[PKT_PARAMETER0 : PKT_PARAMETER0+length])
+
+        return self.checkReadLength(data, length, result, error)
+
+    async def readTxRx(self, sts_id, address, length):
+        data = []
+
+        if sts_id >= BROADCAST_ID:
+            return data, COMM_NOT_AVAILABLE, 0
+
+        cached = self.readCache(sts_id, address, length)
+        if cached is not None:
+            return cached, COMM_SUCCESS, 0
+
+        txpacket = self.getTxFrame(INST_READ).packAddress(sts_id, address, (length,), 1)
+
+        rxpacket, result, error = await self.txRxPacket(txpacket)
+        if result == COMM_SUCCESS:
+            error = rxpacket[PKT_ERROR]
+
+            data.extend(rxpacket[PKT_PARAMETER0 : PKT_PARAMETER0+length])
+        data, result, error = self.checkReadLength(data, length, result, error)
+
+        self.updateCache(sts_id, address, length, data, result, error)
+        return data, result, error
+
+    async def read1ByteRx(self, sts_id):
+        data, result, error = await self.readRx(sts_id, 1)
+        data_read = data[0] if (result == COMM_SUCCESS) else 0
+        return data_read, result, error
+
+    async def read1ByteTxRx(self, sts_id, address):
+        data, result, error = await self.readTxRx(sts_id, address, 1)
+        data_read = data[0] if (result == COMM_SUCCESS) else 0
+        return data_read, result, error
+
+    async def read2ByteRx(self, sts_id):
+        data, result, error = await self.readRx(sts_id, 2)
+        data_read = self.sts_makeword(data[0], data[1]) if (result == COMM_SUCCESS) else 0
+        return data_read, result, error
+
+    async def read2ByteTxRx(self, sts_id, address):
+        data, result, error = await self.readTxRx(sts_id, address, 2)
+        data_read = self.sts_makeword(data[0], data[1]) if (result == COMM_SUCCESS) else 0
+        return data_read, result, error
+
+    async def read4ByteRx(self, sts_id):
+        data, result, error = await self.readRx(sts_id, 4)
+        data_read = self.sts_makedword(self.sts_makeword(data[0], data[1]),
+                                  self.sts_makeword(data[2], data[3])) if (result == COMM_SUCCESS) else 0
+        return data_read, result, error
+
+    async def read4ByteTxRx(self, sts_id, address):
+        data, result, error = await self.readTxRx(sts_id, address, 4)
+        data_read = self.sts_makedword(self.sts_makeword(data[0], data[1]),
+                                  self.sts_makeword(data[2], data[3])) if (result == COMM_SUCCESS) else 0
+        return data_read, result, error
+
+    async def writeTxOnly(self, sts_id, address, length, data):
+        if self.isWriteCached(sts_id, address, length, data):
+            return COMM_SUCCESS
+
+        txpacket = self.getTxFrame(INST_WRITE).packAddress(sts_id, address, data, length)
+        if txpacket is None:
+            return COMM_TX_ERROR
+
+        result = await self.txPacket(txpacket)
+        if result == COMM_SUCCESS:
+            self.releaseTxOnly()
+
+        self.updateWriteCache(sts_id, address, length, data, result, 0)
+        return result
+
+    async def writeTxRx(self, sts_id, address, length, data):
+        if self.isWriteCached(sts_id, address, length, data):
+            return COMM_SUCCESS, 0
+
+        txpacket = self.getTxFrame(INST_WRITE).packAddress(sts_id, address, data, length)
+        if txpacket is None:
+            return COMM_TX_ERROR, 0
+
+        rxpacket, result, error = await self.txRxPacket(txpacket)
+
+        self.updateWriteCache(sts_id, address, length, data, result, error)
+        return result, error
+
+    async def regWriteTxOnly(self, sts_id, address, length, data):
+        txpacket = self.getTxFrame(INST_REG_WRITE).packAddress(sts_id, address, data, length)
+        if txpacket is None:
+            return COMM_TX_ERROR
+
+        self.invalidateCache(sts_id, address, length)  # applied only at ACTION
+
+        result = await self.txPacket(txpacket)
+        if result == COMM_SUCCESS:
+            self.releaseTxOnly()
+
+        return result
+
+    async def regWriteTxRx(self, sts_id, address, length, data):
+        txpacket = self.getTxFrame(INST_REG_WRITE).packAddress(sts_id, address, data, length)
+        if txpacket is None:
+            return COMM_TX_ERROR, 0
+
+        self.invalidateCache(sts_id, address, length)  # applied only at ACTION
+
+        _, result, error = await self.txRxPacket(txpacket)
+
+        return result, error
+
+    async def syncReadTx(self, start_address, data_length, param, param_length):
+        txpacket = self.getTxFrame(INST_SYNC_READ).packSync(start_address, data_length, param, param_length)
+        if txpacket is None:
+            return COMM_TX_ERROR
+
+        return await self.txPacket(txpacket)
+
+    async def syncReadRx(self, data_length, param_length):
+        wait_length = (6 + data_length) * param_length
+        self.setResponseTimeout(BROADCAST_ID, INST_SYNC_READ, wait_length)
+
+        rxpacket = bytearray()
+        rx_count = 0
+        corrupt = False
+        try:
+            while rx_count < param_length:
+                frame = self.rx_decoder.pop()
+                if frame is not None:
+                    packet, result = frame
+                    # keep only complete status packets of the expected size
+                    if result == COMM_SUCCESS and packet[PKT_LENGTH] == data_length + 2:
+                        rxpacket.extend(packet)
+                        rx_count += 1
+                    else:
+                        corrupt = True
+                    continue
+
+                self.rx_decoder.feed(await self.portHandler.readPortAsync(
+                    max(wait_length - len(rxpacket) - self.rx_decoder.pending(), 1)))
+                if self.rx_decoder.hasFrame():
+                    continue
+
+                # check timeout
+                if self.portHandler.isPacketTimeout():
+                    break
+
+            if rx_count == param_length:
+                result = COMM_SUCCESS
+            elif rx_count == 0 and not corrupt and self.rx_decoder.pending() == 0:
+                result = COMM_RX_TIMEOUT
+            else:
+                result = COMM_RX_CORRUPT
+
+            self.updateResponseTime(result, rxpacket)
+        finally:
+            self.portHandler.releaseBus()
+
+        return result, rxpacket
+
+    async def syncWriteTxOnly(self, start_address, data_length, param, param_length):
+        txpacket = self.getTxFrame(INST_SYNC_WRITE).packSync(start_address, data_length, param, param_length)
+        if txpacket is None:
+            return COMM_TX_ERROR
+
+        _, result, _ = await self.txRxPacket(txpacket)
+
+        self.updateSyncWriteCache(start_address, data_length, param, param_length, result)
+        return result
+
+    async def syncRead(self, groupSyncRead):
+        # GroupSyncRead.txRxPacket for this handler
+        if self.retry_policy is not None:
+            return await self.retry_policy.runAsync(self, lambda: self.syncReadOnce(groupSyncRead),
+                                                    lambda result: result)
+        return await self.syncReadOnce(groupSyncRead)
+
+    async def syncReadOnce(self, groupSyncRead):
+        if len(groupSyncRead.data_dict.keys()) == 0:
+            return COMM_NOT_AVAILABLE
+
+        if groupSyncRead.is_param_changed is True or not groupSyncRead.param:
+            groupSyncRead.makeParam()
+
+        param_length = len(groupSyncRead.data_dict.keys())
+        result = await self.syncReadTx(groupSyncRead.start_address, groupSyncRead.data_length,
+                                       groupSyncRead.param, param_length)
+        if result != COMM_SUCCESS:
+            return result
+
+        result, rxpacket = await self.syncReadRx(groupSyncRead.data_length, param_length)
+        return groupSyncRead.storeRxPacket(result, rxpacket)
+
+    async def syncWrite(self, groupSyncWrite=None):
+        # GroupSyncWrite.txPacket for this handler, the handler's own group
+        # (sts.SyncWritePosEx, scscl.SyncWritePos) by default
+        if groupSyncWrite is None:
+            groupSyncWrite = self.groupSyncWrite
+
+        if len(groupSyncWrite.data_dict.keys()) == 0:
+            return COMM_NOT_AVAILABLE
+
+        return await groupSyncWrite.txPacket()
+
+
+class async_sts(async_protocol_packet_handler, sts):
+    def __init__(self, portHandler):
+        async_protocol_packet_handler.__init__(self, portHandler, 0)
+        self.groupSyncWrite = GroupSyncWrite(self, STS_ACC, 7)
+
+    def StageWritePosEx(self, sts_id, position, speed, acc):
+        # GroupRegWrite paces its packets with blocking waits
+        raise NotImplementedError("GroupRegWrite staging is not supported on async_sts, "
+                                  "use RegWritePosEx and RegAction")
+
+    async def ReadPos(self, sts_id):
+        sts_present_position, sts_comm_result, sts_error = await self.read2ByteTxRx(sts_id, STS_PRESENT_POSITION_L)
+        return self.sts_tohost(sts_present_position, 15), sts_comm_result, sts_error
+
+    async def ReadSpeed(self, sts_id):
+        sts_present_speed, sts_comm_result, sts_error = await self.read2ByteTxRx(sts_id, STS_PRESENT_SPEED_L)
+        return self.sts_tohost(sts_present_speed, 15), sts_comm_result, sts_error
+
+    async def ReadPosSpeed(self, sts_id):
+        sts_present_position_speed, sts_comm_result, sts_error = await self.read4ByteTxRx(sts_id, STS_PRESENT_POSITION_L)
+        sts_present_position = self.sts_loword(sts_present_position_speed)
+        sts_present_speed = self.sts_hiword(sts_present_position_speed)
+        return self.sts_tohost(sts_present_position, 15), self.sts_tohost(sts_present_speed, 15), sts_comm_result, sts_error
+
+    async def ReadMoving(self, sts_id):
+        moving, sts_comm_result, sts_error = await self.read1ByteTxRx(sts_id, STS_MOVING)
+        return moving, sts_comm_result, sts_error
+
+    async def SyncReadRegisters(self, sts_ids, start_address, data_length):
+        groupSyncRead = self.getSyncReadGroup(sts_ids, start_address, data_length)
+        sts_comm_result = await self.syncRead(groupSyncRead)
+        return self.getSyncReadData(groupSyncRead), sts_comm_result
+
+    async def SyncReadPosSpeed(self, sts_ids):
+        sts_data, sts_comm_result = await self.SyncReadRegisters(sts_ids, STS_PRESENT_POSITION_L, 4)
+        return self.unpackPosSpeed(sts_data), sts_comm_result
+
+    async def ReadState(self, sts_id):
+        data, sts_comm_result, sts_error = await self.readTxRx(sts_id, STATE_START_ADDRESS, STATE_LENGTH)
+        if sts_comm_result != COMM_SUCCESS:
+            return None, sts_comm_result, sts_error
+        return self.unpackState(sts_id, data, sts_error), sts_comm_result, sts_error
+
+    async def SyncReadState(self, sts_ids):
+        sts_data, sts_comm_result = await self.SyncReadRegisters(sts_ids, STATE_START_ADDRESS, STATE_LENGTH)
+        return dict((sts_id, self.unpackState(sts_id, data, sts_error))
+                    for sts_id, (data, sts_error) in sts_data.items()), sts_comm_result
+
+
+class async_scscl(async_protocol_packet_handler, scscl):
+    def __init__(self, portHandler):
+        async_protocol_packet_handler.__init__(self, portHandler, 1)
+        self.groupSyncWrite = GroupSyncWrite(self, SCSCL_GOAL_POSITION_L, 6)
+
+    def StageWritePos(self, scs_id, position, time, speed):
+        # GroupRegWrite paces its packets with blocking waits
+        raise NotImplementedError("GroupRegWrite staging is not supported on async_scscl, "
+                                  "use RegWritePos and RegAction")
+
+    async def ReadPos(self, scs_id):
+        scs_present_position, scs_comm_result, scs_error = await self.read2ByteTxRx(scs_id, SCSCL_PRESENT_POSITION_L)
+        return scs_present_position, scs_comm_result, scs_error
+
+    async def ReadSpeed(self, scs_id):
+        scs_present_speed, scs_comm_result, scs_error = await self.read2ByteTxRx(scs_id, SCSCL_PRESENT_SPEED_L)
+        return self.sts_tohost(scs_present_speed, 15), scs_comm_result, scs_error
+
+    async def ReadPosSpeed(self, scs_id):
+        scs_present_position_speed, scs_comm_result, scs_error = await self.read4ByteTxRx(scs_id, SCSCL_PRESENT_POSITION_L)
+        scs_present_position = self.sts_loword(scs_present_position_speed)
+        scs_present_speed = self.sts_hiword(scs_present_position_speed)
+        return scs_present_position, self.sts_tohost(scs_present_speed, 15), scs_comm_result, scs_error
+
+    async def ReadMoving(self, scs_id):
+        moving, scs_comm_result, scs_error = await self.read1ByteTxRx(scs_id, SCSCL_MOVING)
+        return moving, scs_comm_result, scs_error
+
+    async def SyncReadRegisters(self, scs_ids, start_address, data_length):
+        groupSyncRead = self.getSyncReadGroup(scs_ids, start_address, data_length)
+        scs_comm_result = await self.syncRead(groupSyncRead)
+        return self.getSyncReadData(groupSyncRead), scs_comm_result
+
+    async def SyncReadPosSpeed(self, scs_ids):
+        scs_data, scs_comm_result = await self.SyncReadRegisters(scs_ids, SCSCL_PRESENT_POSITION_L, 4)
+        return self.unpackPosSpeed(scs_data), scs_comm_result
+
+    async def ReadState(self, scs_id):
+        data, scs_comm_result, scs_error = await self.readTxRx(scs_id, STATE_START_ADDRESS, STATE_LENGTH)
+        if scs_comm_result != COMM_SUCCESS:
+            return None, scs_comm_result, scs_error
+        return self.unpackState(scs_id, data, scs_error), scs_comm_result, scs_error
+
+    async def SyncReadState(self, scs_ids):
+        scs_data, scs_comm_result = await self.SyncReadRegisters(scs_ids, STATE_START_ADDRESS, STATE_LENGTH)
+        return dict((scs_id, self.unpackState(scs_id, data, scs_error))
+                    for scs_id, (data, scs_error) in scs_data.items()), scs_comm_result
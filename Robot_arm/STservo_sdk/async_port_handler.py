@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+
+import asyncio
+import heapq
+
+from .port_handler import *
+
+RX_CHUNK_SIZE = 1024  # bytes taken from the driver per readable event
+
+
+class AsyncPortHandler(PortHandler):
+    # PortHandler for asyncio. The serial descriptor is registered with the
+    # event loop: the reader callback moves whatever arrived into rx_buffer
+    # and wakes the coroutine waiting for it, so nothing polls while a servo
+    # is answering. Coroutines on the loop take turns on the bus by priority
+    # (FIFO within a priority), like threads do with BusScheduler.
+    def __init__(self, port_name):
+        PortHandler.__init__(self, port_name)
+        self.loop = None
+        self.reading = False
+        self.rx_buffer = bytearray()
+        self.rx_waiter = None
+
+        self.bus_busy = False
+        self.bus_waiters = []
+        self.bus_sequence = 0
+
+    @property
+    def is_using(self):
+        return self.bus_busy
+
+    def acquireBus(self, priority=PRIORITY_TELEMETRY, key=None):
+        # only a free bus can be taken without awaiting
+        if self.bus_busy or self.bus_waiters:
+            return False
+
+        self.bus_busy = True
+        return True
+
+    async def acquireBusAsync(self, priority=PRIORITY_TELEMETRY):
+        if not self.bus_busy and not self.bus_waiters:
+            self.bus_busy = True
+            return True
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.bus_waiters, (priority, self.bus_sequence, waiter))
+        self.bus_sequence += 1
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # the bus was handed over just before the cancellation
+                self.releaseBus()
+            raise
+
+        return True
+
+    def releaseBus(self):
+        while self.bus_waiters:
+            _, _, waiter = heapq.heappop(self.bus_waiters)
+            if not waiter.done():
+                # hand the bus over, it stays busy
+                waiter.set_result(True)
+                return
+
+        self.bus_busy = False
+
+    def closePort(self):
+        self.detach()
+        PortHandler.closePort(self)
+
+    def attach(self):
+        # watch the descriptor from the running loop
+        loop = asyncio.get_running_loop()
+        if self.loop is loop:
+            return
+
+        self.detach()
+        self.loop = loop
+        if self.fd is None:
+            return
+
+        try:
+            loop.add_reader(self.fd, self.onReadable)
+            self.reading = True
+        except NotImplementedError:
+            # loop without reader support (Windows proactor): poll
+            self.reading = False
+
+    def detach(self):
+        if self.reading:
+            self.loop.remove_reader(self.fd)
+            self.reading = False
+        self.loop = None
+        self.wakeWaiter(self.rx_waiter)
+
+    def onReadable(self):
+        try:
+            self.rx_buffer += self.ser.read(RX_CHUNK_SIZE)
+        except serial.SerialException:
+            # readable without data: the device is gone
+            self.detach()
+            return
+
+        self.wakeWaiter(self.rx_waiter)
+
+    @staticmethod
+    def wakeWaiter(waiter):
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def getBytesAvailable(self):
+        return len(self.rx_buffer) + self.ser.in_waiting
+
+    def readPort(self, length):
+        data = bytes(self.rx_buffer[0:length])
+        del self.rx_buffer[0:length]
+        if len(data) < length:
+            data += self.ser.read(length - len(data))
+        if self.capture is not None and data:
+            self.capture.addRx(data)
+        return data
+
+    async def readPortAsync(self, length):
+        # up to length bytes, waits for the first one until the packet deadline
+        self.attach()
+        while not self.rx_buffer:
+            remaining = self.packet_timeout - self.getTimeSinceStart()
+            if remaining <= 0:
+                break
+            await self.waitReadableAsync(remaining)
+
+        data = bytes(self.rx_buffer[0:length])
+        del self.rx_buffer[0:length]
+        if self.capture is not None and data:
+            self.capture.addRx(data)
+        return data
+
+    async def waitReadableAsync(self, remaining):
+        if not self.reading:
+            await asyncio.sleep(min(remaining, max(self.tx_time_per_byte, 0.1)) / 1000.0)
+            self.rx_buffer += self.ser.read(RX_CHUNK_SIZE)
+            return
+
+        waiter = self.loop.create_future()
+        timer = self.loop.call_later(remaining / 1000.0, self.wakeWaiter, waiter)
+        self.rx_waiter = waiter
+        try:
+            await waiter
+        finally:
+            timer.cancel()
+            self.rx_waiter = None
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+
+import time
+
+from .stservo_def import *
+from .sts import *
+
+# STS_BAUD_RATE codes, the same for SCSCL
+BAUD_RATES = {
+    STS_1M: 1000000,
+    STS_0_5M: 500000,
+    STS_250K: 250000,
+    STS_128K: 128000,
+    STS_115200: 115200,
+    STS_76800: 76800,
+    STS_57600: 57600,
+    STS_38400: 38400,
+}
+
+FIND_ATTEMPTS = 3  # pings before a servo counts as missing
+SELECT_TRANSACTIONS = 50  # sync reads per candidate in autoSelect
+SELECT_MAX_ERROR_RATE = 0.0
+
+
+def getServoBaudRate(baud_code):
+    # 0 for an unknown code
+    return BAUD_RATES.get(baud_code, 0)
+
+
+def getBaudCode(baudrate):
+    # None for a rate the servos cannot be set to
+    for baud_code, rate in BAUD_RATES.items():
+        if rate == baudrate:
+            return baud_code
+    return None
+
+
+class BaudRateManager(object):
+    # Moves a whole bus to another baud rate. migrate() checks that the host
+    # can follow, writes STS_BAUD_RATE to every servo with the EEPROM
+    # unlocked, switches the host, then checks every servo at the new rate
+    # and locks its EEPROM again. autoSelect()
+    # tries the candidate rates from the fastest down, measures the error
+    # rate of a short burst of sync reads at each and stays on the first
+    # one within max_error_rate.
+    def __init__(self, packetHandler):
+        self.ph = packetHandler
+
+    def writeBaudCode(self, sts_ids, baud_code):
+        # IDs whose write was acknowledged
+        # a lost acknowledgement does not mean a lost write, findServos() at
+        # the new rate has the final word
+        written = []
+        for sts_id in sts_ids:
+            for _ in range(FIND_ATTEMPTS):
+                self.ph.unLockEprom(sts_id)
+                result, error = self.ph.write1ByteTxRx(sts_id, STS_BAUD_RATE, baud_code)
+                if result == COMM_SUCCESS:
+                    written.append(sts_id)
+                    break
+        return written
+
+    def findServos(self, sts_ids):
+        # IDs that answer at the current host rate
+        found = []
+        for sts_id in sts_ids:
+            for _ in range(FIND_ATTEMPTS):
+                _, result, _ = self.ph.ping(sts_id)
+                if result == COMM_SUCCESS:
+                    found.append(sts_id)
+                    break
+        return found
+
+    def migrate(self, sts_ids, baudrate):
+        # (migrated IDs, IDs left behind); the host ends at baudrate if at
+        # least one servo made it, otherwise back at the old rate
+        portHandler = self.ph.portHandler
+        baud_code = getBaudCode(baudrate)
+        previous = portHandler.getBaudRate()
+        if baud_code is None or not portHandler.isBaudRateSupported(baudrate):
+            return [], list(sts_ids)
+        if baudrate == previous:
+            return self.findServos(sts_ids), []
+
+        for sts_id in sts_ids:
+            # whatever the outcome, nothing cached of them is known to hold
+            self.ph.invalidateCache(sts_id)
+        self.writeBaudCode(sts_ids, baud_code)
+        if not portHandler.setBaudRate(baudrate):
+            self.restore(sts_ids, baudrate, previous)
+            return [], list(sts_ids)
+        time.sleep(0.01)  # servos apply the new rate after their reply
+
+        migrated = self.findServos(sts_ids)
+        for sts_id in migrated:
+            self.ph.LockEprom(sts_id)
+        left_behind = [sts_id for sts_id in sts_ids if sts_id not in migrated]
+        if not migrated:
+            portHandler.setBaudRate(previous)
+        return migrated, left_behind
+
+    def restore(self, sts_ids, baudrate, previous):
+        # the host failed to follow the servos to baudrate; they listen there
+        # already, so the write back to previous has to go out at baudrate
+        portHandler = self.ph.portHandler
+        for _ in range(FIND_ATTEMPTS):
+            if portHandler.setBaudRate(baudrate):
+                self.writeBaudCode(sts_ids, getBaudCode(previous))
+                time.sleep(0.01)  # servos apply the new rate after their reply
+                break
+        portHandler.setBaudRate(previous)
+
+    def measureErrorRate(self, sts_ids, transactions=SELECT_TRANSACTIONS):
+        # (share of failed sync reads, sync reads per second)
+        failures = 0
+        start = time.perf_counter()
+        for _ in range(transactions):
+            _, result = self.ph.SyncReadRegisters(sts_ids, STS_PRESENT_POSITION_L, 4)
+            failures += result != COMM_SUCCESS
+        elapsed = time.perf_counter() - start
+        return failures / float(transactions), transactions / elapsed
+
+    def autoSelect(self, sts_ids, candidates=None, transactions=SELECT_TRANSACTIONS,
+                   max_error_rate=SELECT_MAX_ERROR_RATE):
+        # (selected baud rate, {baud rate: (error rate, sync reads per second)})
+        portHandler = self.ph.portHandler
+        candidates = sorted(candidates or BAUD_RATES.values(), reverse=True)
+        sts_ids = list(sts_ids)
+        results = {}
+        for baudrate in candidates:
+            previous = portHandler.getBaudRate()
+            migrated, left_behind = self.migrate(sts_ids, baudrate)
+            if left_behind:
+                # a servo did not follow, bring the others back to it
+                if migrated:
+                    self.migrate(migrated, previous)
+                results[baudrate] = (1.0, 0.0)
+                continue
+
+            error_rate, rate = self.measureErrorRate(sts_ids, transactions)
+            results[baudrate] = (error_rate, rate)
+            if error_rate <= max_error_rate:
+                return baudrate, results
+        return portHandler.getBaudRate(), results
@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+
+import mmap
+import os
+import struct
+import threading
+import time
+
+from .stservo_def import *
+from .port_handler import *
+from .virtual_bus import *
+
+# File: CAPTURE_MAGIC, then records of RECORD_HEADER (monotonic ns, kind,
+# payload length) followed by the payload, little endian, append only
+CAPTURE_MAGIC = b"STCAPT\x01\x00"
+RECORD_HEADER = struct.Struct("<QBxH")
+
+CAPTURE_TX = 0  # bytes written to the port
+CAPTURE_RX = 1  # bytes read from the port
+CAPTURE_BAUD = 2  # "<I" baud rate the port was set to
+CAPTURE_SESSION = 3  # "<Q" wall clock ns when a capture was opened, monotonic time restarts after it
+
+
+class BusCapture(object):
+    # Appends every chunk a PortHandler writes or reads to a capture file,
+    # attached with portHandler.setCapture(). Records are written through a
+    # buffer; flush() or close() to have them on disk, or flush_every=1 to
+    # flush every record.
+    def __init__(self, path, flush_every=64):
+        self.path = path
+        self.flush_every = flush_every
+        self.lock = threading.Lock()
+        self.records = 0
+        self.file = open(path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(CAPTURE_MAGIC)
+        self.addRecord(CAPTURE_SESSION, struct.pack("<Q", time.time_ns()))
+
+    def addRecord(self, kind, payload):
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.write(RECORD_HEADER.pack(time.monotonic_ns(), kind, len(payload)))
+            self.file.write(payload)
+            self.records += 1
+            if self.flush_every and self.records % self.flush_every == 0:
+                self.file.flush()
+
+    def addTx(self, data):
+        self.addRecord(CAPTURE_TX, bytes(data))
+
+    def addRx(self, data):
+        self.addRecord(CAPTURE_RX, bytes(data))
+
+    def addBaudRate(self, baudrate):
+        self.addRecord(CAPTURE_BAUD, struct.pack("<I", baudrate))
+
+    def flush(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.flush()
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+class CaptureReader(object):
+    # Memory mapped view of a capture file, iterates (ns, kind, payload);
+    # payload is a memoryview into the map, copy it to keep it after close().
+    # A record cut short at the end, a capture still being written, is left out.
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        if self.map[0:len(CAPTURE_MAGIC)] != CAPTURE_MAGIC:
+            self.close()
+            raise ValueError("%s is not a bus capture" % path)
+        self.view = memoryview(self.map)
+
+    def __iter__(self):
+        offset = len(CAPTURE_MAGIC)
+        end = len(self.map)
+        while offset + RECORD_HEADER.size <= end:
+            timestamp, kind, length = RECORD_HEADER.unpack_from(self.map, offset)
+            offset += RECORD_HEADER.size
+            if offset + length > end:
+                break
+            yield timestamp, kind, self.view[offset: offset + length]
+            offset += length
+
+    def getStats(self):
+        stats = {"records": 0, "tx_bytes": 0, "rx_bytes": 0, "sessions": 0, "duration_s": 0.0}
+        first = last = None
+        for timestamp, kind, payload in self:
+            stats["records"] += 1
+            if kind == CAPTURE_TX:
+                stats["tx_bytes"] += len(payload)
+            elif kind == CAPTURE_RX:
+                stats["rx_bytes"] += len(payload)
+            elif kind == CAPTURE_SESSION:
+                if first is not None:
+                    stats["duration_s"] += (last - first) / 1e9
+                first = None
+                stats["sessions"] += 1
+                continue
+            first = timestamp if first is None else first
+            last = timestamp
+        if first is not None:
+            stats["duration_s"] += (last - first) / 1e9
+        return stats
+
+    def close(self):
+        if hasattr(self, "view"):
+            self.view.release()
+        if isinstance(self.map, mmap.mmap):
+            self.map.close()
+        self.file.close()
+
+
+class ReplayPortHandler(VirtualPortHandler):
+    # Plays a capture back to a packet handler. Each packet the handler
+    # writes takes the next TX record of the capture; the RX chunks recorded
+    # after it, up to the next TX record, become readable at their recorded
+    # offset from it divided by speed (speed None: at once). The handler's
+    # own timeouts run on the real clock, so a reply the capture never got
+    # still costs its timeout.
+    #
+    # tx_mismatches: written packets that differ from their TX record,
+    #                the replayed code is not the code that was captured
+    def __init__(self, path, speed=1.0, blocking=True):
+        VirtualPortHandler.__init__(self, None, blocking)
+        self.port_name = path
+        self.speed = speed
+        self.reader = CaptureReader(path)
+        self.records = iter(self.reader)
+        self.pending = None  # record read ahead of the next TX
+        self.finished = False
+        self.stats = {"tx_packets": 0, "tx_mismatches": 0, "rx_bytes": 0}
+
+    def openPort(self):
+        return self.setBaudRate(self.baudrate)
+
+    def closePort(self):
+        VirtualPortHandler.closePort(self)
+        self.records = iter(())
+        self.pending = None
+        self.reader.close()
+
+    def nextRecord(self):
+        if self.pending is not None:
+            record, self.pending = self.pending, None
+            return record
+        for timestamp, kind, payload in self.records:
+            return timestamp, kind, bytes(payload)
+        self.finished = True
+        return None
+
+    def isFinished(self):
+        return self.finished
+
+    def writePort(self, packet):
+        # skips to the next TX record, taking baud rate changes on the way
+        while True:
+            record = self.nextRecord()
+            if record is None:
+                return len(packet)
+            timestamp, kind, payload = record
+            if kind == CAPTURE_TX:
+                break
+            if kind == CAPTURE_BAUD:
+                rate = struct.unpack("<I", payload)[0]
+                self.baudrate = rate
+                self.tx_time_per_byte = (1000.0 / rate) * 10.0
+
+        self.stats["tx_packets"] += 1
+        if payload != bytes(packet):
+            self.stats["tx_mismatches"] += 1
+
+        now = self.getCurrentTime()
+        tx_time = timestamp
+        while True:
+            record = self.nextRecord()
+            if record is None:
+                break
+            if record[1] != CAPTURE_RX:
+                self.pending = record
+                break
+            offset = (record[0] - tx_time) / 1e6
+            arrival = now + (offset / self.speed if self.speed else 0.0)
+            self.rx_queue.extend((arrival, value) for value in record[2])
+            self.stats["rx_bytes"] += len(record[2])
+        return len(packet)
+
+
+def readCapture(path):
+    # [(ns, kind, bytes), ...] of a whole capture
+    reader = CaptureReader(path)
+    try:
+        return [(timestamp, kind, bytes(payload)) for timestamp, kind, payload in reader]
+    finally:
+        reader.close()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+
+import threading
+import time
+
+from .stservo_def import *
+from .packet_frame import *
+from .protocol_packet_handler import *
+from .histogram import *
+
+INSTRUCTION_NAMES = {
+    INST_PING: "ping",
+    INST_READ: "read",
+    INST_WRITE: "write",
+    INST_REG_WRITE: "reg_write",
+    INST_ACTION: "action",
+    INST_SYNC_WRITE: "sync_write",
+    INST_SYNC_READ: "sync_read",
+}
+
+RESULT_NAMES = {
+    COMM_SUCCESS: "success",
+    COMM_PORT_BUSY: "port_busy",
+    COMM_TX_FAIL: "tx_fail",
+    COMM_RX_FAIL: "rx_fail",
+    COMM_TX_ERROR: "tx_error",
+    COMM_RX_WAITING: "rx_waiting",
+    COMM_RX_TIMEOUT: "rx_timeout",
+    COMM_RX_CORRUPT: "rx_corrupt",
+    COMM_NOT_AVAILABLE: "not_available",
+}
+
+ERROR_NAMES = {
+    ERRBIT_VOLTAGE: "voltage",
+    ERRBIT_ANGLE: "angle",
+    ERRBIT_OVERHEAT: "overheat",
+    ERRBIT_OVERELE: "overele",
+    ERRBIT_OVERLOAD: "overload",
+}
+
+
+class BusMetrics(object):
+    # Per transaction instrumentation, attached to a packet handler with
+    # setBusMetrics(). The handler reports every instruction packet it writes,
+    # the end of every wait for status packets and the end of every TxOnly
+    # write, which is counted when it is sent; without an attached
+    # BusMetrics both hooks are a single None check.
+    #
+    # latency: ms from the start of the instruction packet to the end of the
+    #          reply wait, per instruction and per servo ID
+    # results: COMM_* results per instruction and per servo ID
+    # errors: ERRBIT_* flags seen in status packets, per servo ID
+    # utilization: wire time of the bytes sent and received over wall time
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.request = None
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.start_time = time.monotonic()
+            self.instruction_latency = {}
+            self.servo_latency = {}
+            self.instruction_results = {}
+            self.servo_results = {}
+            self.servo_errors = {}
+            self.tx_packets = 0
+            self.tx_bytes = 0
+            self.rx_packets = 0
+            self.rx_bytes = 0
+            self.wire_time = 0.0
+            self.byte_time = 0.0
+
+    def addTxPacket(self, sts_id, instruction, length, byte_time, result=COMM_SUCCESS):
+        now = time.monotonic()
+        with self.lock:
+            self.byte_time = byte_time
+            self.tx_packets += 1
+            self.tx_bytes += length
+            self.wire_time += length * byte_time
+            if result != COMM_SUCCESS or sts_id == BROADCAST_ID and instruction != INST_SYNC_READ:
+                # no reply to wait for, the packet is the whole transaction
+                self.request = None
+                self.countResult(sts_id, instruction, result)
+            else:
+                self.request = (sts_id, instruction, now)
+
+    def addTxOnly(self):
+        # the last packet was sent without waiting for a status packet
+        with self.lock:
+            if self.request is None:
+                return
+            sts_id, instruction, _ = self.request
+            self.request = None
+            self.countResult(sts_id, instruction, COMM_SUCCESS)
+
+    def addResponse(self, result, rxpacket=None):
+        now = time.monotonic()
+        with self.lock:
+            if self.request is None:
+                return
+            sts_id, instruction, start = self.request
+            self.request = None
+
+            latency = (now - start) * 1000.0
+            self.getHistogram(self.instruction_latency, instruction).addSample(latency)
+            if sts_id != BROADCAST_ID:
+                self.getHistogram(self.servo_latency, sts_id).addSample(latency)
+            self.countResult(sts_id, instruction, result)
+
+            if rxpacket:
+                self.rx_bytes += len(rxpacket)
+                self.wire_time += len(rxpacket) * self.byte_time
+                self.countStatusPackets(rxpacket)
+
+    def countStatusPackets(self, rxpacket):
+        # walks back to back status packets, one for a read, many for a sync read
+        index = 0
+        while index + PKT_ERROR < len(rxpacket):
+            self.rx_packets += 1
+            error = rxpacket[index + PKT_ERROR]
+            if error:
+                errors = self.servo_errors.setdefault(rxpacket[index + PKT_ID], {})
+                for bit in ERROR_NAMES:
+                    if error & bit:
+                        errors[bit] = errors.get(bit, 0) + 1
+            index += rxpacket[index + PKT_LENGTH] + 4
+
+    def countResult(self, sts_id, instruction, result):
+        results = self.instruction_results.setdefault(instruction, {})
+        results[result] = results.get(result, 0) + 1
+        if sts_id != BROADCAST_ID:
+            results = self.servo_results.setdefault(sts_id, {})
+            results[result] = results.get(result, 0) + 1
+
+    def getHistogram(self, histograms, key):
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = Histogram()
+            histograms[key] = histogram
+        return histogram
+
+    def getUtilization(self):
+        elapsed = time.monotonic() - self.start_time
+        return self.wire_time / 1000.0 / elapsed if elapsed > 0 else 0.0
+
+    def getSnapshot(self):
+        with self.lock:
+            return {
+                "elapsed_s": time.monotonic() - self.start_time,
+                "tx_packets": self.tx_packets,
+                "tx_bytes": self.tx_bytes,
+                "rx_packets": self.rx_packets,
+                "rx_bytes": self.rx_bytes,
+                "utilization": self.getUtilization(),
+                "latency_ms": dict((INSTRUCTION_NAMES.get(instruction, instruction), histogram.getSnapshot())
+                                   for instruction, histogram in self.instruction_latency.items()),
+                "servo_latency_ms": dict((sts_id, histogram.getSnapshot())
+                                         for sts_id, histogram in self.servo_latency.items()),
+                "results": dict((INSTRUCTION_NAMES.get(instruction, instruction), self.nameResults(results))
+                                for instruction, results in self.instruction_results.items()),
+                "servo_results": dict((sts_id, self.nameResults(results))
+                                      for sts_id, results in self.servo_results.items()),
+                "servo_errors": dict((sts_id, dict((ERROR_NAMES[bit], count) for bit, count in errors.items()))
+                                     for sts_id, errors in self.servo_errors.items()),
+            }
+
+    def nameResults(self, results):
+        return dict((RESULT_NAMES.get(result, result), count) for result, count in results.items())
+
+    def exportPrometheus(self, prefix="stservo"):
+        # Prometheus text exposition format
+        snapshot = self.getSnapshot()
+        lines = []
+
+        def metric(name, kind, help_text):
+            lines.append("# HELP %s_%s %s" % (prefix, name, help_text))
+            lines.append("# TYPE %s_%s %s" % (prefix, name, kind))
+
+        def histogram(name, label, histograms):
+            for key, snapshot in sorted(histograms.items()):
+                cumulative = 0
+                for bound, count in snapshot["buckets"]:
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append('%s_%s_bucket{%s="%s",le="%s"} %d' % (prefix, name, label, key, le, cumulative))
+                lines.append('%s_%s_sum{%s="%s"} %r' % (prefix, name, label, key, snapshot["sum"]))
+                lines.append('%s_%s_count{%s="%s"} %d' % (prefix, name, label, key, snapshot["count"]))
+
+        metric("transaction_latency_ms", "histogram", "Instruction packet to end of reply, per instruction.")
+        histogram("transaction_latency_ms", "instruction", snapshot["latency_ms"])
+        metric("servo_latency_ms", "histogram", "Instruction packet to end of reply, per servo.")
+        histogram("servo_latency_ms", "id", snapshot["servo_latency_ms"])
+
+        metric("transactions_total", "counter", "Transactions by instruction and COMM result.")
+        for instruction, results in sorted(snapshot["results"].items()):
+            for result, count in sorted(results.items()):
+                lines.append('%s_transactions_total{instruction="%s",result="%s"} %d'
+                             % (prefix, instruction, result, count))
+        metric("servo_transactions_total", "counter", "Transactions by servo and COMM result.")
+        for sts_id, results in sorted(snapshot["servo_results"].items()):
+            for result, count in sorted(results.items()):
+                lines.append('%s_servo_transactions_total{id="%s",result="%s"} %d' % (prefix, sts_id, result, count))
+        metric("servo_errors_total", "counter", "Error bits reported in status packets.")
+        for sts_id, errors in sorted(snapshot["servo_errors"].items()):
+            for error, count in sorted(errors.items()):
+                lines.append('%s_servo_errors_total{id="%s",error="%s"} %d' % (prefix, sts_id, error, count))
+
+        for name, help_text in (("tx_packets", "Instruction packets sent."),
+                                ("tx_bytes", "Bytes sent."),
+                                ("rx_packets", "Status packets received."),
+                                ("rx_bytes", "Bytes received in status packets.")):
+            metric(name + "_total", "counter", help_text)
+            lines.append("%s_%s_total %d" % (prefix, name, snapshot[name]))
+        metric("bus_utilization", "gauge", "Wire time of all bytes over wall time.")
+        lines.append("%s_bus_utilization %r" % (prefix, snapshot["utilization"]))
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+
+import json
+import os
+import time
+
+from .stservo_def import *
+from .packet_frame import *
+from .port_handler import *
+
+SCAN_TIMEOUT = 2.0  # ms a probed ID gets to answer after the wire time
+SCAN_IDS = range(0, MAX_ID + 2)  # 0 .. 253
+INFO_ADDRESS = 0  # firmware main, firmware sub, -, model L, model H
+INFO_LENGTH = 5
+TOPOLOGY_VERSION = 1
+
+
+class BusScanner(object):
+    # Discovers the servos on a bus. scan() pings every ID with a short
+    # timeout at each baud rate, then reads firmware version and model number
+    # of the responders only, with one sync read per baud rate. The topology
+    # {ID: {"model", "baudrate", "firmware"}} can be saved to a JSON file;
+    # discover() checks a saved topology with one sync read per baud rate and
+    # only scans again when a servo is missing or changed.
+    def __init__(self, packetHandler, timeout=SCAN_TIMEOUT):
+        self.ph = packetHandler
+        self.timeout = timeout
+        self.corrupt_ids = []  # IDs that answered with a corrupt packet, two servos on one ID
+
+    def probe(self, sts_id):
+        # a ping with the scan timeout instead of LATENCY_TIMER
+        portHandler = self.ph.portHandler
+        txpacket = self.ph.getTxFrame(INST_PING).pack(sts_id)
+        result = self.ph.txPacket(txpacket)
+        if result != COMM_SUCCESS:
+            return result
+
+        portHandler.setPacketTimeoutMillis(portHandler.tx_time_per_byte * (6 + 3.0) + self.timeout)
+        while True:
+            rxpacket, result = self.ph.receivePacket()
+            if result != COMM_SUCCESS or self.ph.isStatusPacket(rxpacket, sts_id, 2):
+                break
+
+        self.ph.updateResponseTime(result, rxpacket)
+        portHandler.releaseBus()
+        return result
+
+    def readInfo(self, sts_ids):
+        # {ID: (model, firmware)}, one sync read, single reads if that fails
+        info = {}
+        if not sts_ids:
+            return info
+
+        data = {}
+        if len(sts_ids) > 1:
+            data, _ = self.ph.SyncReadRegisters(sts_ids, INFO_ADDRESS, INFO_LENGTH)
+        for sts_id in sts_ids:
+            if sts_id not in data:
+                read, result, error = self.ph.readTxRx(sts_id, INFO_ADDRESS, INFO_LENGTH)
+                if result == COMM_SUCCESS:
+                    data[sts_id] = (read, error)
+
+        for sts_id, (read, _) in data.items():
+            info[sts_id] = (self.ph.sts_makeword(read[3], read[4]), "%d.%d" % (read[0], read[1]))
+        return info
+
+    def scanBaudRate(self, baudrate, sts_ids=SCAN_IDS):
+        portHandler = self.ph.portHandler
+        if baudrate is not None and baudrate != portHandler.getBaudRate():
+            if not portHandler.setBaudRate(baudrate):
+                return {}
+        baudrate = portHandler.getBaudRate()
+
+        responders = []
+        for sts_id in sts_ids:
+            result = self.probe(sts_id)
+            if result == COMM_SUCCESS:
+                responders.append(sts_id)
+            elif result == COMM_RX_CORRUPT:
+                self.corrupt_ids.append(sts_id)
+
+        topology = {}
+        for sts_id, (model, firmware) in self.readInfo(responders).items():
+            topology[sts_id] = {"model": model, "baudrate": baudrate, "firmware": firmware}
+        return topology
+
+    def scan(self, baudrates=None, sts_ids=SCAN_IDS):
+        # baudrates None: only the current baud rate of the port
+        self.corrupt_ids = []
+        original = self.ph.portHandler.getBaudRate()
+        topology = {}
+        for baudrate in baudrates or [None]:
+            for sts_id, servo in self.scanBaudRate(baudrate, sts_ids).items():
+                topology.setdefault(sts_id, servo)
+        if original != self.ph.portHandler.getBaudRate():
+            self.ph.portHandler.setBaudRate(original)
+        return topology
+
+    def verify(self, topology):
+        # (missing IDs, changed IDs) of a saved topology
+        portHandler = self.ph.portHandler
+        original = portHandler.getBaudRate()
+        by_baudrate = {}
+        for sts_id, servo in topology.items():
+            by_baudrate.setdefault(servo["baudrate"], []).append(sts_id)
+
+        missing = []
+        changed = []
+        for baudrate, sts_ids in sorted(by_baudrate.items()):
+            if baudrate != portHandler.getBaudRate() and not portHandler.setBaudRate(baudrate):
+                missing.extend(sts_ids)
+                continue
+            info = self.readInfo(sorted(sts_ids))
+            for sts_id in sts_ids:
+                if sts_id not in info:
+                    missing.append(sts_id)
+                elif info[sts_id] != (topology[sts_id]["model"], topology[sts_id]["firmware"]):
+                    changed.append(sts_id)
+        if original != portHandler.getBaudRate():
+            portHandler.setBaudRate(original)
+        return sorted(missing), sorted(changed)
+
+    def discover(self, cache_path=None, baudrates=None, rescan=False, sts_ids=SCAN_IDS):
+        # (topology, scanned): the saved topology if it still matches the
+        # bus, otherwise a fresh scan, saved to cache_path
+        if cache_path is not None and not rescan:
+            topology = loadTopology(cache_path, self.ph.portHandler.getPortName())
+            if topology:
+                missing, changed = self.verify(topology)
+                if not missing and not changed:
+                    return topology, False
+
+        topology = self.scan(baudrates, sts_ids)
+        if cache_path is not None:
+            saveTopology(cache_path, topology, self.ph.portHandler.getPortName())
+        return topology, True
+
+
+def saveTopology(path, topology, port_name=None):
+    document = {
+        "version": TOPOLOGY_VERSION,
+        "port": port_name,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "servos": dict((str(sts_id), servo) for sts_id, servo in sorted(topology.items())),
+    }
+    with open(path, "w") as cache:
+        json.dump(document, cache, indent=2)
+
+
+def loadTopology(path, port_name=None):
+    # {} when there is no usable cache for port_name
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as cache:
+            document = json.load(cache)
+    except (OSError, ValueError):
+        return {}
+    if document.get("version") != TOPOLOGY_VERSION or (port_name is not None and document.get("port") != port_name):
+        return {}
+    return dict((int(sts_id), servo) for sts_id, servo in document.get("servos", {}).items())
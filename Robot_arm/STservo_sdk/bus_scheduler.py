@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+
+import heapq
+import threading
+import time
+from contextlib import contextmanager
+
+# Transaction priority, lower is served first
+PRIORITY_CONTROL = 0  # goal writes, action
+PRIORITY_TELEMETRY = 1  # reads, ping, sync read
+PRIORITY_BACKGROUND = 2
+
+DEFAULT_WAIT_TIMEOUT = 100  # ms a transaction may wait for the bus
+
+
+class BusRequest(object):
+    def __init__(self, priority, sequence, deadline, key):
+        self.priority = priority
+        self.sequence = sequence
+        self.deadline = deadline
+        self.key = key
+        self.enqueue_time = time.monotonic()
+        self.cancelled = False
+
+    def __lt__(self, other):
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+
+class BusScheduler(object):
+    # Serializes bus transactions from any number of threads. A thread that
+    # finds the bus in use queues up by priority (FIFO within a priority) and
+    # sleeps until the bus is handed to it, its wait deadline passes or a
+    # newer request with the same key makes it stale.
+    def __init__(self, wait_timeout=DEFAULT_WAIT_TIMEOUT):
+        self.lock = threading.Lock()
+        self.condition = threading.Condition(self.lock)
+        self.queue = []
+        self.keys = {}
+        self.owner = None
+        self.sequence = 0
+        self.wait_timeout = {
+            PRIORITY_CONTROL: wait_timeout,
+            PRIORITY_TELEMETRY: wait_timeout,
+            PRIORITY_BACKGROUND: wait_timeout,
+        }
+        self.local = threading.local()
+        self.resetStats()
+
+    def resetStats(self):
+        with self.lock:
+            self.stats = {
+                "granted": 0,  # after a wait, getStats adds the immediate grants
+                "immediate": 0,
+                "waited": 0,
+                "expired": 0,
+                "cancelled": 0,
+                "busy": 0,
+                "max_queue_depth": 0,
+                "wait_time": {},
+            }
+
+    def setWaitTimeout(self, priority, msec):
+        # None waits as long as it takes
+        self.wait_timeout[priority] = msec
+
+    @contextmanager
+    def priority(self, priority, timeout=None):
+        # run the transactions of this thread at a fixed priority
+        previous = getattr(self.local, "override", None)
+        self.local.override = (priority, timeout)
+        try:
+            yield
+        finally:
+            self.local.override = previous
+
+    def isBusy(self):
+        return self.owner is not None
+
+    def getQueueDepth(self):
+        with self.lock:
+            return sum(1 for request in self.queue if not request.cancelled)
+
+    def acquire(self, priority=PRIORITY_TELEMETRY, key=None, timeout=None):
+        thread = threading.get_ident()
+        with self.lock:
+            if self.owner is None and not self.queue:
+                # free bus, nobody waiting
+                self.owner = thread
+                self.stats["immediate"] += 1
+                return True
+
+            if self.owner == thread:
+                # a transaction of this thread is still open
+                self.stats["busy"] += 1
+                return False
+
+            override = getattr(self.local, "override", None)
+            if override is not None:
+                priority = override[0]
+                if override[1] is not None:
+                    timeout = override[1]
+            if timeout is None:
+                timeout = self.wait_timeout.get(priority, DEFAULT_WAIT_TIMEOUT)
+
+            deadline = None if timeout is None else time.monotonic() + timeout / 1000.0
+            request = BusRequest(priority, self.sequence, deadline, key)
+            self.sequence += 1
+
+            if key is not None:
+                stale = self.keys.get(key)
+                if stale is not None:
+                    stale.cancelled = True
+                    self.stats["cancelled"] += 1
+                    self.condition.notify_all()
+                self.keys[key] = request
+
+            heapq.heappush(self.queue, request)
+            self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], len(self.queue))
+            self.stats["waited"] += 1
+
+            granted = False
+            while True:
+                if request.cancelled:
+                    break
+
+                self.dropCancelled()
+                if self.owner is None and self.queue[0] is request:
+                    heapq.heappop(self.queue)
+                    self.owner = thread
+                    granted = True
+                    break
+
+                if deadline is None:
+                    self.condition.wait()
+                    continue
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    request.cancelled = True
+                    self.stats["expired"] += 1
+                    break
+                self.condition.wait(remaining)
+
+            if key is not None and self.keys.get(key) is request:
+                del self.keys[key]
+            if granted:
+                self.stats["granted"] += 1
+                self.addWait(priority, (time.monotonic() - request.enqueue_time) * 1000.0)
+            else:
+                # let the next request in line see the new queue head
+                self.dropCancelled()
+                self.condition.notify_all()
+            return granted
+
+    def release(self):
+        with self.lock:
+            self.owner = None
+            if self.queue:
+                self.condition.notify_all()
+
+    def dropCancelled(self):
+        while self.queue and self.queue[0].cancelled:
+            heapq.heappop(self.queue)
+
+    def addWait(self, priority, msec):
+        # wait of the requests that had to queue
+        wait_time = self.stats["wait_time"].get(priority)
+        if wait_time is None:
+            wait_time = {"count": 0, "total": 0.0, "max": 0.0}
+            self.stats["wait_time"][priority] = wait_time
+        wait_time["count"] += 1
+        wait_time["total"] += msec
+        wait_time["max"] = max(wait_time["max"], msec)
+
+    def getStats(self):
+        with self.lock:
+            stats = dict(self.stats)
+            stats["granted"] += stats["immediate"]
+            stats["queue_depth"] = sum(1 for request in self.queue if not request.cancelled)
+            stats["wait_time"] = {}
+            for priority, wait_time in self.stats["wait_time"].items():
+                stats["wait_time"][priority] = {
+                    "count": wait_time["count"],
+                    "mean": wait_time["total"] / wait_time["count"],
+                    "max": wait_time["max"],
+                }
+            return stats
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+
+import threading
+import time
+
+from .stservo_def import *
+from .group_sync_write import *
+from .sts import *
+
+DEFAULT_FLUSH_RATE = 50  # Hz
+
+
+class CommandMailbox(object):
+    # Latest value wins goal store. post() only records the newest goal of a
+    # servo; flush() sends every servo with a new goal as one sync write, so
+    # a burst of slider events or tracking frames costs one packet per tick
+    # instead of one write with status reply per event. start() runs flush()
+    # at a fixed rate in a background thread. post() never waits for the bus:
+    # flush() takes the goals under the lock and sends them outside it, and
+    # a second lock keeps a flush called by hand apart from that thread's.
+    #
+    # coalesced: goals replaced by a newer goal before they were sent
+    # dropped: goals that never made it to the bus (failed flush with a newer
+    #          goal waiting, or discarded by clear()/stop())
+    def __init__(self, packetHandler, rate=DEFAULT_FLUSH_RATE, start_address=STS_ACC, data_length=7):
+        self.ph = packetHandler
+        self.groupSyncWrite = GroupSyncWrite(packetHandler, start_address, data_length)
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.pending = {}
+        self.period = 1.0 / rate
+        self.last_result = COMM_NOT_AVAILABLE
+
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.resetStats()
+
+    def resetStats(self):
+        with self.lock:
+            self.stats = {
+                "posted": 0,
+                "coalesced": 0,
+                "dropped": 0,
+                "sent": 0,
+                "packets": 0,
+                "failed_packets": 0,
+            }
+
+    def setRate(self, rate):
+        self.period = 1.0 / rate
+
+    def post(self, sts_id, data):
+        # data as laid out from start_address
+        with self.lock:
+            if sts_id in self.pending:
+                self.stats["coalesced"] += 1
+            self.pending[sts_id] = data
+            self.stats["posted"] += 1
+
+    def postPosEx(self, sts_id, position, speed, acc):
+        # sts.WritePosEx through the mailbox
+        self.post(sts_id, [acc, self.ph.sts_lobyte(position), self.ph.sts_hibyte(position), 0, 0,
+                           self.ph.sts_lobyte(speed), self.ph.sts_hibyte(speed)])
+
+    def getPending(self):
+        with self.lock:
+            return len(self.pending)
+
+    def flush(self):
+        with self.flush_lock:
+            with self.lock:
+                pending = self.pending
+                self.pending = {}
+
+            if not pending:
+                return COMM_NOT_AVAILABLE
+
+            self.groupSyncWrite.clearParam()
+            for sts_id, data in pending.items():
+                self.groupSyncWrite.addParam(sts_id, data)
+            result = self.groupSyncWrite.txPacket()
+
+            with self.lock:
+                self.stats["packets"] += 1
+                if result == COMM_SUCCESS:
+                    self.stats["sent"] += len(pending)
+                else:
+                    # retry on the next tick unless a newer goal is already waiting
+                    self.stats["failed_packets"] += 1
+                    for sts_id, data in pending.items():
+                        if sts_id in self.pending:
+                            self.stats["dropped"] += 1
+                        else:
+                            self.pending[sts_id] = data
+                self.last_result = result
+            return result
+
+    def clear(self):
+        with self.lock:
+            self.stats["dropped"] += len(self.pending)
+            self.pending = {}
+
+    def start(self):
+        if self.thread is not None:
+            return
+
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self, flush=True):
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+
+        if flush:
+            self.flush()
+        self.clear()
+
+    def run(self):
+        deadline = time.monotonic()
+        while True:
+            deadline += self.period
+            remaining = deadline - time.monotonic()
+            if remaining < 0:
+                # fell behind (bus busy, long transaction): skip the missed ticks
+                deadline = time.monotonic()
+                remaining = 0
+            if self.stop_event.wait(remaining):
+                break
+            self.flush()
+
+    def getStats(self):
+        with self.lock:
+            stats = dict(self.stats)
+            stats["pending"] = len(self.pending)
+            return stats
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+
+import math
+import threading
+import time
+
+from .stservo_def import *
+from .histogram import *
+
+# What to do with cycles whose deadline passed while an earlier cycle ran
+LOOP_SKIP = 0  # drop them, carry on at the next deadline still ahead
+LOOP_CATCH_UP = 1  # run them back to back until the loop is on time again
+
+LOOP_SPIN_TIME = 0.0005  # s busy waited before a deadline, sleep() wakes up late
+
+
+class ControlLoop(object):
+    # Runs control cycles at a fixed rate: one sync read of the servo states,
+    # control(states, cycle), then the sync write of whatever the callback
+    # queued on packetHandler.groupSyncWrite (SyncWritePosEx, SyncWritePos).
+    # Deadlines are start + cycle * period on the monotonic clock, so the
+    # time a cycle takes does not shift the ones after it.
+    #
+    # jitter: ms the cycle started after its deadline
+    # bus: ms spent in the sync read and sync write
+    # cycle: ms from the start of a cycle to the end of its sync write
+    # overruns: cycles that ended after the deadline of the next one
+    # skipped: deadlines dropped by LOOP_SKIP
+    def __init__(self, packetHandler, sts_ids, control, rate=100, policy=LOOP_SKIP, read=None):
+        self.ph = packetHandler
+        self.sts_ids = list(sts_ids)
+        self.control = control
+        self.period = 1.0 / rate
+        self.policy = policy
+        self.read = read if read is not None else packetHandler.SyncReadState
+        self.last_states = {}
+        self.publisher = None  # StateRingWriter fed with every cycle's states
+        self.last_result = COMM_NOT_AVAILABLE
+
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.resetStats()
+
+    def resetStats(self):
+        self.stats = {
+            "cycles": 0,
+            "overruns": 0,
+            "skipped": 0,
+            "read_failures": 0,
+            "write_failures": 0,
+        }
+        self.jitter = Histogram()
+        self.bus_time = Histogram()
+        self.cycle_time = Histogram()
+        self.run_time = 0.0
+
+    def setPublisher(self, publisher):
+        # anything with publish(states), None to stop publishing
+        self.publisher = publisher
+
+    def setRate(self, rate):
+        self.period = 1.0 / rate
+
+    def step(self, cycle):
+        groupSyncWrite = self.ph.groupSyncWrite
+        groupSyncWrite.clearParam()
+
+        bus_start = time.perf_counter()
+        states, result = self.read(self.sts_ids)
+        bus_time = time.perf_counter() - bus_start
+        if result != COMM_SUCCESS:
+            self.stats["read_failures"] += 1
+        self.last_states = states
+        if self.publisher is not None:
+            self.publisher.publish(states)
+
+        self.control(states, cycle)
+
+        if groupSyncWrite.data_dict:
+            bus_start = time.perf_counter()
+            result = groupSyncWrite.txPacket()
+            bus_time += time.perf_counter() - bus_start
+            groupSyncWrite.clearParam()
+            if result != COMM_SUCCESS:
+                self.stats["write_failures"] += 1
+        self.last_result = result
+        self.bus_time.addSample(bus_time * 1000.0)
+
+    def waitUntil(self, deadline):
+        # False when stop() was called while waiting
+        remaining = deadline - time.monotonic() - LOOP_SPIN_TIME
+        if remaining > 0 and self.stop_event.wait(remaining):
+            return False
+        while time.monotonic() < deadline:
+            pass
+        return True
+
+    def run(self, cycles=None, duration=None):
+        # blocks until cycles ran, duration seconds passed or stop() was called
+        start = time.monotonic()
+        end = start + duration if duration is not None else None
+        first_cycle = self.stats["cycles"] + self.stats["skipped"]
+        cycle = 0  # period index, skipped periods included
+        executed = 0  # cycles run by this call
+        while not self.stop_event.is_set():
+            if cycles is not None and executed >= cycles:
+                break
+            deadline = start + cycle * self.period
+            if end is not None and deadline >= end:
+                break
+            if not self.waitUntil(deadline):
+                break
+
+            cycle_start = time.monotonic()
+            self.jitter.addSample((cycle_start - deadline) * 1000.0)
+            self.step(first_cycle + cycle)
+            cycle_end = time.monotonic()
+            self.cycle_time.addSample((cycle_end - cycle_start) * 1000.0)
+            self.stats["cycles"] += 1
+            executed += 1
+            cycle += 1
+
+            if cycle_end > start + cycle * self.period:
+                self.stats["overruns"] += 1
+                if self.policy == LOOP_SKIP:
+                    next_cycle = int(math.ceil((cycle_end - start) / self.period))
+                    self.stats["skipped"] += next_cycle - cycle
+                    cycle = next_cycle
+        self.run_time += time.monotonic() - start
+
+    def start(self):
+        if self.thread is not None:
+            return
+
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.stop_event.clear()
+
+    def getStats(self):
+        stats = dict(self.stats)
+        stats["rate"] = stats["cycles"] / self.run_time if self.run_time else 0.0
+        stats["jitter_ms"] = self.jitter.getSnapshot()
+        stats["bus_ms"] = self.bus_time.getSnapshot()
+        stats["cycle_ms"] = self.cycle_time.getSnapshot()
+        return stats
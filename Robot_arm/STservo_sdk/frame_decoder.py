@@ -0,0 +1,295 @@
+#!/usr/bin/env python
+
+from collections import deque
+
+from .stservo_def import *
+from .packet_frame import *
+
+RXPACKET_MAX_LEN = 250
+RING_BUFFER_SIZE = 1024  # power of two, holds several max length status packets
+
+# decoder states
+STATE_HEADER0 = 0
+STATE_HEADER1 = 1
+STATE_ID = 2
+STATE_LENGTH = 3
+STATE_ERROR = 4
+STATE_PARAMETER = 5
+
+
+class FrameDecoder(object):
+    # Incremental status packet decoder. Received bytes go into a fixed size
+    # ring buffer and every byte is looked at once by a small state machine
+    # (header, ID, length, error, parameters + running checksum). A rejected
+    # candidate only rewinds to the byte after its first header byte, so a
+    # noisy line never rescans or shifts the whole buffer. Reads that line up
+    # with packet boundaries, the usual case on a clean bus, skip the state
+    # machine: feedAligned checks them a whole packet at a time.
+    def __init__(self, size=RING_BUFFER_SIZE):
+        if size & (size - 1) or size < 2 * (RXPACKET_MAX_LEN + 4):
+            raise ValueError("ring buffer size must be a power of two >= %d" % (2 * (RXPACKET_MAX_LEN + 4)))
+
+        self.size = size
+        self.mask = size - 1
+        self.ring = bytearray(size)
+        self.view = memoryview(self.ring)
+        self.frames = deque()
+
+        self.frame_count = 0
+        self.corrupt_count = 0
+        self.discarded_bytes = 0
+
+        self.reset()
+
+    def reset(self):
+        self.head = 0  # next write position
+        self.start = 0  # first byte of the packet being decoded
+        self.cursor = 0  # next byte to decode
+        self.state = STATE_HEADER0
+        self.packet_length = 0
+        self.checksum = 0
+        self.frames.clear()
+
+    def pending(self):
+        # bytes received but not yet part of a complete packet
+        return self.head - self.start
+
+    def waitLength(self):
+        # bytes still missing to complete the packet being decoded
+        if self.state == STATE_PARAMETER:
+            missing = self.packet_length - self.head + self.start
+        else:
+            missing = 6 - self.head + self.start  # HEADER0 HEADER1 ID LENGTH ERROR CHKSUM
+        return missing if missing > 0 else 1
+
+    def hasFrame(self):
+        return len(self.frames) > 0
+
+    def pop(self):
+        if self.frames:
+            return self.frames.popleft()
+        return None
+
+    def __iter__(self):
+        while self.frames:
+            yield self.frames.popleft()
+
+    def feed(self, data):
+        if self.cursor == self.head:
+            data = self.feedAligned(data)
+            if data is None:
+                return len(self.frames)
+
+        data_length = len(data)
+        offset = 0
+
+        position = self.head & self.mask
+        if position + data_length <= self.size and data_length <= self.size - self.head + self.start:
+            # common case, fits without wrapping
+            self.ring[position: position + data_length] = data
+            self.head += data_length
+            self.decode()
+            return len(self.frames)
+
+        while offset < data_length:
+            count = min(self.size - self.pending(), data_length - offset)
+            position = self.head & self.mask
+            first = min(count, self.size - position)
+
+            self.ring[position: position + first] = data[offset: offset + first]
+            if first < count:
+                self.ring[0: count - first] = data[offset + first: offset + count]
+
+            self.head += count
+            offset += count
+            self.decode()
+
+        return len(self.frames)
+
+    def feedAligned(self, data):
+        # header, length and checksum of each packet are checked on slices of
+        # data; returns what is left for the state machine, from the first
+        # byte that is not a complete valid packet, or None
+        data_length = len(data)
+        frames = self.frames
+        offset = 0
+
+        if self.state == STATE_PARAMETER:
+            # the header came with an earlier read, data may hold the rest
+            start = self.start
+            received = self.head - start
+            missing = self.packet_length - received
+            position = start & self.mask
+            if missing > data_length or position + received > self.size or \
+                    data[missing - 1] != (~(self.checksum + sum(data[0: missing - 1])) & 0xFF):
+                return data
+
+            packet = self.ring[position: position + received]
+            packet.extend(data[0: missing])
+            frames.append((packet, COMM_SUCCESS))
+            self.frame_count += 1
+            self.head = self.start = self.cursor = 0
+            self.state = STATE_HEADER0
+            if missing == data_length:
+                return None
+            offset = missing
+
+        elif self.state != STATE_HEADER0 or self.start != self.head:
+            return data
+
+        while data_length - offset >= 6 and data[offset] == 0xFF and data[offset + 1] == 0xFF:
+            length = data[offset + 3]
+            if data[offset + 2] >= 0xFE or not 2 <= length <= RXPACKET_MAX_LEN or data[offset + 4] > 0x7F:
+                break
+
+            end = offset + length + PKT_LENGTH + 1
+            if end > data_length:
+                # the read stopped inside the packet, keep its first part
+                received = data_length - offset
+                self.ring[0: received] = data[offset:]
+                self.head = received
+                self.start = 0
+                self.cursor = received
+                self.state = STATE_PARAMETER
+                self.packet_length = end - offset
+                self.checksum = sum(data[offset + 2:])
+                return None
+
+            if data[end - 1] != (~sum(data[offset + 2: end - 1]) & 0xFF):
+                break
+
+            frames.append((bytearray(data[offset: end]), COMM_SUCCESS))
+            self.frame_count += 1
+            offset = end
+
+        if offset == 0:
+            return data
+
+        # the ring holds nothing now, start over at its beginning
+        self.head = self.start = self.cursor = 0
+        self.state = STATE_HEADER0
+        return data[offset:] if offset < data_length else None
+
+    def extract(self, start, packet_length):
+        position = start & self.mask
+        end = position + packet_length
+
+        if end <= self.size:
+            return self.ring[position: end]
+        return self.ring[position:] + self.ring[0: end - self.size]
+
+    def decode(self):
+        # the parser state lives in locals while decoding and is stored back
+        # at the end, attribute access per byte is the main cost in python
+        ring = self.ring
+        view = self.view
+        size = self.size
+        mask = self.mask
+        head = self.head
+        start = self.start
+        cursor = self.cursor
+        state = self.state
+        packet_length = self.packet_length
+        checksum = self.checksum
+        discarded = 0
+
+        while cursor < head:
+            if state == STATE_HEADER0:
+                # skip noise up to the next 0xFF in one search
+                position = cursor & mask
+                stop = position + min(head - cursor, size - position)
+                found = ring.find(0xFF, position, stop)
+                if found < 0:
+                    discarded += stop - position
+                    cursor += stop - position
+                    start = cursor
+                    continue
+
+                discarded += found - position
+                start = cursor + found - position
+                cursor = start + 1
+                state = STATE_HEADER1
+
+                # whole header already received in one piece: check it at once
+                if head - start >= 5 and found + 5 <= size:
+                    sts_id = ring[found + 2]
+                    length = ring[found + 3]
+                    error = ring[found + 4]
+                    if ring[found + 1] == 0xFF and sts_id < 0xFE and 2 <= length <= RXPACKET_MAX_LEN and error <= 0x7F:
+                        packet_length = length + PKT_LENGTH + 1
+                        checksum = sts_id + length + error
+                        cursor = start + 5
+                        state = STATE_PARAMETER
+                continue
+
+            if state == STATE_PARAMETER:
+                # add every parameter byte already received in one sum
+                checksum_position = start + packet_length - 1
+                count = min(checksum_position, head) - cursor
+                if count > 0:
+                    position = cursor & mask
+                    first = min(count, size - position)
+                    checksum += sum(view[position: position + first])
+                    if first < count:
+                        checksum += sum(view[0: count - first])
+                    cursor += count
+
+                if cursor == head:
+                    break
+
+                byte = ring[cursor & mask]  # checksum
+                cursor += 1
+                packet = self.extract(start, packet_length)
+                if byte == (~checksum & 0xFF):
+                    self.frame_count += 1
+                    self.frames.append((packet, COMM_SUCCESS))
+                    start = cursor
+                    state = STATE_HEADER0
+                    continue
+
+                self.corrupt_count += 1
+                self.frames.append((packet, COMM_RX_CORRUPT))
+                valid = False
+
+            else:
+                byte = ring[cursor & mask]
+                cursor += 1
+
+                if state == STATE_HEADER1:
+                    valid = byte == 0xFF
+                    state = STATE_ID
+
+                elif state == STATE_ID:
+                    if byte == 0xFF:
+                        # FF FF FF: the packet starts one byte later
+                        discarded += 1
+                        start += 1
+                        continue
+                    valid = byte <= 0xFD
+                    checksum = byte
+                    state = STATE_LENGTH
+
+                elif state == STATE_LENGTH:
+                    valid = 2 <= byte <= RXPACKET_MAX_LEN
+                    packet_length = byte + PKT_LENGTH + 1
+                    checksum += byte
+                    state = STATE_ERROR
+
+                else:
+                    valid = byte <= 0x7F
+                    checksum += byte
+                    state = STATE_PARAMETER
+
+            if not valid:
+                # not a packet after all, restart the header search one byte later
+                discarded += 1
+                cursor = start + 1
+                start = cursor
+                state = STATE_HEADER0
+
+        self.start = start
+        self.cursor = cursor
+        self.state = state
+        self.packet_length = packet_length
+        self.checksum = checksum
+        self.discarded_bytes += discarded
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+
+import time
+
+from .stservo_def import *
+
+STATUS_PACKET_LENGTH = 6  # the status reply of a REG_WRITE, no data
+REPLY_GAP = 0.1  # ms for the servo return delay and the line turnaround
+VERIFY_ADDRESS = 5  # ID register of STS and SCSCL, read back to check a servo answers
+STAGE_ATTEMPTS = 2  # acknowledged reg writes for servos that failed the verify read
+
+
+class GroupRegWrite:
+    # Stage then trigger: one REG_WRITE per servo sent back to back with
+    # regWriteTxOnly, an optional check, then one broadcast ACTION, so every
+    # servo starts on the same tick and staging costs the wire time of the
+    # packets instead of one round trip per servo.
+    #
+    # replies: the servos answer REG_WRITE (status return level above 0, the
+    #          default); each packet then waits the wire time of that reply
+    #          before the next one so they do not collide on the half duplex
+    #          line, and the replies are drained unread at the end
+    # verify: a REG_WRITE buffer cannot be read back, so txPacket(verify=True)
+    #         only checks liveness: it sync reads the ID register of the
+    #         staged servos and stages again with regWriteTxRx for the ones
+    #         that did not answer. A servo that answers is taken to have its
+    #         REG_WRITE staged, nothing confirms it. failed_ids lists the
+    #         servos that neither answered nor acknowledged the restaging;
+    #         the ACTION goes out for the others regardless
+    def __init__(self, ph, replies=True):
+        self.ph = ph
+        self.replies = replies
+        self.data_dict = {}
+        self.failed_ids = []  # dead to verifyAlive, see above
+
+        self.clearParam()
+
+    def addParam(self, sts_id, address, data):
+        if sts_id in self.data_dict or sts_id >= BROADCAST_ID:
+            return False
+
+        self.data_dict[sts_id] = (address, list(data))
+        return True
+
+    def removeParam(self, sts_id):
+        self.data_dict.pop(sts_id, None)
+
+    def changeParam(self, sts_id, address, data):
+        if sts_id not in self.data_dict:
+            return False
+
+        self.data_dict[sts_id] = (address, list(data))
+        return True
+
+    def clearParam(self):
+        self.data_dict.clear()
+
+    def getPacketTime(self, length):
+        # ms a staged packet holds the line, with its reply if there is one
+        byte_time = self.ph.portHandler.tx_time_per_byte
+        if not self.replies:
+            return (length + 7) * byte_time
+        return (length + 7 + STATUS_PACKET_LENGTH) * byte_time + REPLY_GAP
+
+    def stage(self):
+        # REG_WRITE to every servo without waiting for replies
+        line_free = time.perf_counter()
+        result = COMM_SUCCESS
+        for sts_id, (address, data) in self.data_dict.items():
+            self.waitUntil(line_free)
+            packet_result = self.ph.regWriteTxOnly(sts_id, address, len(data), data)
+            line_free = time.perf_counter() + self.getPacketTime(len(data)) / 1000.0
+            if packet_result != COMM_SUCCESS and result == COMM_SUCCESS:
+                result = packet_result
+
+        if self.replies:
+            self.waitUntil(line_free)
+            self.ph.drainInput()
+        return result
+
+    def waitUntil(self, deadline):
+        # busy wait, the gaps are far below the resolution of sleep()
+        while time.perf_counter() < deadline:
+            pass
+
+    def verifyAlive(self):
+        # IDs that neither answer the ID read nor acknowledge the restaging;
+        # an answer proves the servo is on the bus, not that it is staged
+        sts_ids = list(self.data_dict)
+        data, _ = self.ph.SyncReadRegisters(sts_ids, VERIFY_ADDRESS, 1)
+        failed = []
+        for sts_id in sts_ids:
+            if sts_id in data and data[sts_id][0][0] == sts_id:
+                continue
+            address, values = self.data_dict[sts_id]
+            for _ in range(STAGE_ATTEMPTS):
+                result, _ = self.ph.regWriteTxRx(sts_id, address, len(values), values)
+                if result == COMM_SUCCESS:
+                    break
+            else:
+                failed.append(sts_id)
+        return failed
+
+    def action(self):
+        # ACTION is broadcast, no servo answers it
+        return self.ph.action(BROADCAST_ID)
+
+    def txPacket(self, verify=False):
+        if not self.data_dict:
+            return COMM_NOT_AVAILABLE
+
+        self.failed_ids = []
+        result = self.stage()
+        if result != COMM_SUCCESS:
+            return result
+        if verify:
+            self.failed_ids = self.verifyAlive()
+        return self.action()
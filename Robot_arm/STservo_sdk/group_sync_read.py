@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 
 from .stservo_def import *
+from .packet_frame import *
 
 class GroupSyncRead:
     def __init__(self, ph, start_address, data_length):
@@ -12,6 +13,7 @@ class GroupSyncRead:
         self.is_param_changed = False
         self.param = []
         self.data_dict = {}
+        self.rx_result = {}
 
         self.clearParam()
 
@@ -38,11 +40,13 @@ class GroupSyncRead:
             return
 
         del self.data_dict[sts_id]
+        self.rx_result.pop(sts_id, None)
 
         self.is_param_changed = True
 
     def clearParam(self):
         self.data_dict.clear()
+        self.rx_result.clear()
 
     def txPacket(self):
         if len(self.data_dict.keys()) == 0:
@@ -55,27 +59,71 @@ class GroupSyncRead:
         return self.ph.syncReadTx(self.start_address, self.data_length, self.param, len(self.data_dict.keys()))
 
     def rxPacket(self):
-        self.last_result = True
-
-        result = COMM_RX_FAIL
-
         if len(self.data_dict.keys()) == 0:
             return COMM_NOT_AVAILABLE
 
         result, rxpacket = self.ph.syncReadRx(self.data_length, len(self.data_dict.keys()))
-        # print(rxpacket)
-        if len(rxpacket) >= (self.data_length+6):
-            for sts_id in self.data_dict:
-                self.data_dict[sts_id], result = self.readRx(rxpacket, sts_id, self.data_length)
-                if result != COMM_SUCCESS:
-                    self.last_result = False
-                # print(sts_id)
-        else:
-            self.last_result = False
-        # print(self.last_result)
+        return self.storeRxPacket(result, rxpacket)
+
+    def storeRxPacket(self, result, rxpacket):
+        # Walks the concatenated status packets once. Every frame is checked
+        # (header, length, registered ID, checksum) before its [error, data...]
+        # goes to the slot of its ID; a bad byte only costs a resync from the
+        # next byte, it cannot shift data to another servo.
+        data_dict = self.data_dict
+        rx_result = self.rx_result
+        for sts_id in data_dict:
+            data_dict[sts_id] = []
+            rx_result[sts_id] = COMM_RX_TIMEOUT
+
+        data_length = self.data_length
+        frame_length = data_length + 6  # HEADER0 HEADER1 ID LENGTH ERROR DATA... CHECKSUM
+        rx_length = len(rxpacket)
+        rx_index = 0
+        while rx_index + frame_length <= rx_length:
+            if rxpacket[rx_index] != 0xFF or rxpacket[rx_index + 1] != 0xFF:
+                rx_index += 1
+                continue
+
+            sts_id = rxpacket[rx_index + PKT_ID]
+            if rxpacket[rx_index + PKT_LENGTH] != data_length + 2 or sts_id not in data_dict:
+                rx_index += 1
+                continue
+
+            checksum = ~sum(rxpacket[rx_index + PKT_ID: rx_index + frame_length - 1]) & 0xFF
+            if checksum != rxpacket[rx_index + frame_length - 1]:
+                if rx_result[sts_id] != COMM_SUCCESS:
+                    rx_result[sts_id] = COMM_RX_CORRUPT
+                rx_index += 1
+                continue
+
+            data_dict[sts_id] = list(rxpacket[rx_index + PKT_ERROR: rx_index + frame_length - 1])
+            rx_result[sts_id] = COMM_SUCCESS
+            rx_index += frame_length
+
+        for sts_id, sts_result in rx_result.items():
+            self.ph.updateCache(sts_id, self.start_address, data_length, data_dict[sts_id][1:],
+                                sts_result, data_dict[sts_id][0] if data_dict[sts_id] else 0)
+
+        self.last_result = all(sts_result == COMM_SUCCESS for sts_result in rx_result.values())
+        if self.last_result:
+            return COMM_SUCCESS
+        if result == COMM_SUCCESS:
+            # the expected number of frames, but not one from every servo
+            return COMM_RX_CORRUPT
         return result
 
+    def getRxResult(self, sts_id):
+        # COMM_SUCCESS, COMM_RX_CORRUPT or COMM_RX_TIMEOUT (no frame) for one
+        # servo of the last rxPacket
+        return self.rx_result.get(sts_id, COMM_NOT_AVAILABLE)
+
     def txRxPacket(self):
+        if self.ph.retry_policy is not None:
+            return self.ph.retry_policy.run(self.ph, self.txRxPacketOnce, lambda result: result)
+        return self.txRxPacketOnce()
+
+    def txRxPacketOnce(self):
         result = self.txPacket()
         if result != COMM_SUCCESS:
             return result
@@ -140,12 +188,12 @@ class GroupSyncRead:
         if data_length == 1:
             return self.data_dict[sts_id][address-self.start_address+1]
         elif data_length == 2:
-            return self.ph.scs_makeword(self.data_dict[sts_id][address-self.start_address+1],
+            return self.ph.sts_makeword(self.data_dict[sts_id][address-self.start_address+1],
                                 self.data_dict[sts_id][address-self.start_address+2])
         elif data_length == 4:
-            return self.ph.scs_makedword(self.ph.scs_makeword(self.data_dict[sts_id][address-self.start_address+1],
+            return self.ph.sts_makedword(self.ph.sts_makeword(self.data_dict[sts_id][address-self.start_address+1],
                                               self.data_dict[sts_id][address-self.start_address+2]),
-                                 self.ph.scs_makeword(self.data_dict[sts_id][address-self.start_address+3],
+                                 self.ph.sts_makeword(self.data_dict[sts_id][address-self.start_address+3],
                                               self.data_dict[sts_id][address-self.start_address+4]))
         else:
             return 0
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+
+import bisect
+
+# Upper bucket bounds in ms, 1-2-5 steps from 10 us to 1 s
+DEFAULT_BUCKETS = [scale * step for scale in (0.01, 0.1, 1.0, 10.0, 100.0) for step in (1, 2, 5)] + [1000.0]
+
+
+class Histogram(object):
+    # Fixed bucket histogram, cheap enough to add a sample on every bus
+    # transaction. counts[i] holds the samples up to buckets[i], the last
+    # count the samples above the last bound. Percentiles are interpolated
+    # linearly inside the bucket they fall in, clamped to min and max.
+    def __init__(self, buckets=None):
+        self.buckets = list(buckets) if buckets is not None else DEFAULT_BUCKETS
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def addSample(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def getMean(self):
+        return self.sum / self.count if self.count else 0.0
+
+    def getPercentile(self, percentile):
+        if self.count == 0:
+            return 0.0
+
+        rank = percentile / 100.0 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if index == len(self.buckets):
+                    return self.max
+                lower = max(self.buckets[index - 1] if index else 0.0, self.min)
+                upper = min(self.buckets[index], self.max)
+                return lower + (upper - lower) * max(rank - seen, 0) / count
+            seen += count
+        return self.max
+
+    def getSnapshot(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.min is not None else 0.0,
+            "max": self.max if self.max is not None else 0.0,
+            "mean": self.getMean(),
+            "p50": self.getPercentile(50),
+            "p99": self.getPercentile(99),
+            "buckets": list(zip(self.buckets + [float("inf")], self.counts)),
+        }
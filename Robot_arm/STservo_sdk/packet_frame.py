@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+
+from .stservo_def import *
+
+TXPACKET_MAX_LEN = 250
+
+# for Protocol Packet
+PKT_HEADER0 = 0
+PKT_HEADER1 = 1
+PKT_ID = 2
+PKT_LENGTH = 3
+PKT_INSTRUCTION = 4
+PKT_ERROR = 4
+PKT_PARAMETER0 = 5
+
+
+def packet_checksum(packet, total_packet_length):
+    # slicing a memoryview does not copy, and sum() walks it in C
+    return ~sum(packet[PKT_ID: total_packet_length - 1]) & 0xFF
+
+
+class PacketFrame(object):
+    # Reusable instruction packet. HEADER0 HEADER1 and INSTRUCTION are written
+    # once; each pack fills ID, LENGTH and parameters in place and returns a
+    # memoryview over the used part of the buffer. txPacket adds the checksum.
+    def __init__(self, instruction):
+        self.instruction = instruction
+        self.buffer = bytearray(TXPACKET_MAX_LEN)
+        self.buffer[PKT_HEADER0] = 0xFF
+        self.buffer[PKT_HEADER1] = 0xFF
+        self.buffer[PKT_INSTRUCTION] = instruction
+        self.view = memoryview(self.buffer)
+
+    def finish(self, sts_id, param_length):
+        total_packet_length = param_length + 6  # HEADER0 HEADER1 ID LENGTH INST ... CHKSUM
+
+        self.buffer[PKT_ID] = sts_id
+        self.buffer[PKT_LENGTH] = param_length + 2
+
+        return self.view[0: total_packet_length]
+
+    def pack(self, sts_id):
+        return self.finish(sts_id, 0)
+
+    def packAddress(self, sts_id, address, data, data_length):
+        # 7: HEADER0 HEADER1 ID LEN INST ADDR CHKSUM
+        if data_length + 7 > TXPACKET_MAX_LEN or len(data) < data_length:
+            return None
+
+        if len(data) > data_length:
+            data = data[0: data_length]
+
+        self.buffer[PKT_PARAMETER0] = address
+        self.buffer[PKT_PARAMETER0 + 1: PKT_PARAMETER0 + 1 + data_length] = data
+
+        return self.finish(sts_id, data_length + 1)
+
+    def packSync(self, start_address, data_length, param, param_length):
+        # 8: HEADER0 HEADER1 ID LEN INST START_ADDR DATA_LEN CHKSUM
+        if param_length + 8 > TXPACKET_MAX_LEN or len(param) < param_length:
+            return None
+
+        if len(param) > param_length:
+            param = param[0: param_length]
+
+        self.buffer[PKT_PARAMETER0 + 0] = start_address
+        self.buffer[PKT_PARAMETER0 + 1] = data_length
+        self.buffer[PKT_PARAMETER0 + 2: PKT_PARAMETER0 + 2 + param_length] = param
+
+        return self.finish(BROADCAST_ID, param_length + 2)
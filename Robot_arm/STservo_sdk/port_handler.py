@@ -2,24 +2,52 @@
 
 import time
 import serial
+import select
 import sys
 import platform
 
+from .bus_scheduler import *
+
 DEFAULT_BAUDRATE = 1000000
 LATENCY_TIMER = 50 
 
 class PortHandler(object):
-    def __init__(self, port_name):
+    def __init__(self, port_name, blocking=False):
         self.is_open = False
         self.baudrate = DEFAULT_BAUDRATE
         self.packet_start_time = 0.0
         self.packet_timeout = 0.0
         self.tx_time_per_byte = 0.0
 
-        self.is_using = False
+        self.scheduler = BusScheduler()
         self.port_name = port_name
         self.ser = None
 
+        # blocking=True waits in select() until the requested bytes or the
+        # packet deadline instead of polling readPort in a busy loop
+        self.blocking = blocking
+        self.fd = None
+
+        # BusCapture logging every chunk read and written, None for no capture
+        self.capture = None
+
+    @property
+    def is_using(self):
+        return self.scheduler.isBusy()
+
+    @is_using.setter
+    def is_using(self, value):
+        if value:
+            self.scheduler.acquire()
+        else:
+            self.scheduler.release()
+
+    def acquireBus(self, priority=PRIORITY_TELEMETRY, key=None):
+        return self.scheduler.acquire(priority, key)
+
+    def releaseBus(self):
+        self.scheduler.release()
+
     def openPort(self):
         return self.setBaudRate(self.baudrate)
 
@@ -40,26 +68,76 @@ class PortHandler(object):
         baud = self.getCFlagBaud(baudrate)
 
         if baud <= 0:
-            # self.setupPort(38400)
-            # self.baudrate = baudrate
-            return False  # TODO: setCustomBaudrate(baudrate)
+            return self.setCustomBaudrate(baudrate)
         else:
             self.baudrate = baudrate
             return self.setupPort(baud)
 
+    def setCustomBaudrate(self, baudrate):
+        # pySerial sets rates outside the termios table through termios2
+        # (BOTHER) on Linux; the adapter still has to be able to divide to it
+        if platform.system() != "Linux" or baudrate <= 0:
+            return False
+
+        previous = self.baudrate
+        self.baudrate = baudrate
+        try:
+            return self.setupPort(baudrate)
+        except (ValueError, OSError, serial.SerialException):
+            self.baudrate = previous
+            if not self.is_open:
+                self.setupPort(previous)
+            return False
+
+    def isBaudRateSupported(self, baudrate):
+        # whether setBaudRate can get there, asked before the servos are moved
+        if self.getCFlagBaud(baudrate) > 0:
+            return True
+        return platform.system() == "Linux" and baudrate > 0
+
     def getBaudRate(self):
         return self.baudrate
 
+    def setCapture(self, capture):
+        self.capture = capture
+        if capture is not None:
+            capture.addBaudRate(self.baudrate)
+
+    def getCapture(self):
+        return self.capture
+
     def getBytesAvailable(self):
         return self.ser.in_waiting
 
     def readPort(self, length):
+        data = self.ser.read(length)
+        if self.blocking:
+            while len(data) < length and self.waitReadable():
+                data += self.ser.read(length - len(data))
+        if self.capture is not None and data:
+            self.capture.addRx(data)
+
         if (sys.version_info > (3, 0)):
-            return self.ser.read(length)
+            return data
         else:
-            return [ord(ch) for ch in self.ser.read(length)]
+            return [ord(ch) for ch in data]
+
+    def waitReadable(self):
+        remaining = self.packet_timeout - self.getTimeSinceStart()
+        if remaining <= 0:
+            return False
+
+        if self.fd is None:
+            # no selectable descriptor (Windows): sleep about one byte time
+            time.sleep(min(remaining, max(self.tx_time_per_byte, 0.1)) / 1000.0)
+            return True
+
+        readable, _, _ = select.select([self.fd], [], [], remaining / 1000.0)
+        return len(readable) > 0
 
     def writePort(self, packet):
+        if self.capture is not None:
+            self.capture.addTx(packet)
         return self.ser.write(packet)
 
     def setPacketTimeout(self, packet_length):
@@ -78,7 +156,7 @@ class PortHandler(object):
         return False
 
     def getCurrentTime(self):
-        return round(time.time() * 1000000000) / 1000000.0
+        return time.monotonic_ns() / 1000000.0
 
     def getTimeSinceStart(self):
         time_since = self.getCurrentTime() - self.packet_start_time
@@ -104,7 +182,14 @@ class PortHandler(object):
 
         self.ser.reset_input_buffer()
 
+        try:
+            self.fd = self.ser.fileno()
+        except (AttributeError, serial.SerialException):
+            self.fd = None
+
         self.tx_time_per_byte = (1000.0 / self.baudrate) * 10.0
+        if self.capture is not None:
+            self.capture.addBaudRate(self.baudrate)
 
         return True
 
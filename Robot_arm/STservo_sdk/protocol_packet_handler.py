@@ -1,18 +1,13 @@
 #!/usr/bin/env python
 
-from .stservo_def import *
-
-TXPACKET_MAX_LEN = 250
-RXPACKET_MAX_LEN = 250
+import threading
 
-# for Protocol Packet
-PKT_HEADER0 = 0
-PKT_HEADER1 = 1
-PKT_ID = 2
-PKT_LENGTH = 3
-PKT_INSTRUCTION = 4
-PKT_ERROR = 4
-PKT_PARAMETER0 = 5
+from .stservo_def import *
+from .packet_frame import *
+from .frame_decoder import *
+from .rtt_estimator import *
+from .bus_scheduler import *
+from .group_sync_read import *
 
 # Protocol Error bit
 ERRBIT_VOLTAGE = 1
@@ -27,6 +22,14 @@ class protocol_packet_handler(object):
         #self.sts_setend(protocol_end)# STServo bit end(STS/SMS=0, SCS=1)
         self.portHandler = portHandler
         self.sts_end = protocol_end
+        self.tx_frames = threading.local()  # every thread packs into its own buffers
+        self.rx_decoder = FrameDecoder()
+        self.rx_stale = False  # late replies of a failed transaction may still come in
+        self.rtt_estimator = None
+        self.rtt_request = None
+        self.register_cache = None
+        self.bus_metrics = None
+        self.retry_policy = None
 
     def sts_getend(self):
         return self.sts_end
@@ -73,6 +76,161 @@ class protocol_packet_handler(object):
         else:
             return w & 0xFF
         
+    def getTxFrame(self, instruction):
+        frames = getattr(self.tx_frames, "frames", None)
+        if frames is None:
+            frames = {}
+            self.tx_frames.frames = frames
+
+        frame = frames.get(instruction)
+        if frame is None:
+            frame = PacketFrame(instruction)
+            frames[instruction] = frame
+        return frame
+
+    def setRttEstimator(self, rtt_estimator):
+        # None restores the fixed LATENCY_TIMER response timeout
+        self.rtt_estimator = rtt_estimator
+        self.rtt_request = None
+
+    def getRttEstimator(self):
+        return self.rtt_estimator
+
+    def setResponseTimeout(self, sts_id, instruction, packet_length):
+        if self.rtt_estimator is None:
+            self.portHandler.setPacketTimeout(packet_length)
+            return
+
+        wire_time = self.portHandler.tx_time_per_byte * (packet_length + 3.0)
+        self.portHandler.setPacketTimeoutMillis(wire_time + self.rtt_estimator.getTimeout(sts_id, instruction))
+        self.rtt_request = (sts_id, instruction, wire_time)
+
+    def setBusMetrics(self, bus_metrics):
+        # None turns the per transaction instrumentation off
+        self.bus_metrics = bus_metrics
+
+    def getBusMetrics(self):
+        return self.bus_metrics
+
+    def updateResponseTime(self, result, rxpacket=None):
+        if result == COMM_RX_TIMEOUT or result == COMM_RX_CORRUPT:
+            self.rx_stale = True
+
+        if self.bus_metrics is not None:
+            self.bus_metrics.addResponse(result, rxpacket)
+
+        if self.rtt_estimator is None or self.rtt_request is None:
+            return
+
+        sts_id, instruction, wire_time = self.rtt_request
+        self.rtt_request = None
+
+        if result == COMM_SUCCESS:
+            rtt = self.portHandler.getTimeSinceStart() - wire_time
+            self.rtt_estimator.addSample(sts_id, instruction, max(rtt, 0.0))
+        elif result == COMM_RX_TIMEOUT or result == COMM_RX_CORRUPT:
+            # a corrupt result is mostly a reply cut off by the deadline
+            self.rtt_estimator.addTimeout(sts_id, instruction)
+
+    def setRetryPolicy(self, retry_policy):
+        # None returns every failure to the caller at once
+        self.retry_policy = retry_policy
+
+    def getRetryPolicy(self):
+        return self.retry_policy
+
+    def drainInput(self):
+        # drops what is left of a failed transaction before a retry; the
+        # bytes are read by the next writePacket, with the bus held, so the
+        # reply another thread waits for is never taken
+        self.rx_stale = True
+
+    def discardInput(self):
+        # writePacket once the bus is held
+        self.rx_stale = False
+        available = self.portHandler.getBytesAvailable()
+        while available > 0:
+            self.portHandler.readPort(available)
+            available = self.portHandler.getBytesAvailable()
+
+    def releaseTxOnly(self):
+        # ends a transaction that does not wait for a status packet
+        if self.bus_metrics is not None:
+            self.bus_metrics.addTxOnly()
+        self.portHandler.releaseBus()
+
+    def getStatusLength(self, txpacket):
+        # LENGTH of the status packet answering txpacket
+        if txpacket[PKT_INSTRUCTION] == INST_READ:
+            return txpacket[PKT_PARAMETER0 + 1] + 2
+        return 2  # ERROR CHECKSUM
+
+    def isStatusPacket(self, rxpacket, sts_id, status_length):
+        # the reply to the request in flight, not a late one to an earlier request
+        return rxpacket[PKT_ID] == sts_id and rxpacket[PKT_LENGTH] == status_length
+
+    def setRegisterCache(self, register_cache):
+        # None sends every read and write to the servo again
+        self.register_cache = register_cache
+
+    def getRegisterCache(self):
+        return self.register_cache
+
+    def readCache(self, sts_id, address, length):
+        if self.register_cache is None or sts_id >= BROADCAST_ID:
+            return None
+        return self.register_cache.lookup(sts_id, address, length)
+
+    def isEepromWrite(self, address, length):
+        # Address 0-39 : EEPROM, Address 55 (STS) / 48 (SCSCL) : Lock; these
+        # set how the servo answers (ID, baud rate, response level)
+        lock_address = 55 if self.sts_end == 0 else 48
+        return address < 40 or address <= lock_address < address + length
+
+    def isWriteCached(self, sts_id, address, length, data):
+        if self.register_cache is None or sts_id >= BROADCAST_ID or self.isEepromWrite(address, length):
+            return False
+        return self.register_cache.isUnchanged(sts_id, address, data[0: length])
+
+    def updateCache(self, sts_id, address, length, data, result, error):
+        if self.register_cache is None:
+            return
+
+        if result == COMM_RX_TIMEOUT:
+            # no answer: power cycled, or at another ID or baud rate by now
+            self.register_cache.invalidate(sts_id)
+        elif result != COMM_SUCCESS or error != 0 or sts_id >= BROADCAST_ID:
+            self.register_cache.invalidate(sts_id, address, length)
+        else:
+            self.register_cache.store(sts_id, address, data[0: length])
+
+    def updateWriteCache(self, sts_id, address, length, data, result, error):
+        if self.register_cache is None:
+            return
+
+        if self.isEepromWrite(address, length):
+            self.register_cache.invalidate(sts_id)
+        else:
+            self.updateCache(sts_id, address, length, data, result, error)
+
+    def invalidateCache(self, sts_id, address=None, length=None):
+        # the whole servo without a range or for a range in EEPROM
+        if self.register_cache is None:
+            return
+
+        if address is None or self.isEepromWrite(address, length):
+            self.register_cache.invalidate(sts_id)
+        else:
+            self.register_cache.invalidate(sts_id, address, length)
+
+    def updateSyncWriteCache(self, start_address, data_length, param, param_length, result):
+        if self.register_cache is None:
+            return
+
+        for index in range(0, param_length, data_length + 1):
+            self.updateWriteCache(param[index], start_address, data_length,
+                                  param[index + 1: index + 1 + data_length], result, 0)
+
     def getProtocolVersion(self):
         return 1.0
 
@@ -116,17 +274,33 @@ class protocol_packet_handler(object):
 
         return ""
 
-    def txPacket(self, txpacket):
-        checksum = 0
-        total_packet_length = txpacket[PKT_LENGTH] + 4  # 4: HEADER0 HEADER1 ID LENGTH
+    def getBusPriority(self, txpacket):
+        # goal writes go ahead of telemetry; a queued write to a register is
+        # made stale by a newer write to the same register of the same servo
+        instruction = txpacket[PKT_INSTRUCTION]
+        if instruction == INST_WRITE or instruction == INST_REG_WRITE:
+            return PRIORITY_CONTROL, (txpacket[PKT_ID], instruction, txpacket[PKT_PARAMETER0])
+        if instruction == INST_ACTION or instruction == INST_SYNC_WRITE:
+            return PRIORITY_CONTROL, None
+        return PRIORITY_TELEMETRY, None
 
-        if self.portHandler.is_using:
+    def txPacket(self, txpacket):
+        priority, key = self.getBusPriority(txpacket)
+        if not self.portHandler.acquireBus(priority, key):
             return COMM_PORT_BUSY
-        self.portHandler.is_using = True
+
+        result = self.writePacket(txpacket)
+        if result != COMM_SUCCESS:
+            self.portHandler.releaseBus()
+
+        return result
+
+    def writePacket(self, txpacket):
+        # txPacket once the bus is held
+        total_packet_length = txpacket[PKT_LENGTH] + 4  # 4: HEADER0 HEADER1 ID LENGTH
 
         # check max packet length
         if total_packet_length > TXPACKET_MAX_LEN:
-            self.portHandler.is_using = False
             return COMM_TX_ERROR
 
         # make packet header
@@ -134,94 +308,60 @@ class protocol_packet_handler(object):
         txpacket[PKT_HEADER1] = 0xFF
 
         # add a checksum to the packet
-        for idx in range(2, total_packet_length - 1):  # except header, checksum
-            checksum += txpacket[idx]
-
-        txpacket[total_packet_length - 1] = ~checksum & 0xFF
+        txpacket[total_packet_length - 1] = packet_checksum(txpacket, total_packet_length)
 
         #print "[TxPacket] %r" % txpacket
 
         # tx packet
+        self.rx_decoder.reset()
+        if self.rx_stale:
+            self.discardInput()
         self.portHandler.clearPort()
         written_packet_length = self.portHandler.writePort(txpacket)
-        if total_packet_length != written_packet_length:
-            self.portHandler.is_using = False
-            return COMM_TX_FAIL
+        result = COMM_SUCCESS if total_packet_length == written_packet_length else COMM_TX_FAIL
+        if self.bus_metrics is not None:
+            self.bus_metrics.addTxPacket(txpacket[PKT_ID], txpacket[PKT_INSTRUCTION], total_packet_length,
+                                         self.portHandler.tx_time_per_byte, result)
 
-        return COMM_SUCCESS
+        return result
 
     def rxPacket(self):
-        rxpacket = []
+        rxpacket, result = self.receivePacket()
 
+        self.portHandler.releaseBus()
+        return rxpacket, result
+
+    def receivePacket(self):
+        # rxPacket without ending the transaction
+        rxpacket = bytearray()
         result = COMM_TX_FAIL
-        checksum = 0
-        rx_length = 0
-        wait_length = 6  # minimum length (HEADER0 HEADER1 ID LENGTH ERROR CHKSUM)
+        decoder = self.rx_decoder
 
         while True:
-            rxpacket.extend(self.portHandler.readPort(wait_length - rx_length))
-            rx_length = len(rxpacket)
-            if rx_length >= wait_length:
-                # find packet header
-                for idx in range(0, (rx_length - 1)):
-                    if (rxpacket[idx] == 0xFF) and (rxpacket[idx + 1] == 0xFF):
-                        break
-
-                if idx == 0:  # found at the beginning of the packet
-                    if (rxpacket[PKT_ID] > 0xFD) or (rxpacket[PKT_LENGTH] > RXPACKET_MAX_LEN) or (
-                            rxpacket[PKT_ERROR] > 0x7F):
-                        # unavailable ID or unavailable Length or unavailable Error
-                        # remove the first byte in the packet
-                        del rxpacket[0]
-                        rx_length -= 1
-                        continue
-
-                    # re-calculate the exact length of the rx packet
-                    if wait_length != (rxpacket[PKT_LENGTH] + PKT_LENGTH + 1):
-                        wait_length = rxpacket[PKT_LENGTH] + PKT_LENGTH + 1
-                        continue
-
-                    if rx_length < wait_length:
-                        # check timeout
-                        if self.portHandler.isPacketTimeout():
-                            if rx_length == 0:
-                                result = COMM_RX_TIMEOUT
-                            else:
-                                result = COMM_RX_CORRUPT
-                            break
-                        else:
-                            continue
-
-                    # calculate checksum
-                    for i in range(2, wait_length - 1):  # except header, checksum
-                        checksum += rxpacket[i]
-                    checksum = ~checksum & 0xFF
-
-                    # verify checksum
-                    if rxpacket[wait_length - 1] == checksum:
-                        result = COMM_SUCCESS
-                    else:
-                        result = COMM_RX_CORRUPT
-                    break
+            if decoder.frames:
+                rxpacket, result = decoder.frames.popleft()
+                break
+
+            decoder.feed(self.portHandler.readPort(decoder.waitLength()))
+            if decoder.frames:
+                continue
 
+            # check timeout
+            if self.portHandler.isPacketTimeout():
+                if decoder.pending() == 0:
+                    result = COMM_RX_TIMEOUT
                 else:
-                    # remove unnecessary packets
-                    del rxpacket[0: idx]
-                    rx_length -= idx
-
-            else:
-                # check timeout
-                if self.portHandler.isPacketTimeout():
-                    if rx_length == 0:
-                        result = COMM_RX_TIMEOUT
-                    else:
-                        result = COMM_RX_CORRUPT
-                    break
-
-        self.portHandler.is_using = False
+                    result = COMM_RX_CORRUPT
+                break
+
         return rxpacket, result
 
     def txRxPacket(self, txpacket):
+        if self.retry_policy is not None and txpacket[PKT_ID] != BROADCAST_ID:
+            return self.retry_policy.run(self, lambda: self.txRxPacketOnce(txpacket), lambda outcome: outcome[1])
+        return self.txRxPacketOnce(txpacket)
+
+    def txRxPacketOnce(self, txpacket):
         rxpacket = None
         error = 0
 
@@ -232,22 +372,26 @@ class protocol_packet_handler(object):
 
         # (ID == Broadcast ID) == no need to wait for status packet or not available
         if (txpacket[PKT_ID] == BROADCAST_ID):
-            self.portHandler.is_using = False
+            self.portHandler.releaseBus()
             return rxpacket, result, error
 
         # set packet timeout
         if txpacket[PKT_INSTRUCTION] == INST_READ:
-            self.portHandler.setPacketTimeout(txpacket[PKT_PARAMETER0 + 1] + 6)
+            self.setResponseTimeout(txpacket[PKT_ID], INST_READ, txpacket[PKT_PARAMETER0 + 1] + 6)
         else:
-            self.portHandler.setPacketTimeout(6)  # HEADER0 HEADER1 ID LENGTH ERROR CHECKSUM
+            self.setResponseTimeout(txpacket[PKT_ID], txpacket[PKT_INSTRUCTION], 6)  # HEADER0 HEADER1 ID LENGTH ERROR CHECKSUM
 
         # rx packet
+        status_length = self.getStatusLength(txpacket)
         while True:
-            rxpacket, result = self.rxPacket()
-            if result != COMM_SUCCESS or txpacket[PKT_ID] == rxpacket[PKT_ID]:
+            rxpacket, result = self.receivePacket()
+            if result != COMM_SUCCESS or self.isStatusPacket(rxpacket, txpacket[PKT_ID], status_length):
                 break
 
-        if result == COMM_SUCCESS and txpacket[PKT_ID] == rxpacket[PKT_ID]:
+        self.updateResponseTime(result, rxpacket)
+        self.portHandler.releaseBus()
+
+        if result == COMM_SUCCESS:
             error = rxpacket[PKT_ERROR]
 
         return rxpacket, result, error
@@ -256,14 +400,10 @@ class protocol_packet_handler(object):
         model_number = 0
         error = 0
 
-        txpacket = [0] * 6
-
         if sts_id >= BROADCAST_ID:
             return model_number, COMM_NOT_AVAILABLE, error
 
-        txpacket[PKT_ID] = sts_id
-        txpacket[PKT_LENGTH] = 2
-        txpacket[PKT_INSTRUCTION] = INST_PING
+        txpacket = self.getTxFrame(INST_PING).pack(sts_id)
 
         rxpacket, result, error = self.txRxPacket(txpacket)
 
@@ -275,34 +415,23 @@ class protocol_packet_handler(object):
         return model_number, result, error
 
     def action(self, sts_id):
-        txpacket = [0] * 6
-
-        txpacket[PKT_ID] = sts_id
-        txpacket[PKT_LENGTH] = 2
-        txpacket[PKT_INSTRUCTION] = INST_ACTION
+        txpacket = self.getTxFrame(INST_ACTION).pack(sts_id)
 
         _, result, _ = self.txRxPacket(txpacket)
 
         return result
 
     def readTx(self, sts_id, address, length):
-
-        txpacket = [0] * 8
-
         if sts_id >= BROADCAST_ID:
             return COMM_NOT_AVAILABLE
 
-        txpacket[PKT_ID] = sts_id
-        txpacket[PKT_LENGTH] = 4
-        txpacket[PKT_INSTRUCTION] = INST_READ
-        txpacket[PKT_PARAMETER0 + 0] = address
-        txpacket[PKT_PARAMETER0 + 1] = length
+        txpacket = self.getTxFrame(INST_READ).packAddress(sts_id, address, (length,), 1)
 
         result = self.txPacket(txpacket)
 
         # set packet timeout
         if result == COMM_SUCCESS:
-            self.portHandler.setPacketTimeout(length + 6)
+            self.setResponseTimeout(sts_id, INST_READ, length + 6)
 
         return result
 
@@ -314,37 +443,47 @@ class protocol_packet_handler(object):
         data = []
 
         while True:
-            rxpacket, result = self.rxPacket()
+            rxpacket, result = self.receivePacket()
 
-            if result != COMM_SUCCESS or rxpacket[PKT_ID] == sts_id:
+            if result != COMM_SUCCESS or self.isStatusPacket(rxpacket, sts_id, length + 2):
                 break
 
-        if result == COMM_SUCCESS and rxpacket[PKT_ID] == sts_id:
+        self.updateResponseTime(result, rxpacket)
+        self.portHandler.releaseBus()
+
+        if result == COMM_SUCCESS:
             error = rxpacket[PKT_ERROR]
 
             data.extend(rxpacket[PKT_PARAMETER0 : PKT_PARAMETER0+length])
 
+        return self.checkReadLength(data, length, result, error)
+
+    def checkReadLength(self, data, length, result, error):
+        # a short reply fails instead of reaching the byte helpers
+        if result == COMM_SUCCESS and len(data) != length:
+            return [], COMM_RX_CORRUPT, error
         return data, result, error
 
     def readTxRx(self, sts_id, address, length):
-        txpacket = [0] * 8
         data = []
 
         if sts_id >= BROADCAST_ID:
             return data, COMM_NOT_AVAILABLE, 0
 
-        txpacket[PKT_ID] = sts_id
-        txpacket[PKT_LENGTH] = 4
-        txpacket[PKT_INSTRUCTION] = INST_READ
-        txpacket[PKT_PARAMETER0 + 0] = address
-        txpacket[PKT_PARAMETER0 + 1] = length
+        cached = self.readCache(sts_id, address, length)
+        if cached is not None:
+            return cached, COMM_SUCCESS, 0
+
+        txpacket = self.getTxFrame(INST_READ).packAddress(sts_id, address, (length,), 1)
 
         rxpacket, result, error = self.txRxPacket(txpacket)
         if result == COMM_SUCCESS:
             error = rxpacket[PKT_ERROR]
 
             data.extend(rxpacket[PKT_PARAMETER0 : PKT_PARAMETER0+length])
+        data, result, error = self.checkReadLength(data, length, result, error)
 
+        self.updateCache(sts_id, address, length, data, result, error)
         return data, result, error
 
     def read1ByteTx(self, sts_id, address):
@@ -389,31 +528,31 @@ class protocol_packet_handler(object):
         return data_read, result, error
 
     def writeTxOnly(self, sts_id, address, length, data):
-        txpacket = [0] * (length + 7)
-
-        txpacket[PKT_ID] = sts_id
-        txpacket[PKT_LENGTH] = length + 3
-        txpacket[PKT_INSTRUCTION] = INST_WRITE
-        txpacket[PKT_PARAMETER0] = address
+        if self.isWriteCached(sts_id, address, length, data):
+            return COMM_SUCCESS
 
-        txpacket[PKT_PARAMETER0 + 1: PKT_PARAMETER0 + 1 + length] = data[0: length]
+        txpacket = self.getTxFrame(INST_WRITE).packAddress(sts_id, address, data, length)
+        if txpacket is None:
+            return COMM_TX_ERROR
 
         result = self.txPacket(txpacket)
-        self.portHandler.is_using = False
+        if result == COMM_SUCCESS:
+            self.releaseTxOnly()
 
+        self.updateWriteCache(sts_id, address, length, data, result, 0)
         return result
 
     def writeTxRx(self, sts_id, address, length, data):
-        txpacket = [0] * (length + 7)
+        if self.isWriteCached(sts_id, address, length, data):
+            return COMM_SUCCESS, 0
 
-        txpacket[PKT_ID] = sts_id
-        txpacket[PKT_LENGTH] = length + 3
-        txpacket[PKT_INSTRUCTION] = INST_WRITE
-        txpacket[PKT_PARAMETER0] = address
+        txpacket = self.getTxFrame(INST_WRITE).packAddress(sts_id, address, data, length)
+        if txpacket is None:
+            return COMM_TX_ERROR, 0
 
-        txpacket[PKT_PARAMETER0 + 1: PKT_PARAMETER0 + 1 + length] = data[0: length]
         rxpacket, result, error = self.txRxPacket(txpacket)
 
+        self.updateWriteCache(sts_id, address, length, data, result, error)
         return result, error
 
     def write1ByteTxOnly(self, sts_id, address, data):
@@ -447,84 +586,99 @@ class protocol_packet_handler(object):
         return self.writeTxRx(sts_id, address, 4, data_write)
 
     def regWriteTxOnly(self, sts_id, address, length, data):
-        txpacket = [0] * (length + 7)
-
-        txpacket[PKT_ID] = sts_id
-        txpacket[PKT_LENGTH] = length + 3
-        txpacket[PKT_INSTRUCTION] = INST_REG_WRITE
-        txpacket[PKT_PARAMETER0] = address
+        txpacket = self.getTxFrame(INST_REG_WRITE).packAddress(sts_id, address, data, length)
+        if txpacket is None:
+            return COMM_TX_ERROR
 
-        txpacket[PKT_PARAMETER0 + 1: PKT_PARAMETER0 + 1 + length] = data[0: length]
+        self.invalidateCache(sts_id, address, length)  # applied only at ACTION
 
         result = self.txPacket(txpacket)
-        self.portHandler.is_using = False
+        if result == COMM_SUCCESS:
+            self.releaseTxOnly()
 
         return result
 
     def regWriteTxRx(self, sts_id, address, length, data):
-        txpacket = [0] * (length + 7)
+        txpacket = self.getTxFrame(INST_REG_WRITE).packAddress(sts_id, address, data, length)
+        if txpacket is None:
+            return COMM_TX_ERROR, 0
 
-        txpacket[PKT_ID] = sts_id
-        txpacket[PKT_LENGTH] = length + 3
-        txpacket[PKT_INSTRUCTION] = INST_REG_WRITE
-        txpacket[PKT_PARAMETER0] = address
-
-        txpacket[PKT_PARAMETER0 + 1: PKT_PARAMETER0 + 1 + length] = data[0: length]
+        self.invalidateCache(sts_id, address, length)  # applied only at ACTION
 
         _, result, error = self.txRxPacket(txpacket)
 
         return result, error
 
     def syncReadTx(self, start_address, data_length, param, param_length):
-        txpacket = [0] * (param_length + 8)
-        # 8: HEADER0 HEADER1 ID LEN INST START_ADDR DATA_LEN CHKSUM
-
-        txpacket[PKT_ID] = BROADCAST_ID
-        txpacket[PKT_LENGTH] = param_length + 4  # 7: INST START_ADDR DATA_LEN CHKSUM
-        txpacket[PKT_INSTRUCTION] = INST_SYNC_READ
-        txpacket[PKT_PARAMETER0 + 0] = start_address
-        txpacket[PKT_PARAMETER0 + 1] = data_length
-
-        txpacket[PKT_PARAMETER0 + 2: PKT_PARAMETER0 + 2 + param_length] = param[0: param_length]
+        txpacket = self.getTxFrame(INST_SYNC_READ).packSync(start_address, data_length, param, param_length)
+        if txpacket is None:
+            return COMM_TX_ERROR
 
-        # print(txpacket)
         result = self.txPacket(txpacket)
         return result
 
     def syncReadRx(self, data_length, param_length):
         wait_length = (6 + data_length) * param_length
-        self.portHandler.setPacketTimeout(wait_length)
-        rxpacket = []
-        rx_length = 0
-        while True:
-            rxpacket.extend(self.portHandler.readPort(wait_length - rx_length))
-            rx_length = len(rxpacket)
-            if rx_length >= wait_length:
-                result = COMM_SUCCESS
+        self.setResponseTimeout(BROADCAST_ID, INST_SYNC_READ, wait_length)
+
+        rxpacket = bytearray()
+        rx_count = 0
+        corrupt = False
+        while rx_count < param_length:
+            frame = self.rx_decoder.pop()
+            if frame is not None:
+                packet, result = frame
+                # keep only complete status packets of the expected size
+                if result == COMM_SUCCESS and packet[PKT_LENGTH] == data_length + 2:
+                    rxpacket.extend(packet)
+                    rx_count += 1
+                else:
+                    corrupt = True
+                continue
+
+            self.rx_decoder.feed(self.portHandler.readPort(
+                max(wait_length - len(rxpacket) - self.rx_decoder.pending(), 1)))
+            if self.rx_decoder.hasFrame():
+                continue
+
+            # check timeout
+            if self.portHandler.isPacketTimeout():
                 break
-            else:
-                # check timeout
-                if self.portHandler.isPacketTimeout():
-                    if rx_length == 0:
-                        result = COMM_RX_TIMEOUT
-                    else:
-                        result = COMM_RX_CORRUPT
-                    break
-        self.portHandler.is_using = False
-        return result, rxpacket
 
-    def syncWriteTxOnly(self, start_address, data_length, param, param_length):
-        txpacket = [0] * (param_length + 8)
-        # 8: HEADER0 HEADER1 ID LEN INST START_ADDR DATA_LEN ... CHKSUM
+        if rx_count == param_length:
+            result = COMM_SUCCESS
+        elif rx_count == 0 and not corrupt and self.rx_decoder.pending() == 0:
+            result = COMM_RX_TIMEOUT
+        else:
+            result = COMM_RX_CORRUPT
 
-        txpacket[PKT_ID] = BROADCAST_ID
-        txpacket[PKT_LENGTH] = param_length + 4  # 4: INST START_ADDR DATA_LEN ... CHKSUM
-        txpacket[PKT_INSTRUCTION] = INST_SYNC_WRITE
-        txpacket[PKT_PARAMETER0 + 0] = start_address
-        txpacket[PKT_PARAMETER0 + 1] = data_length
+        self.updateResponseTime(result, rxpacket)
+        self.portHandler.releaseBus()
 
-        txpacket[PKT_PARAMETER0 + 2: PKT_PARAMETER0 + 2 + param_length] = param[0: param_length]
+        return result, rxpacket
+
+    def getSyncReadGroup(self, sts_ids, start_address, data_length):
+        groupSyncRead = GroupSyncRead(self, start_address, data_length)
+        for sts_id in sts_ids:
+            groupSyncRead.addParam(sts_id)
+        return groupSyncRead
+
+    def getSyncReadData(self, groupSyncRead):
+        # {ID: (data, error)} of the servos whose reply arrived intact
+        data = {}
+        for sts_id in groupSyncRead.data_dict:
+            available, error = groupSyncRead.isAvailable(sts_id, groupSyncRead.start_address,
+                                                         groupSyncRead.data_length)
+            if available:
+                data[sts_id] = (groupSyncRead.data_dict[sts_id][1:], error)
+        return data
+
+    def syncWriteTxOnly(self, start_address, data_length, param, param_length):
+        txpacket = self.getTxFrame(INST_SYNC_WRITE).packSync(start_address, data_length, param, param_length)
+        if txpacket is None:
+            return COMM_TX_ERROR
 
         _, result, _ = self.txRxPacket(txpacket)
 
+        self.updateSyncWriteCache(start_address, data_length, param, param_length, result)
         return result
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+
+import threading
+import time
+
+from .stservo_def import *
+from .sts import *
+
+# Register classes of the memory table, same split for STS and SCSCL
+REGISTER_EEPROM = 0  # below STS_TORQUE_ENABLE
+REGISTER_SRAM_RW = 1  # STS_TORQUE_ENABLE .. STS_PRESENT_POSITION_L - 1
+REGISTER_SRAM_RO = 2  # STS_PRESENT_POSITION_L and up
+
+MEMORY_TABLE_SIZE = 256
+
+# ms a cached value stays usable, None: until invalidated
+DEFAULT_MAX_AGE = {
+    REGISTER_EEPROM: None,  # until a timeout, EEPROM write or baud change
+    REGISTER_SRAM_RW: 1000.0,  # a power cycle or overload resets it
+    REGISTER_SRAM_RO: 0.0,  # measured values, always read
+}
+
+
+def getRegisterClass(address):
+    if address < STS_TORQUE_ENABLE:
+        return REGISTER_EEPROM
+    if address < STS_PRESENT_POSITION_L:
+        return REGISTER_SRAM_RW
+    return REGISTER_SRAM_RO
+
+
+class ServoShadow(object):
+    def __init__(self):
+        self.values = bytearray(MEMORY_TABLE_SIZE)
+        self.stamps = [None] * MEMORY_TABLE_SIZE  # ms of the last read or confirmed write
+
+
+class RegisterCache(object):
+    # Shadow of the memory table of every servo, attached to a packet handler
+    # with setRegisterCache(). Reads inside the staleness bound of their
+    # register class are answered from the shadow and writes of the values
+    # the shadow already holds are not sent. Entries are filled by successful
+    # reads, sync reads and writes, and dropped when a transaction fails or
+    # the servo reports an error. A servo that times out, gets a write to
+    # EEPROM or the lock, or is moved to another baud rate loses all of its
+    # entries, and writes to EEPROM or the lock are always sent.
+    def __init__(self, max_age=None):
+        self.lock = threading.Lock()
+        self.servos = {}
+        self.max_age = dict(DEFAULT_MAX_AGE)
+        if max_age is not None:
+            self.max_age.update(max_age)
+        self.resetStats()
+
+    def resetStats(self):
+        with self.lock:
+            self.stats = {
+                "hits": 0,
+                "misses": 0,
+                "writes": 0,
+                "suppressed_writes": 0,
+                "invalidations": 0,
+            }
+
+    def setMaxAge(self, register_class, msec):
+        self.max_age[register_class] = msec
+
+    def getCurrentTime(self):
+        return time.monotonic_ns() / 1000000.0
+
+    def isFresh(self, shadow, address, length, now):
+        if address + length > MEMORY_TABLE_SIZE:
+            return False
+
+        for index in range(address, address + length):
+            stamp = shadow.stamps[index]
+            if stamp is None:
+                return False
+            max_age = self.max_age[getRegisterClass(index)]
+            if max_age is not None and now - stamp > max_age:
+                return False
+        return True
+
+    def lookup(self, sts_id, address, length):
+        # the cached bytes, or None when a read has to go to the servo
+        with self.lock:
+            shadow = self.servos.get(sts_id)
+            if shadow is None or not self.isFresh(shadow, address, length, self.getCurrentTime()):
+                self.stats["misses"] += 1
+                return None
+
+            self.stats["hits"] += 1
+            return list(shadow.values[address: address + length])
+
+    def isUnchanged(self, sts_id, address, data):
+        # True when the servo already holds data, the write can be skipped
+        with self.lock:
+            self.stats["writes"] += 1
+            shadow = self.servos.get(sts_id)
+            if shadow is None or not self.isFresh(shadow, address, len(data), self.getCurrentTime()):
+                return False
+            if shadow.values[address: address + len(data)] != bytearray(data):
+                return False
+
+            self.stats["suppressed_writes"] += 1
+            return True
+
+    def store(self, sts_id, address, data):
+        if sts_id >= BROADCAST_ID or address + len(data) > MEMORY_TABLE_SIZE:
+            return
+
+        with self.lock:
+            shadow = self.servos.get(sts_id)
+            if shadow is None:
+                shadow = ServoShadow()
+                self.servos[sts_id] = shadow
+
+            now = self.getCurrentTime()
+            shadow.values[address: address + len(data)] = bytearray(data)
+            for index in range(address, address + len(data)):
+                shadow.stamps[index] = now
+
+    def invalidate(self, sts_id, address=0, length=MEMORY_TABLE_SIZE):
+        # BROADCAST_ID drops the range on every servo
+        with self.lock:
+            self.stats["invalidations"] += 1
+            if sts_id == BROADCAST_ID:
+                shadows = list(self.servos.values())
+            else:
+                shadows = [self.servos[sts_id]] if sts_id in self.servos else []
+
+            for shadow in shadows:
+                for index in range(address, min(address + length, MEMORY_TABLE_SIZE)):
+                    shadow.stamps[index] = None
+
+    def clear(self):
+        with self.lock:
+            self.servos.clear()
+
+    def getStats(self):
+        with self.lock:
+            stats = dict(self.stats)
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_rate"] = stats["hits"] / float(lookups) if lookups else 0.0
+            stats["servos"] = len(self.servos)
+            return stats
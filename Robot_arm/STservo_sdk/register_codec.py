@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+
+import numpy as np
+
+from .stservo_def import *
+from .packet_frame import *
+
+# Batch versions of the protocol_packet_handler byte helpers for many
+# servos at once. end is sts_end (0: STS little endian, 1: SCS big endian),
+# sign_bit the sign-magnitude bit (15: STS position/speed, 10: SCSCL PWM).
+# Every function gives the same values as the scalar helpers; for a sign
+# bit below 15 the bits above it have to be clear, as they are for PWM.
+
+STS_SIGN_BIT = 15
+SCSCL_PWM_SIGN_BIT = 10
+
+WORD_DTYPE = {0: np.dtype("<u2"), 1: np.dtype(">u2")}
+
+# sts.SyncWritePosEx parameter row: ID, then ACC, GOAL_POSITION, GOAL_TIME and
+# GOAL_SPEED from STS_ACC
+POS_EX_DTYPE = dict((end, np.dtype([("id", np.uint8), ("acc", np.uint8), ("position", word),
+                                     ("time", word), ("speed", word)]))
+                    for end, word in WORD_DTYPE.items())
+
+
+def encode_sign_magnitude(values, sign_bit=STS_SIGN_BIT):
+    # sts_toscs
+    values = np.asarray(values)
+    words = np.abs(values).astype(np.uint16)
+    words[values < 0] |= 1 << sign_bit
+    return words
+
+
+def decode_sign_magnitude(words, sign_bit=STS_SIGN_BIT):
+    # sts_tohost
+    words = np.asarray(words, dtype=np.uint16)
+    sign = 1 << sign_bit
+    values = (words & (0xFFFF ^ sign)).astype(np.int16)
+    np.negative(values, out=values, where=(words & sign) != 0)
+    return values
+
+
+def pack_words(values, end=0):
+    # sts_lobyte/sts_hibyte, one row of two bytes per value in wire order
+    return np.asarray(values).astype(WORD_DTYPE[end]).view(np.uint8).reshape(-1, 2)
+
+
+def unpack_words(block, end=0):
+    # sts_makeword over the rows of an (n, 2) byte block
+    block = np.ascontiguousarray(block, dtype=np.uint8)
+    return block.view(WORD_DTYPE[end]).reshape(-1).astype(np.uint16)
+
+
+def pack_sync_write(sts_ids, columns):
+    # GroupSyncWrite parameter block: per servo its ID followed by the columns,
+    # each an (n,) byte array or an (n, 2) block from pack_words
+    rows = [np.asarray(sts_ids, dtype=np.uint8).reshape(-1, 1)]
+    for column in columns:
+        column = np.asarray(column, dtype=np.uint8)
+        rows.append(column.reshape(len(rows[0]), -1))
+    return np.hstack(rows).tobytes()
+
+
+def pack_pos_ex(sts_ids, positions, speeds, accs, end=0, sign_bit=STS_SIGN_BIT):
+    # sts.SyncWritePosEx for all servos in one block; negative positions and
+    # speeds go out sign-magnitude, as the servo reads them
+    block = np.zeros(len(sts_ids), dtype=POS_EX_DTYPE[end])
+    block["id"] = sts_ids
+    block["acc"] = accs
+    block["position"] = encode_sign_magnitude(positions, sign_bit)
+    block["speed"] = encode_sign_magnitude(speeds, sign_bit)
+    return block.tobytes()
+
+
+def sync_read_frames(rxpacket, data_length, offset, shape, dtype):
+    # strided view of the same field in every status packet of a sync read
+    # response (equal size packets back to back, as syncReadRx returns them)
+    frame_length = data_length + 6  # HEADER0 HEADER1 ID LENGTH ERROR DATA... CHECKSUM
+    count = len(rxpacket) // frame_length
+    if count == 0:
+        return np.empty((0,) + shape, dtype=dtype)
+
+    itemsize = np.dtype(dtype).itemsize
+    return np.ndarray((count,) + shape, dtype=dtype, buffer=rxpacket, offset=offset,
+                      strides=(frame_length,) + (itemsize,) * len(shape))
+
+
+def split_sync_read(rxpacket, data_length):
+    # IDs, errors and the (n, data_length) data block of a sync read response
+    return (sync_read_frames(rxpacket, data_length, PKT_ID, (), np.uint8).copy(),
+            sync_read_frames(rxpacket, data_length, PKT_ERROR, (), np.uint8).copy(),
+            sync_read_frames(rxpacket, data_length, PKT_PARAMETER0, (data_length,), np.uint8).copy())
+
+
+def sync_read_words(rxpacket, data_length, address_offset, count=1, end=0):
+    # count words from address_offset into the data of every status packet,
+    # as an (n, count) uint16 array
+    return sync_read_frames(rxpacket, data_length, PKT_PARAMETER0 + address_offset, (count,),
+                            WORD_DTYPE[end]).astype(np.uint16)
+
+
+def decode_pos_speed(rxpacket, end=0, position_sign_bit=STS_SIGN_BIT, speed_sign_bit=STS_SIGN_BIT):
+    # position and speed arrays of a sync read of 4 bytes from
+    # PRESENT_POSITION_L; None keeps a field unsigned (SCSCL positions)
+    words = sync_read_words(rxpacket, 4, 0, 2, end)
+    if position_sign_bit is not None and position_sign_bit == speed_sign_bit:
+        values = decode_sign_magnitude(words, position_sign_bit)
+        return values[:, 0], values[:, 1]
+
+    positions = words[:, 0]
+    speeds = words[:, 1]
+    if position_sign_bit is not None:
+        positions = decode_sign_magnitude(positions, position_sign_bit)
+    if speed_sign_bit is not None:
+        speeds = decode_sign_magnitude(speeds, speed_sign_bit)
+    return positions, speeds
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+
+import asyncio
+import threading
+import time
+
+from .stservo_def import *
+
+# results worth another attempt: the servo did not answer or the answer got
+# garbled on the wire. A servo error bit arrives with COMM_SUCCESS and is
+# not retried.
+RETRY_RESULTS = (COMM_TX_FAIL, COMM_RX_TIMEOUT, COMM_RX_CORRUPT)
+
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BACKOFF = 1.0  # ms before the first retry
+DEFAULT_BACKOFF_FACTOR = 2.0
+DEFAULT_MAX_BACKOFF = 20.0  # ms
+
+
+class RetryPolicy(object):
+    # Retries transactions that failed on the bus, attached to a packet
+    # handler with setRetryPolicy(). Covers txRxPacket (ping, reads, writes,
+    # reg writes with status reply) and GroupSyncRead.txRxPacket. Before every
+    # retry the policy waits the backoff, so late replies of the failed
+    # attempt are in, and has the retry drain the input once it holds the
+    # bus, so they cannot be taken for the reply of the retry.
+    #
+    # deadline: ms budget of one call including its retries, None for no
+    #           limit; a retry is only started if the attempt before it
+    #           plus the backoff still fit
+    # recovered: calls that failed at first and succeeded on a retry
+    # failed: calls that still failed after their last attempt, or that the
+    #         deadline left no room to retry
+    def __init__(self, max_attempts=DEFAULT_MAX_ATTEMPTS, backoff=DEFAULT_BACKOFF,
+                 backoff_factor=DEFAULT_BACKOFF_FACTOR, max_backoff=DEFAULT_MAX_BACKOFF,
+                 retry_results=RETRY_RESULTS, deadline=None):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.retry_results = tuple(retry_results)
+        self.deadline = deadline
+        self.lock = threading.Lock()
+        self.resetStats()
+
+    def resetStats(self):
+        with self.lock:
+            self.stats = {
+                "calls": 0,
+                "retries": 0,
+                "recovered": 0,
+                "failed": 0,
+                "out_of_budget": 0,
+            }
+
+    def getStats(self):
+        with self.lock:
+            return dict(self.stats)
+
+    def getBackoff(self, attempt):
+        # ms before retry number attempt (1: first retry)
+        return min(self.backoff * self.backoff_factor ** (attempt - 1), self.max_backoff)
+
+    def getRetryDelay(self, result, attempt, start, attempt_start):
+        # ms to wait before the next attempt, None to give up
+        if result not in self.retry_results or attempt >= self.max_attempts:
+            return None
+
+        delay = self.getBackoff(attempt)
+        if self.deadline is not None:
+            now = time.monotonic()
+            elapsed = (now - start) * 1000.0
+            attempt_time = (now - attempt_start) * 1000.0
+            if elapsed + delay + attempt_time > self.deadline:
+                with self.lock:
+                    self.stats["out_of_budget"] += 1
+                return None
+        return delay
+
+    def countCall(self, result, attempt):
+        with self.lock:
+            self.stats["calls"] += 1
+            self.stats["retries"] += attempt - 1
+            if result == COMM_SUCCESS:
+                if attempt > 1:
+                    self.stats["recovered"] += 1
+            elif result in self.retry_results:
+                self.stats["failed"] += 1
+
+    def run(self, packetHandler, transaction, getResult):
+        # transaction() once per attempt, getResult(outcome) its COMM result
+        start = time.monotonic()
+        attempt = 1
+        while True:
+            attempt_start = time.monotonic()
+            outcome = transaction()
+            result = getResult(outcome)
+            delay = self.getRetryDelay(result, attempt, start, attempt_start) if result != COMM_SUCCESS else None
+            if delay is None:
+                self.countCall(result, attempt)
+                return outcome
+
+            time.sleep(delay / 1000.0)
+            packetHandler.drainInput()
+            attempt += 1
+
+    async def runAsync(self, packetHandler, transaction, getResult):
+        # run() for the asyncio handlers, transaction() returns an awaitable
+        start = time.monotonic()
+        attempt = 1
+        while True:
+            attempt_start = time.monotonic()
+            outcome = await transaction()
+            result = getResult(outcome)
+            delay = self.getRetryDelay(result, attempt, start, attempt_start) if result != COMM_SUCCESS else None
+            if delay is None:
+                self.countCall(result, attempt)
+                return outcome
+
+            await asyncio.sleep(delay / 1000.0)
+            packetHandler.drainInput()
+            attempt += 1
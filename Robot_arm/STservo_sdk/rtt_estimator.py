@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+
+from .port_handler import LATENCY_TIMER
+
+# Jacobson/Karels estimator constants, as used for TCP retransmission timers
+RTT_ALPHA = 0.125  # gain of the smoothed round trip time
+RTT_BETA = 0.25  # gain of the round trip time variation
+RTT_K = 4.0  # variation multiplier in the timeout
+RTT_MAX_BACKOFF = 64
+
+RTT_MIN_TIMEOUT = 5.0  # ms, above the scheduling jitter of a desktop OS
+RTT_MAX_TIMEOUT = LATENCY_TIMER  # ms
+
+
+class RttEstimate(object):
+    def __init__(self):
+        self.srtt = 0.0
+        self.rttvar = 0.0
+        self.samples = 0
+        self.timeouts = 0
+        self.backoff = 1
+
+    def addSample(self, rtt):
+        if self.samples == 0:
+            self.srtt = rtt
+            self.rttvar = rtt / 2.0
+        else:
+            self.rttvar = (1.0 - RTT_BETA) * self.rttvar + RTT_BETA * abs(self.srtt - rtt)
+            self.srtt = (1.0 - RTT_ALPHA) * self.srtt + RTT_ALPHA * rtt
+        self.samples += 1
+        self.backoff = 1
+
+    def addTimeout(self):
+        self.timeouts += 1
+        self.backoff = min(self.backoff * 2, RTT_MAX_BACKOFF)
+
+    def getTimeout(self):
+        return (self.srtt + RTT_K * self.rttvar) * self.backoff
+
+
+class RttEstimator(object):
+    # Learns the response time of every (servo ID, instruction) pair. Times
+    # are in ms and exclude the wire time of the status packet, so one
+    # estimate serves reads of any length. A pair without samples borrows
+    # the estimate of its instruction across all servos, which is what makes
+    # a missing servo fail within a few ms instead of after LATENCY_TIMER.
+    def __init__(self, min_timeout=RTT_MIN_TIMEOUT, max_timeout=RTT_MAX_TIMEOUT):
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.estimates = {}
+        self.instruction_estimates = {}
+        self.bus_estimate = RttEstimate()
+
+    def addSample(self, sts_id, instruction, rtt):
+        key = (sts_id, instruction)
+        if key not in self.estimates:
+            self.estimates[key] = RttEstimate()
+        if instruction not in self.instruction_estimates:
+            self.instruction_estimates[instruction] = RttEstimate()
+
+        self.estimates[key].addSample(rtt)
+        self.instruction_estimates[instruction].addSample(rtt)
+        self.bus_estimate.addSample(rtt)
+
+    def addTimeout(self, sts_id, instruction):
+        key = (sts_id, instruction)
+        if key not in self.estimates:
+            self.estimates[key] = RttEstimate()
+
+        # only back off a servo that has answered before, an absent one keeps
+        # the short shared estimate
+        estimate = self.estimates[key]
+        if estimate.samples > 0:
+            estimate.addTimeout()
+        else:
+            estimate.timeouts += 1
+
+    def getTimeout(self, sts_id, instruction):
+        estimate = self.estimates.get((sts_id, instruction))
+        if estimate is None or estimate.samples == 0:
+            estimate = self.instruction_estimates.get(instruction)
+        if estimate is None or estimate.samples == 0:
+            estimate = self.bus_estimate
+        if estimate.samples == 0:
+            return self.max_timeout
+
+        return min(max(estimate.getTimeout(), self.min_timeout), self.max_timeout)
+
+    def getEstimates(self):
+        estimates = {}
+        for key, estimate in self.estimates.items():
+            estimates[key] = {
+                "srtt": estimate.srtt,
+                "rttvar": estimate.rttvar,
+                "timeout": self.getTimeout(key[0], key[1]),
+                "samples": estimate.samples,
+                "timeouts": estimate.timeouts,
+            }
+        return estimates
+
+    def clear(self):
+        self.estimates.clear()
+        self.instruction_estimates.clear()
+        self.bus_estimate = RttEstimate()
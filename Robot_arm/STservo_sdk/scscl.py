@@ -3,6 +3,8 @@
 from .stservo_def import *
 from .protocol_packet_handler import *
 from .group_sync_write import *
+from .group_reg_write import *
+from .servo_state import *
 
 #波特率定义
 SCSCL_1M = 0
@@ -56,9 +58,10 @@ class scscl(protocol_packet_handler):
     def __init__(self, portHandler):
         protocol_packet_handler.__init__(self, portHandler, 1)
         self.groupSyncWrite = GroupSyncWrite(self, SCSCL_GOAL_POSITION_L, 6)
+        self.groupRegWrite = GroupRegWrite(self)
 
     def WritePos(self, scs_id, position, time, speed):
-        txpacket = [self.scs_lobyte(position), self.scs_hibyte(position), self.scs_lobyte(time), self.scs_hibyte(time), self.scs_lobyte(speed), self.scs_hibyte(speed)]
+        txpacket = [self.sts_lobyte(position), self.sts_hibyte(position), self.sts_lobyte(time), self.sts_hibyte(time), self.sts_lobyte(speed), self.sts_hibyte(speed)]
         return self.writeTxRx(scs_id, SCSCL_GOAL_POSITION_L, len(txpacket), txpacket)
 
     def ReadPos(self, scs_id):
@@ -67,26 +70,76 @@ class scscl(protocol_packet_handler):
 
     def ReadSpeed(self, scs_id):
         scs_present_speed, scs_comm_result, scs_error = self.read2ByteTxRx(scs_id, SCSCL_PRESENT_SPEED_L)
-        return self.scs_tohost(scs_present_speed, 15), scs_comm_result, scs_error
+        return self.sts_tohost(scs_present_speed, 15), scs_comm_result, scs_error
 
     def ReadPosSpeed(self, scs_id):
         scs_present_position_speed, scs_comm_result, scs_error = self.read4ByteTxRx(scs_id, SCSCL_PRESENT_POSITION_L)
-        scs_present_position = self.scs_loword(scs_present_position_speed)
-        scs_present_speed = self.scs_hiword(scs_present_position_speed)
-        return scs_present_position, self.scs_tohost(scs_present_speed, 15), scs_comm_result, scs_error
+        scs_present_position = self.sts_loword(scs_present_position_speed)
+        scs_present_speed = self.sts_hiword(scs_present_position_speed)
+        return scs_present_position, self.sts_tohost(scs_present_speed, 15), scs_comm_result, scs_error
 
     def ReadMoving(self, scs_id):
         moving, scs_comm_result, scs_error = self.read1ByteTxRx(scs_id, SCSCL_MOVING)
         return moving, scs_comm_result, scs_error
 
+    def SyncReadRegisters(self, scs_ids, start_address, data_length):
+        # one INST_SYNC_READ for all servos, returns {ID: (data, error)}
+        groupSyncRead = self.getSyncReadGroup(scs_ids, start_address, data_length)
+        scs_comm_result = groupSyncRead.txRxPacket()
+        return self.getSyncReadData(groupSyncRead), scs_comm_result
+
+    def SyncReadPosSpeed(self, scs_ids):
+        # returns {ID: (position, speed, error)}
+        scs_data, scs_comm_result = self.SyncReadRegisters(scs_ids, SCSCL_PRESENT_POSITION_L, 4)
+        return self.unpackPosSpeed(scs_data), scs_comm_result
+
+    def unpackPosSpeed(self, scs_data):
+        scs_present_position_speed = {}
+        for scs_id, (data, scs_error) in scs_data.items():
+            scs_present_position = self.sts_makeword(data[0], data[1])
+            scs_present_speed = self.sts_makeword(data[2], data[3])
+            scs_present_position_speed[scs_id] = (scs_present_position, self.sts_tohost(scs_present_speed, 15),
+                                                  scs_error)
+        return scs_present_position_speed
+
+    def ReadState(self, scs_id):
+        # the whole status block in one transaction, returns a ServoState
+        data, scs_comm_result, scs_error = self.readTxRx(scs_id, STATE_START_ADDRESS, STATE_LENGTH)
+        if scs_comm_result != COMM_SUCCESS:
+            return None, scs_comm_result, scs_error
+        return self.unpackState(scs_id, data, scs_error), scs_comm_result, scs_error
+
+    def SyncReadState(self, scs_ids):
+        # returns {ID: ServoState}
+        scs_data, scs_comm_result = self.SyncReadRegisters(scs_ids, STATE_START_ADDRESS, STATE_LENGTH)
+        return dict((scs_id, self.unpackState(scs_id, data, scs_error))
+                    for scs_id, (data, scs_error) in scs_data.items()), scs_comm_result
+
+    def unpackState(self, scs_id, data, scs_error):
+        return ServoState(scs_id,
+                          self.sts_makeword(data[0], data[1]),
+                          self.sts_tohost(self.sts_makeword(data[2], data[3]), 15),
+                          self.sts_tohost(self.sts_makeword(data[4], data[5]), LOAD_SIGN_BIT),
+                          data[6],
+                          data[7],
+                          data[STATE_STATUS_OFFSET],
+                          data[STATE_MOVING_OFFSET],
+                          self.sts_tohost(self.sts_makeword(data[13], data[14]), 15),
+                          scs_error)
+
     def SyncWritePos(self, scs_id, position, time, speed):
-        txpacket = [self.scs_lobyte(position), self.scs_hibyte(position), self.scs_lobyte(time), self.scs_hibyte(time), self.scs_lobyte(speed), self.scs_hibyte(speed)]
+        txpacket = [self.sts_lobyte(position), self.sts_hibyte(position), self.sts_lobyte(time), self.sts_hibyte(time), self.sts_lobyte(speed), self.sts_hibyte(speed)]
         return self.groupSyncWrite.addParam(scs_id, txpacket)
 
     def RegWritePos(self, scs_id, position, time, speed):
-        txpacket = [self.scs_lobyte(position), self.scs_hibyte(position), self.scs_lobyte(time), self.scs_hibyte(time), self.scs_lobyte(speed), self.scs_hibyte(speed)]
+        txpacket = [self.sts_lobyte(position), self.sts_hibyte(position), self.sts_lobyte(time), self.sts_hibyte(time), self.sts_lobyte(speed), self.sts_hibyte(speed)]
         return self.regWriteTxRx(scs_id, SCSCL_GOAL_POSITION_L, len(txpacket), txpacket)
 
+    def StageWritePos(self, scs_id, position, time, speed):
+        # staged on groupRegWrite, sent by groupRegWrite.txPacket()
+        txpacket = [self.sts_lobyte(position), self.sts_hibyte(position), self.sts_lobyte(time), self.sts_hibyte(time), self.sts_lobyte(speed), self.sts_hibyte(speed)]
+        return self.groupRegWrite.addParam(scs_id, SCSCL_GOAL_POSITION_L, txpacket)
+
     def RegAction(self):
         return self.action(BROADCAST_ID)
 
@@ -95,7 +148,7 @@ class scscl(protocol_packet_handler):
         return self.writeTxRx(scs_id, SCSCL_MIN_ANGLE_LIMIT_L, len(txpacket), txpacket)
 
     def WritePWM(self, scs_id, time):
-        return self.write2ByteTxRx(scs_id, SCSCL_GOAL_TIME_L, self.scs_toscs(time, 10))
+        return self.write2ByteTxRx(scs_id, SCSCL_GOAL_TIME_L, self.sts_toscs(time, 10))
 
     def LockEprom(self, scs_id):
         return self.write1ByteTxRx(scs_id, SCSCL_LOCK, 1)
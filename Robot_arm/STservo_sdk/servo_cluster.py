@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+
+from concurrent.futures import ThreadPoolExecutor
+
+from .stservo_def import *
+
+
+class ClusterSyncWrite(object):
+    # The groupSyncWrite of a ServoCluster: parameters go to the
+    # groupSyncWrite of the bus that owns the ID, txPacket() sends the sync
+    # write of every bus with parameters at the same time. Lets ControlLoop
+    # drive a cluster like a single packet handler.
+    def __init__(self, cluster):
+        self.cluster = cluster
+
+    @property
+    def data_dict(self):
+        data_dict = {}
+        for bus in self.cluster.buses:
+            data_dict.update(bus.ph.groupSyncWrite.data_dict)
+        return data_dict
+
+    def addParam(self, sts_id, data):
+        bus = self.cluster.getBus(sts_id)
+        return bus is not None and bus.ph.groupSyncWrite.addParam(sts_id, data)
+
+    def clearParam(self):
+        for bus in self.cluster.buses:
+            bus.ph.groupSyncWrite.clearParam()
+
+    def txPacket(self):
+        # the first failure of any bus, COMM_SUCCESS if all went out
+        def txPacket(ph, sts_ids):
+            if not ph.groupSyncWrite.data_dict:
+                return COMM_SUCCESS
+            return ph.groupSyncWrite.txPacket()
+
+        return self.cluster.mergeResults(self.cluster.runAll(txPacket).values())
+
+
+class ClusterBus(object):
+    # one packet handler, its servo IDs and the single worker thread that
+    # owns its port, so transactions on one bus never overlap
+    def __init__(self, packetHandler, sts_ids, index):
+        self.ph = packetHandler
+        self.sts_ids = list(sts_ids)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stservo-bus%d" % index)
+
+
+class ServoCluster(object):
+    # One facade over several buses, each a PortHandler + sts/scscl handler
+    # on its own adapter. Every servo ID belongs to exactly one bus. Group
+    # calls (SyncReadState, SyncReadRegisters, the sync write) run on all
+    # buses at once, one worker thread per bus, and the replies merge into
+    # one ID indexed result, so the update rate grows with the number of
+    # adapters instead of being capped by one line.
+    #
+    # Threads are enough: the serial I/O releases the GIL while a bus waits
+    # for its bytes, and the packet work between them is small.
+    def __init__(self, buses=None):
+        # buses: [(packetHandler, sts_ids), ...]
+        self.buses = []
+        self.bus_by_id = {}
+        self.groupSyncWrite = ClusterSyncWrite(self)
+        for packetHandler, sts_ids in buses or []:
+            self.addBus(packetHandler, sts_ids)
+
+    def addBus(self, packetHandler, sts_ids):
+        for sts_id in sts_ids:
+            if sts_id in self.bus_by_id:
+                raise ValueError("servo ID %d is already on bus %d" % (sts_id, self.buses.index(self.bus_by_id[sts_id])))
+
+        bus = ClusterBus(packetHandler, sts_ids, len(self.buses))
+        self.buses.append(bus)
+        for sts_id in bus.sts_ids:
+            self.bus_by_id[sts_id] = bus
+        return bus
+
+    def getBus(self, sts_id):
+        return self.bus_by_id.get(sts_id)
+
+    def getPacketHandler(self, sts_id):
+        bus = self.bus_by_id.get(sts_id)
+        return bus.ph if bus is not None else None
+
+    def getIds(self):
+        return sorted(self.bus_by_id)
+
+    def splitIds(self, sts_ids):
+        # {bus: [IDs]} in bus order, unknown IDs are left out
+        if sts_ids is None:
+            return dict((bus, bus.sts_ids) for bus in self.buses)
+
+        split = {}
+        for sts_id in sts_ids:
+            bus = self.bus_by_id.get(sts_id)
+            if bus is not None:
+                split.setdefault(bus, []).append(sts_id)
+        return split
+
+    def runAll(self, function, sts_ids=None):
+        # function(packetHandler, bus_ids) on every bus holding one of
+        # sts_ids at the same time, returns {bus index: return value}
+        futures = dict((self.buses.index(bus), bus.executor.submit(function, bus.ph, bus_ids))
+                       for bus, bus_ids in self.splitIds(sts_ids).items())
+        return dict((index, future.result()) for index, future in futures.items())
+
+    def mergeResults(self, results):
+        for result in results:
+            if result != COMM_SUCCESS:
+                return result
+        return COMM_SUCCESS
+
+    def mergeData(self, outcomes):
+        # [(dict, result), ...] of the buses into one (dict, result)
+        merged = {}
+        for data, _ in outcomes:
+            merged.update(data)
+        return merged, self.mergeResults(result for _, result in outcomes)
+
+    def SyncReadRegisters(self, sts_ids, start_address, data_length):
+        # returns {ID: (data, error)}, the first failure of any bus
+        return self.mergeData(self.runAll(
+            lambda ph, bus_ids: ph.SyncReadRegisters(bus_ids, start_address, data_length), sts_ids).values())
+
+    def SyncReadState(self, sts_ids=None):
+        # returns {ID: ServoState} of all buses
+        return self.mergeData(self.runAll(lambda ph, bus_ids: ph.SyncReadState(bus_ids), sts_ids).values())
+
+    def SyncReadPosSpeed(self, sts_ids=None):
+        return self.mergeData(self.runAll(lambda ph, bus_ids: ph.SyncReadPosSpeed(bus_ids), sts_ids).values())
+
+    def SyncWritePosEx(self, sts_id, position, speed, acc):
+        ph = self.getPacketHandler(sts_id)
+        return ph is not None and ph.SyncWritePosEx(sts_id, position, speed, acc)
+
+    def ReadState(self, sts_id):
+        # single servo calls run on the worker of its bus as well
+        bus = self.bus_by_id.get(sts_id)
+        if bus is None:
+            return None, COMM_NOT_AVAILABLE, 0
+        return bus.executor.submit(bus.ph.ReadState, sts_id).result()
+
+    def WritePosEx(self, sts_id, position, speed, acc):
+        bus = self.bus_by_id.get(sts_id)
+        if bus is None:
+            return COMM_NOT_AVAILABLE, 0
+        return bus.executor.submit(bus.ph.WritePosEx, sts_id, position, speed, acc).result()
+
+    def close(self):
+        for bus in self.buses:
+            bus.executor.shutdown()
+            bus.ph.portHandler.closePort()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+
+# Status block, PRESENT_POSITION_L (56) through PRESENT_CURRENT_H (70), the
+# same layout for STS and SCSCL
+STATE_START_ADDRESS = 56
+STATE_LENGTH = 15
+
+STATE_STATUS_OFFSET = 9  # address 65, error bits of the last status packet
+STATE_MOVING_OFFSET = 10  # address 66
+
+STEPS_PER_TURN = 4096
+LOAD_SIGN_BIT = 10
+VOLTAGE_UNIT = 0.1  # V
+LOAD_UNIT = 0.1  # % of the maximum torque
+CURRENT_UNIT = 6.5  # mA, STS3215
+
+
+class ServoState(object):
+    # One decoded status block. position in steps as WritePosEx takes it,
+    # angle in degrees, speed in steps/s, load in %, voltage in V,
+    # temperature in degrees C, current in mA, moving a bool; status holds the
+    # ERRBIT_* flags of address 65, error those of the status packet.
+    __slots__ = ("sts_id", "position", "angle", "speed", "load", "voltage", "temperature",
+                 "status", "moving", "current", "error")
+
+    def __init__(self, sts_id, position, speed, load, voltage, temperature, status, moving, current, error):
+        self.sts_id = sts_id
+        self.position = position
+        self.angle = position * 360.0 / STEPS_PER_TURN
+        self.speed = speed
+        self.load = load * LOAD_UNIT
+        self.voltage = voltage * VOLTAGE_UNIT
+        self.temperature = temperature
+        self.status = status
+        self.moving = bool(moving)
+        self.current = current * CURRENT_UNIT
+        self.error = error
+
+    def asDict(self):
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+    def __repr__(self):
+        return "ServoState(%s)" % ", ".join("%s=%r" % item for item in self.asDict().items())
@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+# Block layout: header, servo IDs, one seqlock counter per slot, then one
+# [slots, servos] array per field, each 8 byte aligned
+RING_MAGIC = 0x53545352  # "RSTS"
+RING_SLOTS = 64
+RING_FIELDS = (
+    ("position", np.int32),  # steps
+    ("speed", np.int32),  # steps/s
+    ("load", np.float32),  # %
+    ("temperature", np.int16),  # degrees C
+    ("timestamp", np.float64),  # time.monotonic() of the read, older when the servo missed a cycle
+)
+HEADER_MAGIC = 0
+HEADER_SLOTS = 1
+HEADER_SERVOS = 2
+HEADER_SEQUENCE = 3  # cycles published so far
+HEADER_LENGTH = 4
+
+READ_ATTEMPTS = 100  # seqlock retries before a reader gives up on a slot
+
+
+def alignRingOffset(offset):
+    return (offset + 7) & ~7
+
+
+class StateRing(object):
+    # Servo states in a multiprocessing.shared_memory block, written by the
+    # process that owns the bus and read by any number of others without
+    # touching the bus. Use StateRingWriter in the bus process and
+    # StateRingReader elsewhere; both map the same fixed layout onto NumPy
+    # arrays, one row per published cycle, one column per servo.
+    #
+    # Each slot has a seqlock counter, odd while the writer fills the row,
+    # so readers take no lock and retry the rare read that overlapped a
+    # write. NumPy stores land in order on x86 and ARM64 for this use, the
+    # counter is written before and after the row.
+    def mapArrays(self, shm, slots, servos):
+        self.shm = shm
+        self.slots = slots
+        self.servos = servos
+        buffer = shm.buf
+        self.header = np.ndarray((HEADER_LENGTH,), np.uint64, buffer, 0)
+        offset = alignRingOffset(self.header.nbytes)
+        self.ids = np.ndarray((servos,), np.int32, buffer, offset)
+        offset = alignRingOffset(offset + self.ids.nbytes)
+        self.sequence = np.ndarray((slots,), np.uint64, buffer, offset)
+        offset = alignRingOffset(offset + self.sequence.nbytes)
+        self.fields = {}
+        for name, dtype in RING_FIELDS:
+            self.fields[name] = np.ndarray((slots, servos), dtype, buffer, offset)
+            offset = alignRingOffset(offset + self.fields[name].nbytes)
+        self.column = dict((int(sts_id), index) for index, sts_id in enumerate(self.ids))
+
+    def getName(self):
+        return self.shm.name
+
+    def getIds(self):
+        return [int(sts_id) for sts_id in self.ids]
+
+    def getSequence(self):
+        return int(self.header[HEADER_SEQUENCE])
+
+    def releaseArrays(self):
+        # the arrays hold exports of shm.buf, drop them before closing it
+        self.header = self.ids = self.sequence = None
+        self.fields = {}
+
+
+def attachRing(name):
+    # The writer owns the block. Before Python 3.13 attaching registers it
+    # with the resource tracker, which unlinks it when the tracker's
+    # processes exit; undo that unless the tracker is one inherited from the
+    # writer (a multiprocessing child), which would forget the writer's own
+    # registration instead.
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    own_tracker = getattr(resource_tracker._resource_tracker, "_fd", None) is None
+    shm = shared_memory.SharedMemory(name=name)
+    if own_tracker:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def getRingSize(slots, servos):
+    size = alignRingOffset(HEADER_LENGTH * 8) + alignRingOffset(servos * 4) + alignRingOffset(slots * 8)
+    for _, dtype in RING_FIELDS:
+        size += alignRingOffset(slots * servos * np.dtype(dtype).itemsize)
+    return size
+
+
+class StateRingWriter(StateRing):
+    # Creates the block; name None lets the OS pick one, see getName()
+    def __init__(self, sts_ids, name=None, slots=RING_SLOTS):
+        sts_ids = list(sts_ids)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=getRingSize(slots, len(sts_ids)))
+        self.mapArrays(shm, slots, len(sts_ids))
+        self.ids[:] = sts_ids
+        self.column = dict((sts_id, index) for index, sts_id in enumerate(sts_ids))
+        self.sequence[:] = 0
+        self.header[HEADER_SLOTS] = slots
+        self.header[HEADER_SERVOS] = len(sts_ids)
+        self.header[HEADER_SEQUENCE] = 0
+        self.header[HEADER_MAGIC] = RING_MAGIC  # last, readers check it
+
+    def publish(self, states, timestamp=None):
+        # states: {ID: ServoState} of one cycle; servos missing from it keep
+        # the values and timestamp of their last read
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        cycle = int(self.header[HEADER_SEQUENCE])
+        slot = cycle % self.slots
+        previous = (cycle - 1) % self.slots
+
+        self.sequence[slot] += 1  # odd: being written
+        for name, _ in RING_FIELDS:
+            self.fields[name][slot] = self.fields[name][previous] if cycle else 0
+        row = self.fields
+        for sts_id, state in states.items():
+            column = self.column.get(sts_id)
+            if column is None or state is None:
+                continue
+            row["position"][slot, column] = state.position
+            row["speed"][slot, column] = state.speed
+            row["load"][slot, column] = state.load
+            row["temperature"][slot, column] = state.temperature
+            row["timestamp"][slot, column] = timestamp
+        self.sequence[slot] += 1
+        self.header[HEADER_SEQUENCE] = cycle + 1
+        return cycle + 1
+
+    def close(self, unlink=True):
+        self.releaseArrays()
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+class StateRingReader(StateRing):
+    # Attaches to the block of a StateRingWriter by name
+    def __init__(self, name):
+        shm = attachRing(name)
+        header = np.ndarray((HEADER_LENGTH,), np.uint64, shm.buf, 0)
+        magic, slots, servos = int(header[HEADER_MAGIC]), int(header[HEADER_SLOTS]), int(header[HEADER_SERVOS])
+        del header
+        if magic != RING_MAGIC:
+            shm.close()
+            raise ValueError("%s is not a servo state ring" % name)
+        self.mapArrays(shm, slots, servos)
+
+    def getView(self, cycle):
+        # {field: row} views into shared memory for published cycle number
+        # cycle (1 is the first), no copy; valid while isValid(cycle, sequence)
+        # with the sequence taken before reading the views
+        slot = (cycle - 1) % self.slots
+        return dict((name, self.fields[name][slot]) for name, _ in RING_FIELDS), int(self.sequence[slot])
+
+    def isValid(self, cycle, slot_sequence):
+        # the slot still holds cycle, unchanged since slot_sequence was taken
+        published = self.getSequence()
+        return slot_sequence % 2 == 0 and published - cycle < self.slots and \
+            int(self.sequence[(cycle - 1) % self.slots]) == slot_sequence
+
+    def getCycle(self, cycle):
+        # {field: row copy} of cycle, None once it has been overwritten
+        for _ in range(READ_ATTEMPTS):
+            if cycle < 1 or self.getSequence() - cycle >= self.slots:
+                return None
+            view, slot_sequence = self.getView(cycle)
+            if slot_sequence % 2:
+                continue
+            snapshot = dict((name, row.copy()) for name, row in view.items())
+            if self.isValid(cycle, slot_sequence):
+                return snapshot
+        return None
+
+    def getLatest(self):
+        # (cycle, {field: row copy}), (0, None) before the first publish
+        for _ in range(READ_ATTEMPTS):
+            cycle = self.getSequence()
+            if cycle == 0:
+                return 0, None
+            snapshot = self.getCycle(cycle)
+            if snapshot is not None:
+                return cycle, snapshot
+        return 0, None
+
+    def getServo(self, sts_id):
+        # {field: value} of one servo in the latest cycle, None if unknown
+        column = self.column.get(sts_id)
+        cycle, snapshot = self.getLatest()
+        if column is None or snapshot is None:
+            return None
+        return dict((name, row[column].item()) for name, row in snapshot.items())
+
+    def waitNext(self, cycle, timeout=None, poll=0.001):
+        # the first published cycle after cycle, 0 on timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            published = self.getSequence()
+            if published > cycle:
+                return published
+            if deadline is not None and time.monotonic() >= deadline:
+                return 0
+            time.sleep(poll)
+
+    def close(self):
+        self.releaseArrays()
+        self.shm.close()
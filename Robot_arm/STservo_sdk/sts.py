@@ -4,6 +4,8 @@ from .stservo_def import *
 from .protocol_packet_handler import *
 from .group_sync_read import *
 from .group_sync_write import *
+from .group_reg_write import *
+from .servo_state import *
 
 #波特率定义
 STS_1M = 0
@@ -23,6 +25,7 @@ STS_MODEL_H = 4
 #-------EPROM(读写)--------
 STS_ID = 5
 STS_BAUD_RATE = 6
+STS_RESPONSE_LEVEL = 8  # 0: status packets for READ and PING only
 STS_MIN_ANGLE_LIMIT_L = 9
 STS_MIN_ANGLE_LIMIT_H = 10
 STS_MAX_ANGLE_LIMIT_L = 11
@@ -61,6 +64,7 @@ class sts(protocol_packet_handler):
     def __init__(self, portHandler):
         protocol_packet_handler.__init__(self, portHandler, 0)
         self.groupSyncWrite = GroupSyncWrite(self, STS_ACC, 7)
+        self.groupRegWrite = GroupRegWrite(self)
 
     def WritePosEx(self, sts_id, position, speed, acc):
         txpacket = [acc, self.sts_lobyte(position), self.sts_hibyte(position), 0, 0, self.sts_lobyte(speed), self.sts_hibyte(speed)]
@@ -84,6 +88,51 @@ class sts(protocol_packet_handler):
         moving, sts_comm_result, sts_error = self.read1ByteTxRx(sts_id, STS_MOVING)
         return moving, sts_comm_result, sts_error
 
+    def SyncReadRegisters(self, sts_ids, start_address, data_length):
+        # one INST_SYNC_READ for all servos, returns {ID: (data, error)}
+        groupSyncRead = self.getSyncReadGroup(sts_ids, start_address, data_length)
+        sts_comm_result = groupSyncRead.txRxPacket()
+        return self.getSyncReadData(groupSyncRead), sts_comm_result
+
+    def SyncReadPosSpeed(self, sts_ids):
+        # returns {ID: (position, speed, error)}
+        sts_data, sts_comm_result = self.SyncReadRegisters(sts_ids, STS_PRESENT_POSITION_L, 4)
+        return self.unpackPosSpeed(sts_data), sts_comm_result
+
+    def unpackPosSpeed(self, sts_data):
+        sts_present_position_speed = {}
+        for sts_id, (data, sts_error) in sts_data.items():
+            sts_present_position = self.sts_makeword(data[0], data[1])
+            sts_present_speed = self.sts_makeword(data[2], data[3])
+            sts_present_position_speed[sts_id] = (self.sts_tohost(sts_present_position, 15),
+                                                  self.sts_tohost(sts_present_speed, 15), sts_error)
+        return sts_present_position_speed
+
+    def ReadState(self, sts_id):
+        # the whole status block in one transaction, returns a ServoState
+        data, sts_comm_result, sts_error = self.readTxRx(sts_id, STATE_START_ADDRESS, STATE_LENGTH)
+        if sts_comm_result != COMM_SUCCESS:
+            return None, sts_comm_result, sts_error
+        return self.unpackState(sts_id, data, sts_error), sts_comm_result, sts_error
+
+    def SyncReadState(self, sts_ids):
+        # returns {ID: ServoState}
+        sts_data, sts_comm_result = self.SyncReadRegisters(sts_ids, STATE_START_ADDRESS, STATE_LENGTH)
+        return dict((sts_id, self.unpackState(sts_id, data, sts_error))
+                    for sts_id, (data, sts_error) in sts_data.items()), sts_comm_result
+
+    def unpackState(self, sts_id, data, sts_error):
+        return ServoState(sts_id,
+                          self.sts_tohost(self.sts_makeword(data[0], data[1]), 15),
+                          self.sts_tohost(self.sts_makeword(data[2], data[3]), 15),
+                          self.sts_tohost(self.sts_makeword(data[4], data[5]), LOAD_SIGN_BIT),
+                          data[6],
+                          data[7],
+                          data[STATE_STATUS_OFFSET],
+                          data[STATE_MOVING_OFFSET],
+                          self.sts_tohost(self.sts_makeword(data[13], data[14]), 15),
+                          sts_error)
+
     def SyncWritePosEx(self, sts_id, position, speed, acc):
         txpacket = [acc, self.sts_lobyte(position), self.sts_hibyte(position), 0, 0, self.sts_lobyte(speed), self.sts_hibyte(speed)]
         return self.groupSyncWrite.addParam(sts_id, txpacket)
@@ -92,6 +141,11 @@ class sts(protocol_packet_handler):
         txpacket = [acc, self.sts_lobyte(position), self.sts_hibyte(position), 0, 0, self.sts_lobyte(speed), self.sts_hibyte(speed)]
         return self.regWriteTxRx(sts_id, STS_ACC, len(txpacket), txpacket)
 
+    def StageWritePosEx(self, sts_id, position, speed, acc):
+        # staged on groupRegWrite, sent by groupRegWrite.txPacket()
+        txpacket = [acc, self.sts_lobyte(position), self.sts_hibyte(position), 0, 0, self.sts_lobyte(speed), self.sts_hibyte(speed)]
+        return self.groupRegWrite.addParam(sts_id, STS_ACC, txpacket)
+
     def RegAction(self):
         return self.action(BROADCAST_ID)
 
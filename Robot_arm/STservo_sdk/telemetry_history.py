@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+
+import csv
+import math
+import time
+
+import numpy as np
+
+HISTORY_CHANNELS = ("position", "speed", "load", "voltage", "temperature", "current")  # ServoState units
+HISTORY_STATS = ("min", "max", "mean")
+
+RAW_CAPACITY = 12000  # samples, a minute at 200 Hz
+HISTORY_LEVELS = (
+    (0.1, 18000),  # 10 Hz buckets, half an hour
+    (1.0, 21600),  # 1 Hz buckets, six hours
+)
+
+
+class HistoryRing(object):
+    # Preallocated columns of one resolution: times[capacity] and a
+    # [columns, capacity, servos] float32 block, each column contiguous,
+    # rows overwritten oldest first
+    def __init__(self, capacity, servos, columns):
+        self.capacity = capacity
+        self.times = np.zeros(capacity, np.float64)
+        self.data = np.full((len(columns), capacity, servos), np.nan, np.float32)
+        self.columns = dict((column, self.data[index]) for index, column in enumerate(columns))
+        self.head = 0  # next row to write
+        self.count = 0
+
+    def append(self, timestamp, block):
+        # block: [columns, servos] in column order
+        row = self.head
+        self.times[row] = timestamp
+        self.data[:, row] = block
+        self.head = (row + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def getWindow(self, start=None, end=None):
+        # (times, {column: [rows, servos]}) copies in time order
+        rows = (self.head - self.count + np.arange(self.count)) % self.capacity
+        times = self.times[rows]
+        mask = np.ones(len(rows), bool)
+        if start is not None:
+            mask &= times >= start
+        if end is not None:
+            mask &= times < end
+        rows = rows[mask]
+        return self.times[rows], dict((column, array[rows]) for column, array in self.columns.items())
+
+    def getOldest(self):
+        return self.times[(self.head - self.count) % self.capacity] if self.count else None
+
+    def getMemoryUsage(self):
+        return self.times.nbytes + self.data.nbytes
+
+
+class TelemetryHistory(object):
+    # History of the servo states of a control loop in bounded memory. Raw
+    # samples go into a ring of RAW_CAPACITY rows; every level of
+    # HISTORY_LEVELS keeps min, max and mean per fixed time bucket (10 Hz,
+    # then 1 Hz by default) over the raw samples of that bucket, so older
+    # history survives at lower resolution after the raw ring wrapped.
+    # Columns are channel names for the raw ring and channel_min,
+    # channel_max, channel_mean for the levels; a servo missing from a
+    # sample is NaN. publish(states) makes it a ControlLoop publisher.
+    def __init__(self, sts_ids, raw_capacity=RAW_CAPACITY, levels=HISTORY_LEVELS, channels=HISTORY_CHANNELS):
+        self.sts_ids = list(sts_ids)
+        self.column = dict((sts_id, index) for index, sts_id in enumerate(self.sts_ids))
+        self.channels = tuple(channels)
+        servos = len(self.sts_ids)
+        self.raw = HistoryRing(raw_capacity, servos, self.channels)
+        self.levels = []
+        for period, capacity in levels:
+            columns = ["%s_%s" % (channel, stat) for stat in HISTORY_STATS for channel in self.channels]
+            self.levels.append((period, HistoryRing(capacity, servos, columns)))
+        self.buckets = [None] * len(self.levels)  # (bucket number, accumulators) per level
+        self.block = np.full((len(self.channels), servos), np.nan, np.float32)
+
+    def publish(self, states, timestamp=None):
+        # states: {ID: ServoState} of one cycle
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        block = self.block
+        block.fill(np.nan)
+        for sts_id, state in states.items():
+            column = self.column.get(sts_id)
+            if column is None or state is None:
+                continue
+            block[:, column] = [getattr(state, channel) for channel in self.channels]
+        self.addSample(timestamp, block)
+
+    def addSample(self, timestamp, block):
+        # block: [channels, servos], channels in order and servos in sts_ids
+        # order, NaN for no value
+        self.raw.append(timestamp, block)
+        for index, (period, ring) in enumerate(self.levels):
+            bucket = math.floor(timestamp / period + 1e-9)  # 0.3 / 0.1 is 2.9999...
+            current = self.buckets[index]
+            if current is not None and current[0] != bucket:
+                self.closeBucket(current, period, ring)
+                current = None
+            if current is None:
+                current = (bucket, self.newAccumulators())
+                self.buckets[index] = current
+            self.accumulate(current[1], block)
+
+    def newAccumulators(self):
+        # min, max, sum and sample count per channel and servo
+        shape = self.block.shape
+        return (np.full(shape, np.nan, np.float32), np.full(shape, np.nan, np.float32),
+                np.zeros(shape, np.float64), np.zeros(shape, np.int32))
+
+    def accumulate(self, accumulators, block):
+        low, high, total, count = accumulators
+        np.fmin(low, block, out=low)
+        np.fmax(high, block, out=high)
+        present = block == block  # False for NaN
+        total += np.where(present, block, 0.0)
+        count += present
+
+    def closeBucket(self, bucket, period, ring):
+        number, (low, high, total, count) = bucket
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(count > 0, total / np.maximum(count, 1), np.nan)
+        ring.append(number * period, np.concatenate((low, high, mean)))
+
+    def flush(self):
+        # closes the buckets still open, so the latest samples show in the levels
+        for index, (period, ring) in enumerate(self.levels):
+            if self.buckets[index] is not None:
+                self.closeBucket(self.buckets[index], period, ring)
+                self.buckets[index] = None
+
+    def getLevel(self, start):
+        # index of the finest resolution still holding start, -1 for raw;
+        # the coarsest level for start None, the whole history
+        coarsest = len(self.levels) - 1
+        if start is None:
+            return coarsest
+        rings = [self.raw] + [ring for _, ring in self.levels]
+        for index, ring in enumerate(rings):
+            oldest = ring.getOldest()
+            if oldest is not None and start >= oldest:
+                return index - 1
+        return coarsest
+
+    def getWindow(self, start=None, end=None, level=None):
+        # (times, {column: [rows, servos]}), level -1 for raw samples, an
+        # index into HISTORY_LEVELS, or None for the finest one holding start
+        if level is None:
+            level = self.getLevel(start)
+        ring = self.raw if level < 0 else self.levels[level][1]
+        return ring.getWindow(start, end)
+
+    def getServo(self, sts_id, start=None, end=None, level=None):
+        # (times, {column: [rows]}) of one servo
+        times, columns = self.getWindow(start, end, level)
+        column = self.column[sts_id]
+        return times, dict((name, values[:, column]) for name, values in columns.items())
+
+    def exportNpz(self, path, start=None, end=None, level=None):
+        times, columns = self.getWindow(start, end, level)
+        np.savez_compressed(path, time=times, ids=np.array(self.sts_ids), **columns)
+        return len(times)
+
+    def exportCsv(self, path, start=None, end=None, level=None):
+        # one row per sample and servo: time, id, then the columns
+        times, columns = self.getWindow(start, end, level)
+        names = list(columns)
+        with open(path, "w", newline="") as output:
+            writer = csv.writer(output)
+            writer.writerow(["time", "id"] + names)
+            for row, timestamp in enumerate(times):
+                for index, sts_id in enumerate(self.sts_ids):
+                    writer.writerow(["%.6f" % timestamp, sts_id] +
+                                    ["%g" % columns[name][row, index] for name in names])
+        return len(times)
+
+    def getMemoryUsage(self):
+        return self.raw.getMemoryUsage() + sum(ring.getMemoryUsage() for _, ring in self.levels)
@@ -0,0 +1,385 @@
+#!/usr/bin/env python
+
+import collections
+import os
+import random
+import threading
+import time
+
+from .stservo_def import *
+from .packet_frame import *
+from .port_handler import *
+from .sts import *
+from .baud_rate import *
+
+STS3215_MODEL = 777
+
+BAUD_TOLERANCE = 0.03  # relative clock mismatch a UART still decodes
+
+STS_RETURN_DELAY = 7  # unit 2 us
+VIRTUAL_RESPONSE_TIME = 0.1  # ms from the end of a request to the first reply byte
+VIRTUAL_MAX_SPEED = 3400  # steps/s for a goal speed of 0
+
+
+class VirtualServo(object):
+    # Memory table and motion of one emulated servo. Goal position moves the
+    # present position at the goal speed; EEPROM and SRAM read/write
+    # registers keep whatever is written, the lock is not enforced.
+    #
+    # drop_rate: share of requests left unanswered
+    # corrupt_rate: share of replies sent with a wrong checksum
+    # extra_delay: ms added to the response time, a slow servo
+    # error_bits: ERRBIT_* flags reported in every status packet
+    def __init__(self, sts_id, model=STS3215_MODEL, end=STS_END):
+        self.end = end
+        self.memory = bytearray(256)
+        self.reg_write = None
+        self.drop_rate = 0.0
+        self.corrupt_rate = 0.0
+        self.extra_delay = 0.0
+        self.error_bits = 0
+        self.last_update = None
+
+        self.writeWord(STS_MODEL_L, model)
+        self.memory[STS_ID] = sts_id
+        self.memory[STS_BAUD_RATE] = STS_1M
+        self.memory[STS_RESPONSE_LEVEL] = 1
+        self.writeWord(STS_MAX_ANGLE_LIMIT_L, 4095)
+        self.memory[STS_LOCK] = 1
+        self.writeWord(STS_PRESENT_POSITION_L, 2048)
+        self.writeWord(STS_GOAL_POSITION_L, 2048)
+        self.memory[STS_PRESENT_VOLTAGE] = 120
+        self.memory[STS_PRESENT_TEMPERATURE] = 30
+
+    def getId(self):
+        return self.memory[STS_ID]
+
+    def getBaudRate(self):
+        return getServoBaudRate(self.memory[STS_BAUD_RATE])
+
+    def readWord(self, address):
+        low, high = self.memory[address], self.memory[address + 1]
+        if self.end:
+            low, high = high, low
+        return low | (high << 8)
+
+    def writeWord(self, address, value):
+        low, high = value & 0xFF, (value >> 8) & 0xFF
+        if self.end:
+            low, high = high, low
+        self.memory[address] = low
+        self.memory[address + 1] = high
+
+    def update(self, now):
+        # advance the present position to now (ms)
+        if self.last_update is None:
+            self.last_update = now
+        elapsed = (now - self.last_update) / 1000.0
+        self.last_update = now
+
+        position = self.readWord(STS_PRESENT_POSITION_L)
+        goal = self.readWord(STS_GOAL_POSITION_L) & 0x7FFF
+        speed = self.readWord(STS_GOAL_SPEED_L) & 0x7FFF or VIRTUAL_MAX_SPEED
+        step = int(speed * elapsed)
+        if goal == position or not self.memory[STS_TORQUE_ENABLE]:
+            self.writeWord(STS_PRESENT_SPEED_L, 0)
+            self.memory[STS_MOVING] = 0
+            return
+
+        if abs(goal - position) <= step:
+            position = goal
+        elif goal > position:
+            position += step
+        else:
+            position -= step
+        self.writeWord(STS_PRESENT_POSITION_L, position)
+        self.writeWord(STS_PRESENT_SPEED_L, speed if position != goal else 0)
+        self.memory[STS_MOVING] = int(position != goal)
+
+    def read(self, address, length):
+        return bytes(self.memory[address: address + length])
+
+    def write(self, address, data):
+        for offset, value in enumerate(data):
+            if address + offset < STS_PRESENT_POSITION_L:  # the rest is read-only
+                self.memory[address + offset] = value
+        if address <= STS_GOAL_POSITION_H and address + len(data) > STS_GOAL_POSITION_L:
+            self.memory[STS_TORQUE_ENABLE] = 1
+
+    def getResponseTime(self):
+        return VIRTUAL_RESPONSE_TIME + self.memory[STS_RETURN_DELAY] * 0.002 + self.extra_delay
+
+
+class VirtualBus(object):
+    # Emulated half duplex bus of STS/SCS servos. handlePacket() takes one
+    # instruction packet with the time its last byte went out and the host
+    # baud rate, and returns the reply bytes each with the time it arrives
+    # at the host, spaced by the byte time of the baud rate. Servos whose
+    # baud rate does not match the host's do not see the request.
+    def __init__(self, sts_ids=(1,), seed=0, model=STS3215_MODEL, end=STS_END):
+        self.servos = {}
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        for sts_id in sts_ids:
+            self.addServo(VirtualServo(sts_id, model, end))
+        self.resetStats()
+
+    def resetStats(self):
+        self.stats = {
+            "requests": 0,
+            "replies": 0,
+            "dropped": 0,
+            "corrupted": 0,
+            "bad_requests": 0,
+        }
+
+    def addServo(self, servo):
+        self.servos[servo.getId()] = servo
+        return servo
+
+    def removeServo(self, sts_id):
+        return self.servos.pop(sts_id, None)
+
+    def getServo(self, sts_id):
+        return self.servos.get(sts_id)
+
+    def setServoBaudRate(self, baudrate):
+        # as if STS_BAUD_RATE had been written to every servo
+        baud_code = getBaudCode(baudrate)
+        if baud_code is None:
+            return False
+        for servo in self.servos.values():
+            servo.memory[STS_BAUD_RATE] = baud_code
+        return True
+
+    def setFaults(self, sts_id=None, drop_rate=None, corrupt_rate=None, extra_delay=None, error_bits=None):
+        # sts_id None: every servo
+        servos = self.servos.values() if sts_id is None else [self.servos[sts_id]]
+        for servo in servos:
+            if drop_rate is not None:
+                servo.drop_rate = drop_rate
+            if corrupt_rate is not None:
+                servo.corrupt_rate = corrupt_rate
+            if extra_delay is not None:
+                servo.extra_delay = extra_delay
+            if error_bits is not None:
+                servo.error_bits = error_bits
+
+    def isListening(self, servo, baudrate):
+        servo_baudrate = servo.getBaudRate()
+        return servo_baudrate > 0 and abs(baudrate - servo_baudrate) <= servo_baudrate * BAUD_TOLERANCE
+
+    def makeStatus(self, servo, sts_id, data):
+        packet = bytearray([0xFF, 0xFF, sts_id, len(data) + 2, servo.error_bits])
+        packet += data
+        packet.append(0)
+        packet[-1] = packet_checksum(packet, len(packet))
+        if self.random.random() < servo.corrupt_rate:
+            packet[-1] ^= 0xFF
+            self.stats["corrupted"] += 1
+        return packet
+
+    def handlePacket(self, packet, end_time, baudrate):
+        # returns [(arrival time in ms, byte), ...]
+        with self.lock:
+            return self.answer(bytes(packet), end_time, baudrate)
+
+    def answer(self, packet, end_time, baudrate):
+        if len(packet) < 6 or packet[PKT_LENGTH] + 4 != len(packet) or \
+                packet_checksum(packet, len(packet)) != packet[-1]:
+            self.stats["bad_requests"] += 1
+            return []
+        self.stats["requests"] += 1
+
+        sts_id = packet[PKT_ID]
+        instruction = packet[PKT_INSTRUCTION]
+        param = packet[PKT_PARAMETER0: -1]
+        if sts_id == BROADCAST_ID:
+            targets = [servo for servo in self.servos.values() if self.isListening(servo, baudrate)]
+        else:
+            servo = self.servos.get(sts_id)
+            targets = [servo] if servo is not None and self.isListening(servo, baudrate) else []
+
+        replies = []
+        if instruction == INST_SYNC_READ:
+            address, length = param[0], param[1]
+            for sts_id in param[2:]:
+                servo = self.servos.get(sts_id)
+                if servo in targets:
+                    servo.update(end_time)
+                    replies.append((servo, sts_id, servo.read(address, length)))
+        elif instruction == INST_SYNC_WRITE:
+            address, length = param[0], param[1]
+            for index in range(2, len(param), length + 1):
+                servo = self.servos.get(param[index])
+                if servo in targets:
+                    servo.update(end_time)
+                    servo.write(address, param[index + 1: index + 1 + length])
+        else:
+            for servo in targets:
+                servo.update(end_time)
+                data = b""
+                if instruction == INST_READ:
+                    data = servo.read(param[0], param[1])
+                elif instruction == INST_WRITE:
+                    servo.write(param[0], param[1:])
+                elif instruction == INST_REG_WRITE:
+                    servo.reg_write = (param[0], param[1:])
+                elif instruction == INST_ACTION:
+                    if servo.reg_write is not None:
+                        servo.write(*servo.reg_write)
+                        servo.reg_write = None
+                elif instruction != INST_PING:
+                    continue
+                if sts_id != BROADCAST_ID and (servo.memory[STS_RESPONSE_LEVEL] or
+                                               instruction in (INST_READ, INST_PING)):
+                    replies.append((servo, sts_id, data))  # answers with the ID it was addressed by
+
+        # an ID written during this request takes effect now
+        for servo in targets:
+            if self.servos.get(servo.getId()) is not servo:
+                self.servos = dict((other.getId(), other) for other in self.servos.values())
+
+        byte_time = 10000.0 / baudrate  # ms, 8N1
+        arrivals = []
+        line_free = end_time
+        for servo, reply_id, data in replies:
+            if self.random.random() < servo.drop_rate:
+                self.stats["dropped"] += 1
+                continue
+            start = max(line_free, end_time + servo.getResponseTime())
+            status = self.makeStatus(servo, reply_id, data)
+            arrivals.extend((start + (index + 1) * byte_time, value) for index, value in enumerate(status))
+            line_free = start + len(status) * byte_time
+            self.stats["replies"] += 1
+        return arrivals
+
+    def openPty(self, baudrate=DEFAULT_BAUDRATE):
+        # serves the bus on a Linux pty for PortHandler(pty.port_name). A pty
+        # has no baud rate, the replies are paced to baudrate instead
+        return VirtualPty(self, baudrate)
+
+
+class VirtualPty(object):
+    def __init__(self, bus, baudrate):
+        self.bus = bus
+        self.baudrate = baudrate
+        self.master, self.slave = os.openpty()
+        self.port_name = os.ttyname(self.slave)
+        self.running = True
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def serve(self):
+        request = bytearray()
+        while self.running:
+            try:
+                request += os.read(self.master, 256)
+            except OSError:
+                break
+            while len(request) > PKT_LENGTH:
+                if request[PKT_HEADER0] != 0xFF or request[PKT_HEADER1] != 0xFF:
+                    del request[0]
+                    continue
+                packet_length = request[PKT_LENGTH] + 4
+                if len(request) < packet_length:
+                    break
+
+                packet = bytes(request[0: packet_length])
+                del request[0: packet_length]
+                now = time.monotonic_ns() / 1000000.0
+                arrivals = self.bus.handlePacket(packet, now, self.baudrate)
+                if arrivals:
+                    delay = arrivals[-1][0] - now
+                    if delay > 0:
+                        time.sleep(delay / 1000.0)
+                    os.write(self.master, bytes(value for _, value in arrivals))
+
+    def close(self):
+        self.running = False
+        os.close(self.master)
+        os.close(self.slave)
+
+
+class VirtualPortHandler(PortHandler):
+    # PortHandler on a VirtualBus in the same process, no serial port or pty.
+    # Reply bytes become readable at the time they would have arrived on the
+    # wire at the configured baud rate.
+    def __init__(self, bus, blocking=True):
+        PortHandler.__init__(self, "virtual", blocking)
+        self.bus = bus
+        self.rx_queue = collections.deque()
+        self.line_free = 0.0
+
+    def openPort(self):
+        return self.setBaudRate(self.baudrate)
+
+    def closePort(self):
+        self.rx_queue.clear()
+        self.is_open = False
+
+    def clearPort(self):
+        pass
+
+    def isBaudRateSupported(self, baudrate):
+        return baudrate > 0
+
+    def setBaudRate(self, baudrate):
+        if baudrate <= 0:
+            return False
+
+        self.baudrate = baudrate
+        self.tx_time_per_byte = (1000.0 / self.baudrate) * 10.0
+        self.rx_queue.clear()
+        self.is_open = True
+        if self.capture is not None:
+            self.capture.addBaudRate(baudrate)
+        return True
+
+    def getBytesAvailable(self):
+        now = self.getCurrentTime()
+        available = 0
+        for arrival, _ in self.rx_queue:
+            if arrival > now:
+                break
+            available += 1
+        return available
+
+    def readPort(self, length):
+        if self.blocking:
+            # sleep until the requested bytes are in or the packet deadline
+            wait = self.packet_start_time + self.packet_timeout
+            if len(self.rx_queue) >= length:
+                wait = min(wait, self.rx_queue[length - 1][0])
+            wait -= self.getCurrentTime()
+            if wait > 0:
+                time.sleep(wait / 1000.0)
+
+        now = self.getCurrentTime()
+        data = bytearray()
+        while self.rx_queue and len(data) < length and self.rx_queue[0][0] <= now:
+            data.append(self.rx_queue.popleft()[1])
+        if self.capture is not None and data:
+            self.capture.addRx(data)
+        return bytes(data)
+
+    def waitReadable(self):
+        remaining = self.packet_timeout - self.getTimeSinceStart()
+        if remaining <= 0:
+            return False
+
+        if self.rx_queue:
+            remaining = min(remaining, self.rx_queue[0][0] - self.getCurrentTime())
+        if remaining > 0:
+            time.sleep(remaining / 1000.0)
+        return self.getBytesAvailable() > 0
+
+    def writePort(self, packet):
+        if self.capture is not None:
+            self.capture.addTx(packet)
+        now = self.getCurrentTime()
+        end_time = max(now, self.line_free) + len(packet) * self.tx_time_per_byte
+        arrivals = self.bus.handlePacket(packet, end_time, self.baudrate)
+        self.line_free = arrivals[-1][0] if arrivals else end_time
+        self.rx_queue.extend(arrivals)
+        return len(packet)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+
+import time
+
+from .stservo_def import *
+from .sts import *
+from .group_reg_write import STATUS_PACKET_LENGTH, REPLY_GAP
+
+VERIFY_INTERVAL = 10  # cycles between two verify reads
+MAX_MISSES = 2  # failed verify reads in a row before a servo falls back
+
+
+class WriteBehind(object):
+    # Streams goal writes with writeTxOnly instead of waiting for the
+    # acknowledgement of every WritePosEx. Every verify_interval cycles
+    # (endCycle()) one sync read per register block fetches what the servos
+    # hold and compares it with the last goal written to each. A servo that
+    # did not answer or holds an older goal max_misses checks in a row
+    # counts as no longer listening and gets acknowledged writeTxRx writes
+    # until a check finds it in step again.
+    #
+    # replies: the servos answer WRITE (status return level above 0, the
+    #          default); each streamed packet then waits the wire time of that
+    #          reply so nothing collides on the half duplex line. With
+    #          STS_RESPONSE_LEVEL 0 on every servo, replies=False streams the
+    #          packets back to back.
+    # write() takes any register block, WritePosEx is the STS goal layout.
+    def __init__(self, packetHandler, verify_interval=VERIFY_INTERVAL, max_misses=MAX_MISSES, replies=True):
+        self.ph = packetHandler
+        self.verify_interval = verify_interval
+        self.max_misses = max_misses
+        self.replies = replies
+        self.commanded = {}  # {ID: (address, data)} last goal written
+        self.misses = {}
+        self.fallback_ids = set()
+        self.line_free = 0.0
+        self.cycle = 0
+        self.resetStats()
+
+    def resetStats(self):
+        self.stats = {
+            "streamed": 0,
+            "acknowledged": 0,
+            "ack_failures": 0,
+            "verifies": 0,
+            "misses": 0,
+            "flagged": 0,
+            "restored": 0,
+        }
+
+    def getPacketTime(self, length):
+        # s a streamed WRITE holds the line, with its reply if there is one
+        byte_time = self.ph.portHandler.tx_time_per_byte
+        if not self.replies:
+            return (length + 7) * byte_time / 1000.0
+        return ((length + 7 + STATUS_PACKET_LENGTH) * byte_time + REPLY_GAP) / 1000.0
+
+    def flush(self):
+        # waits out the packets and replies still on the line, then drops the replies
+        while time.perf_counter() < self.line_free:
+            pass
+        if self.replies:
+            self.ph.drainInput()
+
+    def write(self, sts_id, address, data):
+        data = list(data)
+        self.commanded[sts_id] = (address, data)
+        if sts_id in self.fallback_ids:
+            self.flush()
+            result, error = self.ph.writeTxRx(sts_id, address, len(data), data)
+            self.stats["acknowledged"] += 1
+            if result != COMM_SUCCESS:
+                self.stats["ack_failures"] += 1
+            return result
+
+        while time.perf_counter() < self.line_free:
+            pass
+        result = self.ph.writeTxOnly(sts_id, address, len(data), data)
+        self.line_free = time.perf_counter() + self.getPacketTime(len(data))
+        self.stats["streamed"] += 1
+        return result
+
+    def WritePosEx(self, sts_id, position, speed, acc):
+        txpacket = [acc, self.ph.sts_lobyte(position), self.ph.sts_hibyte(position), 0, 0,
+                    self.ph.sts_lobyte(speed), self.ph.sts_hibyte(speed)]
+        return self.write(sts_id, STS_ACC, txpacket)
+
+    def endCycle(self):
+        # IDs that fell back to acknowledged writes at this cycle
+        self.cycle += 1
+        if self.verify_interval and self.cycle % self.verify_interval == 0:
+            return self.verify()
+        return []
+
+    def verify(self):
+        # IDs that fell back to acknowledged writes at this check
+        self.flush()
+        self.stats["verifies"] += 1
+        blocks = {}
+        for sts_id, (address, data) in self.commanded.items():
+            blocks.setdefault((address, len(data)), []).append(sts_id)
+
+        flagged = []
+        for (address, length), sts_ids in blocks.items():
+            read, _ = self.ph.SyncReadRegisters(sts_ids, address, length)
+            for sts_id in sts_ids:
+                if sts_id in read and list(read[sts_id][0]) == self.commanded[sts_id][1]:
+                    self.misses[sts_id] = 0
+                    if sts_id in self.fallback_ids:
+                        self.fallback_ids.discard(sts_id)
+                        self.stats["restored"] += 1
+                    continue
+
+                self.stats["misses"] += 1
+                self.misses[sts_id] = self.misses.get(sts_id, 0) + 1
+                if self.misses[sts_id] >= self.max_misses and sts_id not in self.fallback_ids:
+                    self.fallback_ids.add(sts_id)
+                    self.stats["flagged"] += 1
+                    flagged.append(sts_id)
+        return flagged
+
+    def getFallbackIds(self):
+        return sorted(self.fallback_ids)
@@ -50,7 +50,7 @@ arm_chain = chain.Chain(name="arm", links=[
 ])
 
 # Initialize PortHandler and PacketHandler
-portHandler = PortHandler(DEVICENAME)
+portHandler = PortHandler(DEVICENAME, blocking=True)  # wait in select() so the tracking thread keeps the CPU
 packetHandler = sts(portHandler)
 
 # Open port
@@ -66,6 +66,10 @@ if not portHandler.setBaudRate(BAUDRATE):
     sys.exit(1)
 print("Succeeded to change the baudrate")
 
+# Goals from the sliders and the tracking loop go through a mailbox: only the
+# newest goal per joint is kept and all joints are sent as one sync write per tick
+mailbox = CommandMailbox(packetHandler)
+
 # Initialize servos: set mode to 0, enable multi-turn, and read initial positions
 initial_positions = [0] * 5  # For servos 2 to 6
 for i in range(5):
@@ -142,7 +146,7 @@ def hand_tracking_loop():
                     pos = max(STS_MINIMUM_POSITION_VALUE, min(STS_MAXIMUM_POSITION_VALUE, pos))
                     servo_id = i + 2
                     actual_pos = initial_positions[i] + pos
-                    packetHandler.WritePosEx(servo_id, actual_pos, STS_MOVING_SPEED, STS_MOVING_ACC)
+                    mailbox.postPosEx(servo_id, actual_pos, STS_MOVING_SPEED, STS_MOVING_ACC)
                 # Draw landmarks
                 mp_drawing.draw_landmarks(frame, hand_landmarks, mp_hands.HAND_CONNECTIONS)
         cv2.imshow('Hand Tracking', frame)
@@ -152,6 +156,7 @@ def hand_tracking_loop():
     cv2.destroyAllWindows()
 
 # Start hand tracking in a separate thread
+mailbox.start()
 Thread(target=hand_tracking_loop, daemon=True).start()
 
 # Calibration function
@@ -184,15 +189,18 @@ def update_servo_position(servo_id):
     index = servo_id - 2
     pos = goal_positions[index].get()
     actual_pos = initial_positions[index] + pos
-    packetHandler.WritePosEx(servo_id, actual_pos, STS_MOVING_SPEED, STS_MOVING_ACC)
+    mailbox.postPosEx(servo_id, actual_pos, STS_MOVING_SPEED, STS_MOVING_ACC)
 
 # Update status display
 def update_status():
+    servo_ids = [i + 2 for i in range(5)]
     while True:
-        for i in range(5):
-            servo_id = i + 2
-            sts_present_position, sts_present_speed, sts_comm_result, sts_error = packetHandler.ReadPosSpeed(servo_id)
-            if sts_comm_result == COMM_SUCCESS and sts_error == 0:
+        present_position_speed, _ = packetHandler.SyncReadPosSpeed(servo_ids)  # one transaction for all joints
+        for i, servo_id in enumerate(servo_ids):
+            if servo_id not in present_position_speed:
+                continue
+            sts_present_position, sts_present_speed, sts_error = present_position_speed[servo_id]
+            if sts_error == 0:
                 relative_position = sts_present_position - initial_positions[i]
                 status_labels[i].config(text=f"Servo {servo_id}: Pos: {relative_position}, Speed: {sts_present_speed}")
         time.sleep(0.1)
@@ -212,6 +220,7 @@ ai_button.pack(pady=10)
 def on_closing():
     global is_ai_mode
     is_ai_mode = False
+    mailbox.stop()
     for i in range(5):
         packetHandler.write1ByteTxRx(i + 2, STS_TORQUE_ENABLE_ADDR, 0)
     portHandler.closePort()
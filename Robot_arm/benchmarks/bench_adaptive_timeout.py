@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+#
+# *********     Adaptive Response Timeout      *********
+#
+# A pty servo answers ID 1 and ignores ID 2. The benchmark times reads of
+# both IDs with the fixed LATENCY_TIMER timeout and with an RttEstimator
+# attached to the packet handler, and prints the learned estimates.
+#
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from STservo_sdk import *  # Uses STServo SDK library
+from bench_port_wait import PtyServo
+
+READS = 50
+REPLY_DELAY = 0.0005  # seconds
+
+
+def time_reads(packetHandler, sts_id, reads):
+    results = {}
+    times = []
+    for _ in range(reads):
+        start = time.perf_counter()
+        _, _, result, _ = packetHandler.ReadPosSpeed(sts_id)
+        times.append(time.perf_counter() - start)
+        results[result] = results.get(result, 0) + 1
+    times.sort()
+    return times[len(times) // 2] * 1e3, results
+
+
+def measure(rtt_estimator, reads=READS):
+    servo = PtyServo(REPLY_DELAY, ids=[1])
+    portHandler = PortHandler(servo.port_name, blocking=True)
+    portHandler.openPort()
+    packetHandler = sts(portHandler)
+    packetHandler.setRttEstimator(rtt_estimator)
+
+    present_ms, present_results = time_reads(packetHandler, 1, reads)
+    absent_ms, absent_results = time_reads(packetHandler, 2, max(reads // 5, 1))
+
+    portHandler.closePort()
+    servo.close()
+    return {
+        "present_median_ms": present_ms,
+        "present_results": present_results,
+        "absent_median_ms": absent_ms,
+        "absent_results": absent_results,
+    }
+
+
+def run():
+    estimator = RttEstimator()
+    results = {"fixed": measure(None), "adaptive": measure(estimator)}
+    results["estimates"] = estimator.getEstimates()
+    return results
+
+
+if __name__ == "__main__":
+    results = run()
+    for mode in ("fixed", "adaptive"):
+        result = results[mode]
+        print("%-8s  present servo %.2f ms %s   absent servo %.2f ms %s"
+              % (mode, result["present_median_ms"], result["present_results"],
+                 result["absent_median_ms"], result["absent_results"]))
+    for (sts_id, instruction), estimate in sorted(results["estimates"].items()):
+        print("ID %d inst %d: srtt %.3f ms  rttvar %.3f ms  timeout %.3f ms  samples %d  timeouts %d"
+              % (sts_id, instruction, estimate["srtt"], estimate["rttvar"], estimate["timeout"],
+                 estimate["samples"], estimate["timeouts"]))
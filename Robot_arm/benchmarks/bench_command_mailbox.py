@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+#
+# *********     Command Mailbox vs. Per-Event WritePosEx      *********
+#
+# Replays a stream of goal events (five joints updated at a tracking frame
+# rate) against a fake servo on a Linux pty, once calling WritePosEx per
+# event and once posting to a CommandMailbox flushed at 50 Hz. Reports bus
+# packets, how long after its scheduled time the last goal reached the bus,
+# and the mailbox coalesced/dropped counters.
+#
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from STservo_sdk import *  # Uses STServo SDK library
+from bench_port_wait import PtyServo
+
+JOINT_IDS = [2, 3, 4, 5, 6]
+FRAME_RATE = 200  # goal sets per second
+DURATION = 2.0  # seconds
+REPLY_DELAY = 0.001  # seconds the fake servo takes to answer
+
+
+def events(frame_rate=FRAME_RATE, duration=DURATION):
+    # (scheduled time, servo ID, position)
+    for frame in range(int(frame_rate * duration)):
+        for sts_id in JOINT_IDS:
+            yield frame / float(frame_rate), sts_id, (frame * 16 + sts_id) % 4096
+
+
+def wait_until(start, scheduled):
+    remaining = start + scheduled - time.perf_counter()
+    if remaining > 0:
+        time.sleep(remaining)
+
+
+def measure_direct(packetHandler):
+    count = 0
+    scheduled = 0.0
+    start = time.perf_counter()
+    for scheduled, sts_id, position in events():
+        wait_until(start, scheduled)
+        packetHandler.WritePosEx(sts_id, position, 1500, 50)
+        count += 1
+    lag = time.perf_counter() - start - scheduled
+    return {"events": count, "packets": count, "last_goal_lag_ms": lag * 1e3}
+
+
+def measure_mailbox(packetHandler):
+    mailbox = CommandMailbox(packetHandler, rate=50)
+    mailbox.start()
+
+    scheduled = 0.0
+    start = time.perf_counter()
+    for scheduled, sts_id, position in events():
+        wait_until(start, scheduled)
+        mailbox.postPosEx(sts_id, position, 1500, 50)
+    packets = mailbox.getStats()["packets"]
+    while mailbox.getPending() > 0 or mailbox.getStats()["packets"] == packets:
+        time.sleep(0.0001)
+    lag = time.perf_counter() - start - scheduled
+    mailbox.stop()
+
+    stats = mailbox.getStats()
+    return {
+        "events": stats["posted"],
+        "packets": stats["packets"],
+        "last_goal_lag_ms": lag * 1e3,
+        "coalesced": stats["coalesced"],
+        "dropped": stats["dropped"],
+    }
+
+
+def run():
+    servo = PtyServo(REPLY_DELAY, ids=JOINT_IDS)
+    portHandler = PortHandler(servo.port_name, blocking=True)
+    portHandler.openPort()
+    packetHandler = sts(portHandler)
+
+    results = {"direct": measure_direct(packetHandler), "mailbox": measure_mailbox(packetHandler)}
+
+    portHandler.closePort()
+    servo.close()
+    return results
+
+
+if __name__ == "__main__":
+    print("%d joints at %d Hz for %.1f s, fake servo replies after %.1f ms"
+          % (len(JOINT_IDS), FRAME_RATE, DURATION, REPLY_DELAY * 1e3))
+    for mode, result in run().items():
+        line = "%-8s %5d events  %5d packets  last goal on the bus %8.1f ms late" \
+               % (mode, result["events"], result["packets"], result["last_goal_lag_ms"])
+        if "coalesced" in result:
+            line += "  coalesced %d  dropped %d" % (result["coalesced"], result["dropped"])
+        print(line)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+#
+# *********     Packet Encode Micro-benchmark      *********
+#
+# Compares instruction packet assembly through the reusable PacketFrame
+# buffers (pack in place, checksum with sum() over a memoryview) against the
+# original list based path (fresh [0] * n list, element assignment, per-byte
+# checksum loop), both including the bytes conversion pySerial does before
+# writing. A third column times the whole writeTxOnly/syncWriteTxOnly call,
+# bus scheduling included, against a port stub. No hardware needed.
+#
+# The frame path pays off for sync writes only, about 2x for 20 servos.
+# It does not make single writes faster: a full writeTxOnly call costs more
+# than the old one, mostly for the BusScheduler lock. The 7-byte write row
+# keeps an eye on that cost.
+#
+
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from STservo_sdk import *  # Uses STServo SDK library
+
+ROUNDS = 20000
+
+
+class NullPortHandler(PortHandler):
+    def __init__(self):
+        PortHandler.__init__(self, "null")
+
+    def clearPort(self):
+        pass
+
+    def writePort(self, packet):
+        if isinstance(packet, memoryview):
+            return len(packet.tobytes())
+        return len(bytes(bytearray(packet)))
+
+    def setPacketTimeout(self, packet_length):
+        pass
+
+
+def list_write_packet(sts_id, address, length, data):
+    # the packet assembly writeTxOnly/txPacket used before PacketFrame
+    txpacket = [0] * (length + 7)
+
+    txpacket[PKT_ID] = sts_id
+    txpacket[PKT_LENGTH] = length + 3
+    txpacket[PKT_INSTRUCTION] = INST_WRITE
+    txpacket[PKT_PARAMETER0] = address
+    txpacket[PKT_PARAMETER0 + 1: PKT_PARAMETER0 + 1 + length] = data[0: length]
+
+    checksum = 0
+    total_packet_length = txpacket[PKT_LENGTH] + 4
+    txpacket[PKT_HEADER0] = 0xFF
+    txpacket[PKT_HEADER1] = 0xFF
+    for idx in range(2, total_packet_length - 1):
+        checksum += txpacket[idx]
+    txpacket[total_packet_length - 1] = ~checksum & 0xFF
+    return bytes(bytearray(txpacket))
+
+
+def list_sync_write_packet(start_address, data_length, param, param_length):
+    txpacket = [0] * (param_length + 8)
+
+    txpacket[PKT_ID] = BROADCAST_ID
+    txpacket[PKT_LENGTH] = param_length + 4
+    txpacket[PKT_INSTRUCTION] = INST_SYNC_WRITE
+    txpacket[PKT_PARAMETER0 + 0] = start_address
+    txpacket[PKT_PARAMETER0 + 1] = data_length
+    txpacket[PKT_PARAMETER0 + 2: PKT_PARAMETER0 + 2 + param_length] = param[0: param_length]
+
+    checksum = 0
+    total_packet_length = txpacket[PKT_LENGTH] + 4
+    txpacket[PKT_HEADER0] = 0xFF
+    txpacket[PKT_HEADER1] = 0xFF
+    for idx in range(2, total_packet_length - 1):
+        checksum += txpacket[idx]
+    txpacket[total_packet_length - 1] = ~checksum & 0xFF
+    return bytes(bytearray(txpacket))
+
+
+def frame_packet(frame_view):
+    total_packet_length = len(frame_view)
+    frame_view[total_packet_length - 1] = packet_checksum(frame_view, total_packet_length)
+    return frame_view.tobytes()
+
+
+def run(rounds=ROUNDS):
+    portHandler = NullPortHandler()
+    packetHandler = sts(portHandler)
+
+    goal = [50, 0x00, 0x08, 0, 0, 0xDC, 0x05]  # acc, position 2048, time 0, speed 1500
+    sync_param = []
+    for sts_id in range(1, 21):
+        sync_param.append(sts_id)
+        sync_param.extend(goal)
+
+    # the frame path must produce the same bytes as the list path
+    packetHandler.writeTxOnly(1, STS_ACC, len(goal), goal)
+    frame = packetHandler.getTxFrame(INST_WRITE)
+    assert frame.view[0: len(goal) + 7].tobytes() == list_write_packet(1, STS_ACC, len(goal), goal)
+    packetHandler.syncWriteTxOnly(STS_ACC, len(goal), sync_param, len(sync_param))
+    frame = packetHandler.getTxFrame(INST_SYNC_WRITE)
+    assert frame.view[0: len(sync_param) + 8].tobytes() == \
+        list_sync_write_packet(STS_ACC, len(goal), sync_param, len(sync_param))
+
+    write_frame = PacketFrame(INST_WRITE)
+    sync_write_frame = PacketFrame(INST_SYNC_WRITE)
+    cases = [
+        ("write 7 bytes",
+         lambda: list_write_packet(1, STS_ACC, len(goal), goal),
+         lambda: frame_packet(write_frame.packAddress(1, STS_ACC, goal, len(goal))),
+         lambda: packetHandler.writeTxOnly(1, STS_ACC, len(goal), goal)),
+        ("sync write 20 servos",
+         lambda: list_sync_write_packet(STS_ACC, len(goal), sync_param, len(sync_param)),
+         lambda: frame_packet(sync_write_frame.packSync(STS_ACC, len(goal), sync_param, len(sync_param))),
+         lambda: packetHandler.syncWriteTxOnly(STS_ACC, len(goal), sync_param, len(sync_param))),
+    ]
+
+    results = {}
+    for name, list_path, frame_path, call_path in cases:
+        list_time = min(timeit.repeat(list_path, number=rounds, repeat=3)) / rounds
+        frame_time = min(timeit.repeat(frame_path, number=rounds, repeat=3)) / rounds
+        call_time = min(timeit.repeat(call_path, number=rounds, repeat=3)) / rounds
+        results[name] = {
+            "list_us": list_time * 1e6,
+            "frame_us": frame_time * 1e6,
+            "speedup": list_time / frame_time,
+            "call_us": call_time * 1e6,
+        }
+    return results
+
+
+if __name__ == "__main__":
+    for name, result in run().items():
+        print("%-22s list %7.2f us   frame %7.2f us   x%.2f   full call %7.2f us"
+              % (name, result["list_us"], result["frame_us"], result["speedup"], result["call_us"]))
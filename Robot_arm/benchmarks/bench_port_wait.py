@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+#
+# *********     PortHandler Wait Mode: CPU and Latency      *********
+#
+# Runs read transactions against a fake servo on a Linux pty, once with the
+# default spinning PortHandler and once with PortHandler(blocking=True), and
+# reports CPU time per transaction and the round trip time for both.
+#
+
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from STservo_sdk import *  # Uses STServo SDK library
+
+TRANSACTIONS = 300
+REPLY_DELAY = 0.002  # seconds the fake servo takes to answer
+
+
+def status_packet(sts_id, data):
+    packet = [0xFF, 0xFF, sts_id, len(data) + 2, 0] + list(data)
+    packet.append(~sum(packet[2:]) & 0xFF)
+    return bytes(packet)
+
+
+class PtyServo(object):
+    # answers every instruction packet for one of its ids with a status
+    # packet, carrying the requested bytes for a READ, stays silent for any
+    # other id and for broadcasts other than a SYNC_READ, which gets a status
+    # packet from each of its listed ids
+    def __init__(self, reply_delay, ids=None):
+        self.master, self.slave = os.openpty()
+        self.port_name = os.ttyname(self.slave)
+        self.reply_delay = reply_delay
+        self.ids = ids
+        self.running = True
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def serve(self):
+        request = bytearray()
+        while self.running:
+            try:
+                request += os.read(self.master, 256)
+            except OSError:
+                break
+            while len(request) > PKT_LENGTH:
+                if request[PKT_HEADER0] != 0xFF or request[PKT_HEADER1] != 0xFF:
+                    del request[0]
+                    continue
+                packet_length = request[PKT_LENGTH] + 4
+                if len(request) < packet_length:
+                    break
+
+                sts_id = request[PKT_ID]
+                instruction = request[PKT_INSTRUCTION]
+                read_length = request[PKT_PARAMETER0 + 1] if instruction in (INST_READ, INST_SYNC_READ) else 0
+                if instruction == INST_SYNC_READ:
+                    sts_ids = list(request[PKT_PARAMETER0 + 2: packet_length - 1])
+                else:
+                    sts_ids = [sts_id]
+                del request[0: packet_length]
+                if sts_id == BROADCAST_ID and instruction != INST_SYNC_READ:
+                    continue
+                sts_ids = [sts_id for sts_id in sts_ids if self.ids is None or sts_id in self.ids]
+                if not sts_ids:
+                    continue
+                time.sleep(self.reply_delay)
+                data = ([0x00, 0x08] + [0x00] * read_length)[0: read_length]
+                os.write(self.master, b"".join(status_packet(sts_id, data) for sts_id in sts_ids))
+
+    def close(self):
+        self.running = False
+        os.close(self.master)
+        os.close(self.slave)
+
+
+def measure(blocking, transactions=TRANSACTIONS, reply_delay=REPLY_DELAY):
+    servo = PtyServo(reply_delay)
+    portHandler = PortHandler(servo.port_name, blocking=blocking)
+    portHandler.openPort()
+    packetHandler = sts(portHandler)
+
+    failures = 0
+    rtts = []
+    cpu_start = time.thread_time()
+    for _ in range(transactions):
+        start = time.perf_counter()
+        _, _, result, _ = packetHandler.ReadPosSpeed(1)
+        rtts.append(time.perf_counter() - start)
+        if result != COMM_SUCCESS:
+            failures += 1
+    cpu = time.thread_time() - cpu_start
+
+    portHandler.closePort()
+    servo.close()
+
+    rtts.sort()
+    return {
+        "cpu_us_per_transaction": cpu / transactions * 1e6,
+        "cpu_share": cpu / sum(rtts),
+        "rtt_median_ms": rtts[len(rtts) // 2] * 1e3,
+        "rtt_p99_ms": rtts[int(len(rtts) * 0.99)] * 1e3,
+        "failures": failures,
+    }
+
+
+def run():
+    return {"spin": measure(False), "blocking": measure(True)}
+
+
+if __name__ == "__main__":
+    print("%d transactions, fake servo replies after %.1f ms" % (TRANSACTIONS, REPLY_DELAY * 1e3))
+    for mode, result in run().items():
+        print("%-8s cpu %7.1f us/transaction (%3.0f%% of one core)   rtt median %.3f ms  p99 %.3f ms  failures %d"
+              % (mode, result["cpu_us_per_transaction"], result["cpu_share"] * 100,
+                 result["rtt_median_ms"], result["rtt_p99_ms"], result["failures"]))
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+#
+# *********     Staged Goals: GroupRegWrite vs. Per-Servo Writes      *********
+#
+# Sends a new goal to 7 servos on a 1 Mbps virtual bus four ways: one
+# WritePosEx per servo, RegWritePosEx per servo (regWriteTxRx) then
+# RegAction, StageWritePosEx + groupRegWrite.txPacket(), and the same with
+# verify=True. Reports ms per command and the start skew, the time between
+# the first and the last servo receiving its goal (0 when one ACTION starts
+# all of them), and checks every servo got its goal. Then unplugs one
+# servo to show the verify read catching it.
+#
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from STservo_sdk import *  # Uses STServo SDK library
+
+SERVO_IDS = [1, 2, 3, 4, 5, 6, 7]
+ROUNDS = 200
+
+
+def writeEach(packetHandler, goal):
+    # skew: every servo starts when its own write lands
+    start = time.perf_counter()
+    for sts_id in SERVO_IDS:
+        packetHandler.WritePosEx(sts_id, goal, 3400, 50)
+        if sts_id == SERVO_IDS[0]:
+            first = time.perf_counter()
+    return time.perf_counter() - start, time.perf_counter() - first
+
+
+def regWriteEach(packetHandler, goal):
+    start = time.perf_counter()
+    for sts_id in SERVO_IDS:
+        packetHandler.RegWritePosEx(sts_id, goal, 3400, 50)
+    packetHandler.RegAction()
+    return time.perf_counter() - start, 0.0
+
+
+def stageGroup(verify):
+    def command(packetHandler, goal):
+        start = time.perf_counter()
+        for sts_id in SERVO_IDS:
+            packetHandler.StageWritePosEx(sts_id, goal, 3400, 50)
+        packetHandler.groupRegWrite.txPacket(verify)
+        packetHandler.groupRegWrite.clearParam()
+        return time.perf_counter() - start, 0.0
+    return command
+
+
+def goalsReached(packetHandler, goal):
+    data, _ = packetHandler.SyncReadRegisters(SERVO_IDS, STS_GOAL_POSITION_L, 2)
+    return sum(packetHandler.sts_makeword(values[0], values[1]) == goal for values, _ in data.values())
+
+
+def main():
+    print("%-28s %10s %10s %8s" % ("method", "ms/command", "skew ms", "goals"))
+    for label, command in (("WritePosEx each", writeEach),
+                           ("RegWritePosEx each + action", regWriteEach),
+                           ("groupRegWrite", stageGroup(False)),
+                           ("groupRegWrite verify", stageGroup(True))):
+        portHandler = VirtualPortHandler(VirtualBus(SERVO_IDS))
+        portHandler.openPort()
+        packetHandler = sts(portHandler)
+        elapsed = skew = 0.0
+        reached = 0
+        for index in range(ROUNDS):
+            goal = 1024 + index
+            command_time, command_skew = command(packetHandler, goal)
+            elapsed += command_time
+            skew += command_skew
+            reached += goalsReached(packetHandler, goal)
+        print("%-28s %10.3f %10.3f %4d/%d"
+              % (label, elapsed / ROUNDS * 1000, skew / ROUNDS * 1000, reached, ROUNDS * len(SERVO_IDS)))
+
+    bus = VirtualBus(SERVO_IDS)
+    portHandler = VirtualPortHandler(bus)
+    portHandler.openPort()
+    packetHandler = sts(portHandler)
+    bus.removeServo(SERVO_IDS[-1])
+    for sts_id in SERVO_IDS:
+        packetHandler.StageWritePosEx(sts_id, 3000, 3400, 50)
+    packetHandler.groupRegWrite.txPacket(verify=True)
+    print()
+    print("servo %d unplugged: failed_ids %s, goals %d/%d"
+          % (SERVO_IDS[-1], packetHandler.groupRegWrite.failed_ids,
+             goalsReached(packetHandler, 3000), len(SERVO_IDS) - 1))
+
+
+if __name__ == "__main__":
+    main()
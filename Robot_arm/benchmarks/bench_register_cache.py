@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+#
+# *********     Register Shadow Cache      *********
+#
+# Runs the same session against 6 fake servos on a Linux pty with and
+# without a RegisterCache on the packet handler: a startup routine that
+# reads the EEPROM limits block and then writes the operating mode and
+# position offset it already holds (EEPROM writes go out even with the
+# cache and drop what it knows of the servo), a look up of the servo model
+# before every move, and a goal stream in which the operator holds the
+# slider still most of the time (WritePosEx with an unchanged goal).
+# Reports bus transactions, time and the cache counters.
+#
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from STservo_sdk import *  # Uses STServo SDK library
+from bench_port_wait import PtyServo
+
+SERVO_IDS = [1, 2, 3, 4, 5, 6]
+GOAL_ROUNDS = 100
+GOAL_CHANGE_EVERY = 10  # the goal moves on every 10th round only
+REPLY_DELAY = 0.0005  # seconds the fake servos take to answer
+
+
+class CountingPortHandler(PortHandler):
+    def __init__(self, port_name):
+        PortHandler.__init__(self, port_name, blocking=True)
+        self.packets = 0
+
+    def writePort(self, packet):
+        self.packets += 1
+        return PortHandler.writePort(self, packet)
+
+
+def session(packetHandler):
+    failures = 0
+    for sts_id in SERVO_IDS:
+        # limits, offsets and mode, STS_MIN_ANGLE_LIMIT_L up to STS_TORQUE_ENABLE
+        _, result, _ = packetHandler.readTxRx(sts_id, STS_MIN_ANGLE_LIMIT_L, STS_TORQUE_ENABLE - STS_MIN_ANGLE_LIMIT_L)
+        failures += result != COMM_SUCCESS
+        result, _ = packetHandler.write1ByteTxRx(sts_id, STS_MODE, 0)
+        failures += result != COMM_SUCCESS
+        result, _ = packetHandler.write2ByteTxRx(sts_id, STS_OFS_L, 0)
+        failures += result != COMM_SUCCESS
+
+    for index in range(GOAL_ROUNDS):
+        goal = 2048 + 10 * (index // GOAL_CHANGE_EVERY)
+        for sts_id in SERVO_IDS:
+            _, result, _ = packetHandler.read2ByteTxRx(sts_id, STS_MODEL_L)
+            failures += result != COMM_SUCCESS
+            result, _ = packetHandler.WritePosEx(sts_id, goal, 2400, 50)
+            failures += result != COMM_SUCCESS
+    return failures
+
+
+def run():
+    servo = PtyServo(REPLY_DELAY)
+    results = {}
+    for name, register_cache in (("uncached", None), ("cached", RegisterCache())):
+        portHandler = CountingPortHandler(servo.port_name)
+        portHandler.openPort()
+        packetHandler = sts(portHandler)
+        packetHandler.setRegisterCache(register_cache)
+
+        start = time.perf_counter()
+        failures = session(packetHandler)
+        results[name] = {
+            "ms": (time.perf_counter() - start) * 1e3,
+            "packets": portHandler.packets,
+            "failures": failures,
+            "stats": register_cache.getStats() if register_cache is not None else None,
+        }
+        portHandler.closePort()
+
+    servo.close()
+    return results
+
+
+if __name__ == "__main__":
+    results = run()
+    for name, result in results.items():
+        print("%-9s %5d packets   %7.1f ms   failures %d"
+              % (name, result["packets"], result["ms"], result["failures"]))
+    stats = results["cached"]["stats"]
+    print("cache: %d hits, %d misses (hit rate %.2f), %d of %d writes suppressed, %d invalidations"
+          % (stats["hits"], stats["misses"], stats["hit_rate"], stats["suppressed_writes"],
+             stats["writes"], stats["invalidations"]))
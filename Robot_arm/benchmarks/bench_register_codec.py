@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+#
+# *********     NumPy Register Codec vs. Scalar Helpers      *********
+#
+# First checks register_codec against the scalar protocol_packet_handler
+# helpers (sts_toscs, sts_tohost, sts_lobyte/hibyte, sts_makeword) over the
+# whole 16 bit range for both sts_end conventions and both sign bits, and
+# the packed sync write block against SyncWritePosEx. Then times packing a
+# 20 servo goal block and decoding a 20 servo position/speed sync read both
+# ways. No hardware needed.
+#
+
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from STservo_sdk import *  # Uses STServo SDK library
+
+SERVOS = 20
+ROUNDS = 2000
+
+
+def status_packet(sts_id, data):
+    packet = [0xFF, 0xFF, sts_id, len(data) + 2, 0] + list(data)
+    packet.append(~sum(packet[2:]) & 0xFF)
+    return bytes(packet)
+
+
+def validate():
+    ph = protocol_packet_handler(PortHandler("null"), 0)
+    words = np.arange(0x10000)
+    for end in (0, 1):
+        ph.sts_setend(end)
+        block = pack_words(words, end)
+        assert [list(row) for row in block] == [[ph.sts_lobyte(w), ph.sts_hibyte(w)] for w in range(0x10000)]
+        assert list(unpack_words(block, end)) == [ph.sts_makeword(a, b) for a, b in block.tolist()]
+
+    for sign_bit, top in ((STS_SIGN_BIT, 0x10000), (SCSCL_PWM_SIGN_BIT, 1 << (SCSCL_PWM_SIGN_BIT + 1))):
+        assert list(decode_sign_magnitude(words[0: top], sign_bit)) == \
+            [ph.sts_tohost(w, sign_bit) for w in range(top)]
+        values = np.arange(-(1 << sign_bit) + 1, 1 << sign_bit)
+        assert list(encode_sign_magnitude(values, sign_bit)) == [ph.sts_toscs(int(v), sign_bit) for v in values]
+
+    packetHandler = sts(PortHandler("null"))
+    sts_ids = list(range(1, SERVOS + 1))
+    positions = [(sts_id * 211) % 4096 for sts_id in sts_ids]
+    speeds = [1500 + sts_id for sts_id in sts_ids]
+    for sts_id, position, speed in zip(sts_ids, positions, speeds):
+        packetHandler.SyncWritePosEx(sts_id, position, speed, 50)
+    packetHandler.groupSyncWrite.makeParam()
+    assert pack_pos_ex(sts_ids, positions, speeds, 50) == bytes(packetHandler.groupSyncWrite.param)
+
+
+def scalar_pack(packetHandler, sts_ids, positions, speeds):
+    param = []
+    for sts_id, position, speed in zip(sts_ids, positions, speeds):
+        position = packetHandler.sts_toscs(position, 15)
+        speed = packetHandler.sts_toscs(speed, 15)
+        param.extend([sts_id, 50, packetHandler.sts_lobyte(position), packetHandler.sts_hibyte(position), 0, 0,
+                      packetHandler.sts_lobyte(speed), packetHandler.sts_hibyte(speed)])
+    return bytes(param)
+
+
+def scalar_decode(packetHandler, rxpacket):
+    positions = []
+    speeds = []
+    for index in range(0, len(rxpacket), 10):
+        data = rxpacket[index + PKT_PARAMETER0: index + PKT_PARAMETER0 + 4]
+        positions.append(packetHandler.sts_tohost(packetHandler.sts_makeword(data[0], data[1]), 15))
+        speeds.append(packetHandler.sts_tohost(packetHandler.sts_makeword(data[2], data[3]), 15))
+    return positions, speeds
+
+
+def vector_decode(rxpacket):
+    return decode_pos_speed(rxpacket)
+
+
+def run(rounds=ROUNDS):
+    validate()
+
+    packetHandler = sts(PortHandler("null"))
+    sts_ids = list(range(1, SERVOS + 1))
+    positions = [(sts_id * 211) % 4096 - 2048 for sts_id in sts_ids]
+    speeds = [(sts_id * 97) % 3000 - 1500 for sts_id in sts_ids]
+    id_array = np.array(sts_ids)
+    position_array = np.array(positions)
+    speed_array = np.array(speeds)
+    assert scalar_pack(packetHandler, sts_ids, positions, speeds) == pack_pos_ex(id_array, position_array,
+                                                                                 speed_array, 50)
+
+    rxpacket = bytearray()
+    for sts_id, position, speed in zip(sts_ids, positions, speeds):
+        position = packetHandler.sts_toscs(position, 15)
+        speed = packetHandler.sts_toscs(speed, 15)
+        rxpacket += status_packet(sts_id, [position & 0xFF, position >> 8, speed & 0xFF, speed >> 8])
+    vector_positions, vector_speeds = vector_decode(rxpacket)
+    assert (list(vector_positions), list(vector_speeds)) == scalar_decode(packetHandler, rxpacket) == (positions, speeds)
+
+    cases = [
+        ("pack %d goals" % SERVOS,
+         lambda: scalar_pack(packetHandler, sts_ids, positions, speeds),
+         lambda: pack_pos_ex(id_array, position_array, speed_array, 50)),
+        ("decode %d replies" % SERVOS,
+         lambda: scalar_decode(packetHandler, rxpacket),
+         lambda: vector_decode(rxpacket)),
+    ]
+    results = {}
+    for name, scalar_path, vector_path in cases:
+        scalar_time = min(timeit.repeat(scalar_path, number=rounds, repeat=3)) / rounds
+        vector_time = min(timeit.repeat(vector_path, number=rounds, repeat=3)) / rounds
+        results[name] = {
+            "scalar_us": scalar_time * 1e6,
+            "numpy_us": vector_time * 1e6,
+            "speedup": scalar_time / vector_time,
+        }
+    return results
+
+
+if __name__ == "__main__":
+    results = run()
+    print("codec matches the scalar helpers")
+    for name, result in results.items():
+        print("%-18s scalar %7.2f us   numpy %7.2f us   x%.2f"
+              % (name, result["scalar_us"], result["numpy_us"], result["speedup"]))
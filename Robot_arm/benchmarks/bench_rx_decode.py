@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+#
+# *********     Status Packet Decode Throughput      *********
+#
+# Feeds synthetic status packet streams with a growing share of line noise
+# through protocol_packet_handler.receivePacket and through the list based
+# extend/del resync loop rxPacket used before FrameDecoder, and reports
+# decoded packets and MB/s for both. receivePacket is rxPacket without the
+# bus release, which the old parser did not have. No hardware needed.
+#
+
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from STservo_sdk import *  # Uses STServo SDK library
+
+PACKETS = 5000
+NOISE_RATIOS = [0.0, 0.1, 0.5]
+REPEAT = 5  # best of, a single pass is at the mercy of the scheduler
+
+
+class MemoryPortHandler(PortHandler):
+    # serves a prepared byte stream, times out once it is used up
+    def __init__(self, stream):
+        PortHandler.__init__(self, "memory")
+        self.stream = stream
+        self.position = 0
+
+    def readPort(self, length):
+        data = self.stream[self.position: self.position + length]
+        self.position += len(data)
+        return data
+
+    def isPacketTimeout(self):
+        return self.position >= len(self.stream)
+
+
+def status_packet(sts_id, data):
+    packet = [0xFF, 0xFF, sts_id, len(data) + 2, 0] + list(data)
+    packet.append(~sum(packet[2:]) & 0xFF)
+    return bytes(packet)
+
+
+def make_stream(packets, noise_ratio, seed=1):
+    rng = random.Random(seed)
+    stream = bytearray()
+    for index in range(packets):
+        sts_id = 1 + index % 20
+        stream += status_packet(sts_id, [rng.randrange(256) for _ in range(4)])
+        while rng.random() < noise_ratio:
+            stream += bytes([rng.choice([0xFF, rng.randrange(256)]) for _ in range(rng.randrange(1, 16))])
+    return bytes(stream)
+
+
+def list_rx_packet(portHandler):
+    # rxPacket as it was before FrameDecoder
+    rxpacket = []
+
+    result = COMM_TX_FAIL
+    checksum = 0
+    rx_length = 0
+    wait_length = 6
+
+    while True:
+        rxpacket.extend(portHandler.readPort(wait_length - rx_length))
+        rx_length = len(rxpacket)
+        if rx_length >= wait_length:
+            for idx in range(0, (rx_length - 1)):
+                if (rxpacket[idx] == 0xFF) and (rxpacket[idx + 1] == 0xFF):
+                    break
+
+            if idx == 0:
+                if (rxpacket[PKT_ID] > 0xFD) or (rxpacket[PKT_LENGTH] > RXPACKET_MAX_LEN) or (
+                        rxpacket[PKT_ERROR] > 0x7F):
+                    del rxpacket[0]
+                    rx_length -= 1
+                    continue
+
+                if wait_length != (rxpacket[PKT_LENGTH] + PKT_LENGTH + 1):
+                    wait_length = rxpacket[PKT_LENGTH] + PKT_LENGTH + 1
+                    continue
+
+                if rx_length < wait_length:
+                    if portHandler.isPacketTimeout():
+                        result = COMM_RX_TIMEOUT if rx_length == 0 else COMM_RX_CORRUPT
+                        break
+                    else:
+                        continue
+
+                for i in range(2, wait_length - 1):
+                    checksum += rxpacket[i]
+                checksum = ~checksum & 0xFF
+
+                if rxpacket[wait_length - 1] == checksum:
+                    result = COMM_SUCCESS
+                else:
+                    result = COMM_RX_CORRUPT
+                break
+
+            else:
+                del rxpacket[0: idx]
+                rx_length -= idx
+
+        else:
+            if portHandler.isPacketTimeout():
+                result = COMM_RX_TIMEOUT if rx_length == 0 else COMM_RX_CORRUPT
+                break
+
+    return rxpacket, result
+
+
+def decode_list(stream):
+    portHandler = MemoryPortHandler(stream)
+    decoded = 0
+    while portHandler.position < len(stream):
+        _, result = list_rx_packet(portHandler)
+        if result == COMM_SUCCESS:
+            decoded += 1
+    return decoded
+
+
+def decode_frames(stream):
+    packetHandler = protocol_packet_handler(MemoryPortHandler(stream), 0)
+    decoded = 0
+    while True:
+        _, result = packetHandler.receivePacket()
+        if result == COMM_SUCCESS:
+            decoded += 1
+        elif result == COMM_RX_TIMEOUT or packetHandler.portHandler.isPacketTimeout():
+            break
+    return decoded
+
+
+def measure(decode, stream):
+    elapsed = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        decoded = decode(stream)
+        run_time = time.perf_counter() - start
+        elapsed = run_time if elapsed is None else min(elapsed, run_time)
+    return decoded, len(stream) / elapsed / 1e6
+
+
+def run(packets=PACKETS, noise_ratios=NOISE_RATIOS):
+    results = {}
+    for noise_ratio in noise_ratios:
+        stream = make_stream(packets, noise_ratio)
+        list_decoded, list_rate = measure(decode_list, stream)
+        frame_decoded, frame_rate = measure(decode_frames, stream)
+        results[noise_ratio] = {
+            "bytes": len(stream),
+            "list_packets": list_decoded,
+            "list_mb_s": list_rate,
+            "frame_packets": frame_decoded,
+            "frame_mb_s": frame_rate,
+        }
+    return results
+
+
+if __name__ == "__main__":
+    print("%d status packets" % PACKETS)
+    for noise_ratio, result in run().items():
+        print("noise %.1f  %7d bytes   list %5d pkts %6.2f MB/s   frame %5d pkts %6.2f MB/s"
+              % (noise_ratio, result["bytes"], result["list_packets"], result["list_mb_s"],
+                 result["frame_packets"], result["frame_mb_s"]))
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+#
+# *********     ServoCluster Scaling      *********
+#
+# Runs the control cycle of a 7 servo arm (SyncReadState of every servo,
+# then a SyncWritePosEx sync write to all of them) on 1, 2, 3 and 4 virtual
+# 1 Mbps buses behind one ServoCluster, 7 servos per bus, and reports cycles
+# per second and aggregate servo updates per second against the single bus.
+# Then holds a 200 Hz ControlLoop on two arms, once with all 14 servos on
+# one bus and once with one arm per bus.
+#
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from STservo_sdk import *  # Uses STServo SDK library
+
+SERVOS_PER_BUS = 7  # 6 joints and a gripper
+BUS_COUNTS = [1, 2, 3, 4]
+CYCLES = 300
+LOOP_RATE = 200
+LOOP_DURATION = 2.0
+
+
+def makeCluster(bus_ids):
+    cluster = ServoCluster()
+    for sts_ids in bus_ids:
+        portHandler = VirtualPortHandler(VirtualBus(sts_ids))
+        portHandler.openPort()
+        cluster.addBus(sts(portHandler), sts_ids)
+    return cluster
+
+
+def splitIds(buses):
+    return [list(range(bus * SERVOS_PER_BUS + 1, (bus + 1) * SERVOS_PER_BUS + 1)) for bus in range(buses)]
+
+
+def control(cluster):
+    def step(states, cycle):
+        for sts_id, state in states.items():
+            cluster.SyncWritePosEx(sts_id, 2048 + (cycle % 200), 3400, 50)
+    return step
+
+
+def runCycles(cluster, cycles):
+    step = control(cluster)
+    failures = 0
+    start = time.perf_counter()
+    for cycle in range(cycles):
+        states, result = cluster.SyncReadState()
+        failures += result != COMM_SUCCESS or len(states) != len(cluster.getIds())
+        step(states, cycle)
+        cluster.groupSyncWrite.txPacket()
+        cluster.groupSyncWrite.clearParam()
+    return time.perf_counter() - start, failures
+
+
+def main():
+    print("%5s %7s %10s %12s %8s %8s" % ("buses", "servos", "cycles/s", "updates/s", "scaling", "failed"))
+    single = None
+    for buses in BUS_COUNTS:
+        cluster = makeCluster(splitIds(buses))
+        elapsed, failures = runCycles(cluster, CYCLES)
+        cluster.close()
+        updates = CYCLES * buses * SERVOS_PER_BUS / elapsed
+        single = single or updates
+        print("%5d %7d %10.0f %12.0f %7.2fx %8d"
+              % (buses, buses * SERVOS_PER_BUS, CYCLES / elapsed, updates, updates / single, failures))
+
+    print()
+    print("ControlLoop at %d Hz, two arms" % LOOP_RATE)
+    for label, bus_ids in (("one bus", [sum(splitIds(2), [])]), ("two buses", splitIds(2))):
+        cluster = makeCluster(bus_ids)
+        loop = ControlLoop(cluster, cluster.getIds(), control(cluster), rate=LOOP_RATE)
+        loop.run(duration=LOOP_DURATION)
+        stats = loop.getStats()
+        cluster.close()
+        print("  %-9s %6.1f Hz, %4d overruns, cycle p99 %.2f ms"
+              % (label, stats["rate"], stats["overruns"], stats["cycle_ms"]["p99"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+#
+# *********     ReadState / SyncReadState vs. Per-Field Reads      *********
+#
+# Polls position, speed, load, voltage, temperature, status, moving flag
+# and current of 6 fake servos on a Linux pty three ways: one transaction
+# per field (ReadPosSpeed, read1ByteTxRx/read2ByteTxRx as the scripts do
+# today), one ReadState per servo, and one SyncReadState for the whole bus.
+# Reports time and bus transactions per full poll.
+#
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from STservo_sdk import *  # Uses STServo SDK library
+from bench_port_wait import PtyServo
+from bench_register_cache import CountingPortHandler
+
+SERVO_IDS = [1, 2, 3, 4, 5, 6]
+ROUNDS = 30
+REPLY_DELAY = 0.0005  # seconds the fake servos take to answer
+
+
+def poll_fields(packetHandler, sts_ids):
+    states = {}
+    for sts_id in sts_ids:
+        position, speed, result, error = packetHandler.ReadPosSpeed(sts_id)
+        load, _, _ = packetHandler.read2ByteTxRx(sts_id, STS_PRESENT_LOAD_L)
+        voltage, _, _ = packetHandler.read1ByteTxRx(sts_id, STS_PRESENT_VOLTAGE)
+        temperature, _, _ = packetHandler.read1ByteTxRx(sts_id, STS_PRESENT_TEMPERATURE)
+        status, _, _ = packetHandler.read1ByteTxRx(sts_id, STATE_START_ADDRESS + STATE_STATUS_OFFSET)
+        moving, _, _ = packetHandler.ReadMoving(sts_id)
+        current, _, _ = packetHandler.read2ByteTxRx(sts_id, STS_PRESENT_CURRENT_L)
+        if result == COMM_SUCCESS:
+            states[sts_id] = ServoState(sts_id, position, speed, packetHandler.sts_tohost(load, LOAD_SIGN_BIT),
+                                        voltage, temperature, status, moving,
+                                        packetHandler.sts_tohost(current, 15), error)
+    return states
+
+
+def poll_state(packetHandler, sts_ids):
+    states = {}
+    for sts_id in sts_ids:
+        state, result, _ = packetHandler.ReadState(sts_id)
+        if result == COMM_SUCCESS:
+            states[sts_id] = state
+    return states
+
+
+def poll_sync(packetHandler, sts_ids):
+    states, _ = packetHandler.SyncReadState(sts_ids)
+    return states
+
+
+def run(rounds=ROUNDS):
+    servo = PtyServo(REPLY_DELAY)
+    portHandler = CountingPortHandler(servo.port_name)
+    portHandler.openPort()
+    packetHandler = sts(portHandler)
+
+    reference = None
+    results = {}
+    for name, poll in (("per field", poll_fields), ("ReadState", poll_state), ("SyncReadState", poll_sync)):
+        packets = portHandler.packets
+        failures = 0
+        start = time.perf_counter()
+        for _ in range(rounds):
+            states = poll(packetHandler, SERVO_IDS)
+            failures += len(states) != len(SERVO_IDS)
+        elapsed = (time.perf_counter() - start) / rounds
+
+        # the fake servos answer every read with the same bytes, so only the
+        # block reads can be compared
+        if poll is not poll_fields:
+            decoded = dict((sts_id, state.asDict()) for sts_id, state in states.items())
+            if reference is None:
+                reference = decoded
+            assert decoded == reference, name
+        results[name] = {
+            "ms": elapsed * 1e3,
+            "packets": (portHandler.packets - packets) / float(rounds),
+            "failures": failures,
+        }
+
+    portHandler.closePort()
+    servo.close()
+    return results
+
+
+if __name__ == "__main__":
+    print("%d servos, fake servos reply after %.1f ms" % (len(SERVO_IDS), REPLY_DELAY * 1e3))
+    for name, result in run().items():
+        print("%-14s %6.2f ms   %4.1f packets per poll   failed polls %d"
+              % (name, result["ms"], result["packets"], result["failures"]))
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+#
+# *********     SyncReadPosSpeed vs. a ReadPosSpeed Loop      *********
+#
+# Polls position and speed of 5, 10 and 20 fake servos on a Linux pty, once
+# with one ReadPosSpeed transaction per servo and once with a single
+# SyncReadPosSpeed, and reports the time per full poll for both.
+#
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from STservo_sdk import *  # Uses STServo SDK library
+from bench_port_wait import PtyServo
+
+SERVO_COUNTS = [5, 10, 20]
+ROUNDS = 50
+REPLY_DELAY = 0.0005  # seconds the fake servos take to answer
+
+
+def poll_sequential(packetHandler, sts_ids):
+    positions = {}
+    for sts_id in sts_ids:
+        position, speed, result, error = packetHandler.ReadPosSpeed(sts_id)
+        if result == COMM_SUCCESS:
+            positions[sts_id] = (position, speed, error)
+    return positions
+
+
+def poll_sync(packetHandler, sts_ids):
+    positions, _ = packetHandler.SyncReadPosSpeed(sts_ids)
+    return positions
+
+
+def measure(poll, packetHandler, sts_ids, rounds):
+    failures = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        if len(poll(packetHandler, sts_ids)) != len(sts_ids):
+            failures += 1
+    return (time.perf_counter() - start) / rounds, failures
+
+
+def run(servo_counts=SERVO_COUNTS, rounds=ROUNDS):
+    servo = PtyServo(REPLY_DELAY)
+    portHandler = PortHandler(servo.port_name, blocking=True)
+    portHandler.openPort()
+    packetHandler = sts(portHandler)
+
+    results = {}
+    for count in servo_counts:
+        sts_ids = list(range(1, count + 1))
+        sequential_time, sequential_failures = measure(poll_sequential, packetHandler, sts_ids, rounds)
+        sync_time, sync_failures = measure(poll_sync, packetHandler, sts_ids, rounds)
+        results[count] = {
+            "sequential_ms": sequential_time * 1e3,
+            "sync_ms": sync_time * 1e3,
+            "speedup": sequential_time / sync_time,
+            "failures": sequential_failures + sync_failures,
+        }
+
+    portHandler.closePort()
+    servo.close()
+    return results
+
+
+if __name__ == "__main__":
+    print("%d polls each, fake servos reply after %.1f ms" % (ROUNDS, REPLY_DELAY * 1e3))
+    for count, result in run().items():
+        print("%2d servos   ReadPosSpeed loop %7.2f ms   SyncReadPosSpeed %6.2f ms   x%.1f   failed polls %d"
+              % (count, result["sequential_ms"], result["sync_ms"], result["speedup"], result["failures"]))
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+#
+# *********     Sync Read Response Demultiplexing      *********
+#
+# Times GroupSyncRead.storeRxPacket, the single pass demultiplexer, against
+# the loop it replaced (GroupSyncRead.readRx rescanning the whole response
+# for every registered ID) on concatenated status packets of 5 to 100
+# servos. A second pass corrupts one frame, whose garbled data happens to
+# look like the header of the next servo's frame, and counts the servos
+# each method still gets the right data for.
+# No hardware needed.
+#
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from STservo_sdk import *  # Uses STServo SDK library
+
+SERVO_COUNTS = [5, 20, 50, 100]
+DATA_LENGTH = 4
+ROUNDS = 200
+
+
+def status_packet(sts_id, data):
+    packet = [0xFF, 0xFF, sts_id, len(data) + 2, 0] + list(data)
+    packet.append(~sum(packet[2:]) & 0xFF)
+    return bytes(packet)
+
+
+def make_response(sts_ids, rng, corrupt_id=None):
+    expected = {}
+    rxpacket = bytearray()
+    for sts_id in sts_ids:
+        data = [rng.choice([0xFF, sts_ids[0], rng.randrange(256)]) for _ in range(DATA_LENGTH)]
+        if sts_id == corrupt_id:
+            data = [0xFF, 0xFF, sts_id + 1, DATA_LENGTH + 2]
+        packet = bytearray(status_packet(sts_id, data))
+        if sts_id == corrupt_id:
+            packet[-1] ^= 0x55
+        else:
+            expected[sts_id] = [0] + data
+        rxpacket += packet
+    return rxpacket, expected
+
+
+def legacy_store(groupSyncRead, rxpacket):
+    # GroupSyncRead.rxPacket before the single pass demultiplexer
+    result = COMM_RX_FAIL
+    for sts_id in groupSyncRead.data_dict:
+        groupSyncRead.data_dict[sts_id], result = groupSyncRead.readRx(rxpacket, sts_id, groupSyncRead.data_length)
+    return result
+
+
+def make_group(sts_ids):
+    groupSyncRead = GroupSyncRead(sts(PortHandler("null")), STS_PRESENT_POSITION_L, DATA_LENGTH)
+    for sts_id in sts_ids:
+        groupSyncRead.addParam(sts_id)
+    return groupSyncRead
+
+
+def correct(groupSyncRead, expected):
+    return sum(1 for sts_id, data in expected.items() if groupSyncRead.data_dict[sts_id] == data)
+
+
+def run(servo_counts=SERVO_COUNTS, rounds=ROUNDS):
+    rng = random.Random(1)
+    results = {}
+    for count in servo_counts:
+        sts_ids = list(range(1, count + 1))
+        groupSyncRead = make_group(sts_ids)
+
+        rxpacket, expected = make_response(sts_ids, rng)
+        legacy_time = min(timeit.repeat(lambda: legacy_store(groupSyncRead, rxpacket), number=rounds, repeat=3)) / rounds
+        demux_time = min(timeit.repeat(lambda: groupSyncRead.storeRxPacket(COMM_SUCCESS, rxpacket),
+                                       number=rounds, repeat=3)) / rounds
+
+        rxpacket, expected = make_response(sts_ids, rng, corrupt_id=sts_ids[len(sts_ids) // 2])
+        legacy_store(groupSyncRead, rxpacket)
+        legacy_correct = correct(groupSyncRead, expected)
+        groupSyncRead.storeRxPacket(COMM_SUCCESS, rxpacket)
+        demux_correct = correct(groupSyncRead, expected)
+
+        results[count] = {
+            "legacy_us": legacy_time * 1e6,
+            "demux_us": demux_time * 1e6,
+            "speedup": legacy_time / demux_time,
+            "intact_servos": len(expected),
+            "legacy_correct": legacy_correct,
+            "demux_correct": demux_correct,
+        }
+    return results
+
+
+if __name__ == "__main__":
+    for count, result in run().items():
+        print("%3d servos   per-ID rescan %8.1f us   single pass %7.1f us   x%5.1f   "
+              "one corrupt frame: correct %d / %d vs %d / %d"
+              % (count, result["legacy_us"], result["demux_us"], result["speedup"],
+                 result["legacy_correct"], result["intact_servos"],
+                 result["demux_correct"], result["intact_servos"]))
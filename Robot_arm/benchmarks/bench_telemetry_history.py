@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+#
+# *********     Telemetry History      *********
+#
+# Feeds two hours of simulated 200 Hz telemetry of 7 servos (a slow sine on
+# every channel, one servo missing now and then) into a TelemetryHistory
+# and reports the time per sample, the memory it holds, which resolution
+# answers windows of the last 10 s, 10 min and 2 h, and the size of their
+# .npz and CSV exports. Then times publish() with the ServoStates of one
+# cycle, the path a ControlLoop publisher takes.
+#
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from STservo_sdk import *  # Uses STServo SDK library
+
+SERVO_IDS = [1, 2, 3, 4, 5, 6, 7]
+RATE = 200
+HOURS = 2.0
+WINDOWS = [("last 10 s", 10), ("last 10 min", 600), ("last 2 h", 7200)]
+LEVEL_NAMES = {-1: "raw", 0: "10 Hz", 1: "1 Hz"}
+
+
+def main():
+    history = TelemetryHistory(SERVO_IDS)
+    samples = int(HOURS * 3600 * RATE)
+    phase = np.arange(len(SERVO_IDS), dtype=np.float32)
+    scale = np.array([[1000], [500], [20], [0], [0], [50]], np.float32)
+    offset = np.array([[2048], [0], [0], [12], [30], [100]], np.float32)
+    elapsed = 0.0
+    for sample in range(samples):
+        timestamp = sample / float(RATE)
+        block = offset + scale * np.sin(timestamp * 0.5 + phase)
+        block[4] += 10 * timestamp / (HOURS * 3600)
+        if sample % 1000 == 0:
+            block[0, 3] = np.nan
+        start = time.perf_counter()
+        history.addSample(timestamp, block)
+        elapsed += time.perf_counter() - start
+    history.flush()
+    now = samples / float(RATE)
+
+    print("%d samples of %d servos in %.1f s, %.1f us per sample, %.1f MB held"
+          % (samples, len(SERVO_IDS), elapsed, elapsed / samples * 1e6, history.getMemoryUsage() / 1e6))
+    directory = tempfile.mkdtemp()
+    for label, seconds in WINDOWS:
+        level = history.getLevel(now - seconds)
+        times, columns = history.getWindow(now - seconds, level=level)
+        npz = os.path.join(directory, "window.npz")
+        csv_path = os.path.join(directory, "window.csv")
+        history.exportNpz(npz, now - seconds, level=level)
+        history.exportCsv(csv_path, now - seconds, level=level)
+        print("  %-12s %-6s %6d rows, covers %7.1f s, npz %8d B, csv %9d B"
+              % (label, LEVEL_NAMES[level], len(times), times[-1] - times[0] if len(times) else 0.0,
+                 os.path.getsize(npz), os.path.getsize(csv_path)))
+
+    states = dict((sts_id, ServoState(sts_id, 2048, 0, 100, 120, 35, 0, 0, 20, 0)) for sts_id in SERVO_IDS)
+    history = TelemetryHistory(SERVO_IDS)
+    start = time.perf_counter()
+    for cycle in range(10000):
+        history.publish(states, cycle / float(RATE))
+    print("publish() with %d ServoStates: %.1f us per cycle" % (len(SERVO_IDS), (time.perf_counter() - start) / 10000 * 1e6))
+
+
+if __name__ == "__main__":
+    main()
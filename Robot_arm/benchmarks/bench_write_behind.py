@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+#
+# *********     Write-Behind Streaming vs. Acknowledged Writes      *********
+#
+# Sends goals to 7 servos on a 1 Mbps virtual bus for 500 cycles three ways:
+# WritePosEx with its acknowledgement, WriteBehind streaming with a verify
+# read every 10 cycles, and WriteBehind with STS_RESPONSE_LEVEL 0 on every
+# servo so the writes go out back to back. Reports goal writes per second.
+# Then servo 4 stops listening (switched to another baud rate) for 100
+# cycles and comes back, showing when WriteBehind flags it, falls back to
+# acknowledged writes and returns it to streaming.
+#
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from STservo_sdk import *  # Uses STServo SDK library
+
+SERVO_IDS = [1, 2, 3, 4, 5, 6, 7]
+CYCLES = 500
+LOST_ID = 4
+LOST_CYCLES = (100, 200)
+
+
+def makeHandler():
+    bus = VirtualBus(SERVO_IDS)
+    portHandler = VirtualPortHandler(bus)
+    portHandler.openPort()
+    return bus, sts(portHandler)
+
+
+def setResponseLevel(packetHandler, level):
+    for sts_id in SERVO_IDS:
+        packetHandler.unLockEprom(sts_id)
+        packetHandler.write1ByteTxRx(sts_id, STS_RESPONSE_LEVEL, level)
+        packetHandler.LockEprom(sts_id)
+
+
+def runAcknowledged(packetHandler):
+    for cycle in range(CYCLES):
+        for sts_id in SERVO_IDS:
+            packetHandler.WritePosEx(sts_id, 1024 + cycle, 3400, 50)
+
+
+def runStreamed(writer):
+    for cycle in range(CYCLES):
+        for sts_id in SERVO_IDS:
+            writer.WritePosEx(sts_id, 1024 + cycle, 3400, 50)
+        writer.endCycle()
+    writer.flush()
+
+
+def main():
+    print("%-32s %10s %9s" % ("method", "writes/s", "speedup"))
+    bus, packetHandler = makeHandler()
+    start = time.perf_counter()
+    runAcknowledged(packetHandler)
+    baseline = CYCLES * len(SERVO_IDS) / (time.perf_counter() - start)
+    print("%-32s %10.0f %8.2fx" % ("WritePosEx acknowledged", baseline, 1.0))
+
+    for label, level in (("WriteBehind", 1), ("WriteBehind, response level 0", 0)):
+        bus, packetHandler = makeHandler()
+        setResponseLevel(packetHandler, level)
+        writer = WriteBehind(packetHandler, replies=bool(level))
+        start = time.perf_counter()
+        runStreamed(writer)
+        rate = CYCLES * len(SERVO_IDS) / (time.perf_counter() - start)
+        print("%-32s %10.0f %8.2fx   misses %d" % (label, rate, rate / baseline, writer.stats["misses"]))
+
+    print()
+    print("servo %d off the bus from cycle %d to %d" % ((LOST_ID,) + LOST_CYCLES))
+    bus, packetHandler = makeHandler()
+    writer = WriteBehind(packetHandler)
+    lost = bus.getServo(LOST_ID)
+    fallback = False
+    for cycle in range(CYCLES):
+        if cycle == LOST_CYCLES[0]:
+            lost.memory[STS_BAUD_RATE] = STS_115200
+        elif cycle == LOST_CYCLES[1]:
+            lost.memory[STS_BAUD_RATE] = STS_1M
+        for sts_id in SERVO_IDS:
+            writer.WritePosEx(sts_id, 1024 + cycle, 3400, 50)
+        flagged = writer.endCycle()
+        if flagged:
+            print("  cycle %3d: flagged %s, acknowledged writes from now on" % (cycle, flagged))
+        if fallback and not writer.fallback_ids:
+            print("  cycle %3d: back in step, streaming again" % cycle)
+        fallback = bool(writer.fallback_ids)
+    print("  %s" % writer.stats)
+
+
+if __name__ == "__main__":
+    main()
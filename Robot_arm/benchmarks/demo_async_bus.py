@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+#
+# *********     asyncio: Coroutines Sharing One Bus      *********
+#
+# Four telemetry coroutines poll ReadPosSpeed of their own servo, a control
+# coroutine sends WritePosEx and sync writes, and a ticker coroutine checks
+# how late a 1 ms sleep wakes up, all on one AsyncPortHandler talking to a
+# fake servo on a Linux pty. Reports transactions, failures, the CPU share
+# of the process and the ticker lateness: a low CPU share and a lateness
+# close to that of an idle loop show the bus waits happen in the event loop,
+# not in a busy loop.
+#
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from STservo_sdk import *  # Uses STServo SDK library
+from bench_port_wait import PtyServo
+
+DURATION = 2.0  # seconds
+REPLY_DELAY = 0.002  # seconds the fake servo takes to answer
+TELEMETRY_IDS = [1, 2, 3, 4]
+
+
+async def telemetry(packetHandler, sts_id, counts, stop):
+    while not stop.is_set():
+        _, _, result, _ = await packetHandler.ReadPosSpeed(sts_id)
+        counts[result] = counts.get(result, 0) + 1
+
+
+async def control(packetHandler, counts, stop):
+    position = 0
+    while not stop.is_set():
+        position = (position + 64) % 4096
+        result, _ = await packetHandler.WritePosEx(1, position, 1500, 50)
+        counts[result] = counts.get(result, 0) + 1
+
+        for sts_id in TELEMETRY_IDS:
+            packetHandler.SyncWritePosEx(sts_id, position, 1500, 50)
+        result = await packetHandler.syncWrite()
+        packetHandler.groupSyncWrite.clearParam()
+        counts[result] = counts.get(result, 0) + 1
+
+        await asyncio.sleep(0.01)
+
+
+async def ticker(lateness, stop):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lateness.append(time.perf_counter() - start - 0.001)
+
+
+async def main(duration):
+    servo = PtyServo(REPLY_DELAY, ids=TELEMETRY_IDS)
+    portHandler = AsyncPortHandler(servo.port_name)
+    portHandler.openPort()
+    packetHandler = async_sts(portHandler)
+
+    counts = {}
+    lateness = []
+    stop = asyncio.Event()
+    tasks = [asyncio.ensure_future(telemetry(packetHandler, sts_id, counts, stop)) for sts_id in TELEMETRY_IDS]
+    tasks.append(asyncio.ensure_future(control(packetHandler, counts, stop)))
+    tasks.append(asyncio.ensure_future(ticker(lateness, stop)))
+
+    cpu_start = time.process_time()
+    await asyncio.sleep(duration)
+    stop.set()
+    await asyncio.gather(*tasks)
+    cpu = time.process_time() - cpu_start
+
+    portHandler.closePort()
+    servo.close()
+
+    lateness.sort()
+    return {
+        "transactions": sum(counts.values()),
+        "results": counts,
+        "cpu_share": cpu / duration,
+        "ticker_late_median_ms": lateness[len(lateness) // 2] * 1e3,
+        "ticker_late_p99_ms": lateness[int(len(lateness) * 0.99)] * 1e3,
+    }
+
+
+def run(duration=DURATION):
+    return asyncio.run(main(duration))
+
+
+if __name__ == "__main__":
+    result = run()
+    print("%d transactions in %.1f s, results %r" % (result["transactions"], DURATION, result["results"]))
+    print("cpu %.0f%% of one core (servo thread included), ticker late median %.2f ms  p99 %.2f ms"
+          % (result["cpu_share"] * 100, result["ticker_late_median_ms"], result["ticker_late_p99_ms"]))
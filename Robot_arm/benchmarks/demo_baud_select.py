@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+#
+# *********     Baud Rate Migration     *********
+#
+# Moves 6 emulated servos from 1M to 500k baud and back with
+# BaudRateManager.migrate(), then lets autoSelect() pick the fastest rate on
+# a bus whose long cable corrupts 5 % of the replies at 1M and 1 % at 500k,
+# and prints the error rate and sync reads per second it measured at each
+# candidate rate.
+#
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from STservo_sdk import *  # Uses STServo SDK library
+
+SERVO_IDS = [1, 2, 3, 4, 5, 6]
+CANDIDATES = [1000000, 500000, 250000, 115200]
+CABLE_ERRORS = {1000000: 0.05, 500000: 0.01}  # share of corrupt replies per baud rate
+
+
+class LongCableBus(VirtualBus):
+    # reply corruption that grows with the baud rate
+    def answer(self, packet, end_time, baudrate):
+        for servo in self.servos.values():
+            servo.corrupt_rate = CABLE_ERRORS.get(baudrate, 0.0)
+        return VirtualBus.answer(self, packet, end_time, baudrate)
+
+
+def servoBaudRates(bus):
+    return sorted(set(servo.getBaudRate() for servo in bus.servos.values()))
+
+
+def main():
+    bus = VirtualBus(SERVO_IDS)
+    portHandler = VirtualPortHandler(bus)
+    portHandler.openPort()
+    manager = BaudRateManager(sts(portHandler))
+
+    for baudrate in (500000, 1000000):
+        migrated, left_behind = manager.migrate(SERVO_IDS, baudrate)
+        print("migrate to %7d: migrated %s, left behind %s, host %d, servos %s"
+              % (baudrate, migrated, left_behind, portHandler.getBaudRate(), servoBaudRates(bus)))
+
+    bus = LongCableBus(SERVO_IDS)
+    portHandler = VirtualPortHandler(bus)
+    portHandler.openPort()
+    manager = BaudRateManager(sts(portHandler))
+    selected, results = manager.autoSelect(SERVO_IDS, CANDIDATES, transactions=200)
+    print()
+    print("autoSelect on a long cable")
+    for baudrate in CANDIDATES:
+        if baudrate in results:
+            error_rate, rate = results[baudrate]
+            print("  %7d baud: %5.1f %% failed sync reads, %6.0f sync reads/s" % (baudrate, error_rate * 100, rate))
+    print("selected %d, host %d, servos %s" % (selected, portHandler.getBaudRate(), servoBaudRates(bus)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+#
+# *********     Fixed-Rate Control Loop      *********
+#
+# Drives 6 fake servos on a Linux pty at 200 Hz for 2 s: every cycle one
+# SyncReadState, a sine wave goal per joint and one sync write. Runs once as
+# the scripts do it today (read, write, time.sleep(period)) and once with
+# ControlLoop, and reports the rate each one held. ControlLoop also reports
+# its jitter, bus and cycle time histograms. A last run at 1 kHz, more than
+# the bus can carry, shows overruns and skipped cycles.
+#
+
+import math
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from STservo_sdk import *  # Uses STServo SDK library
+from bench_port_wait import PtyServo
+
+SERVO_IDS = [1, 2, 3, 4, 5, 6]
+RATE = 200  # Hz
+DURATION = 2.0  # s
+REPLY_DELAY = 0.0005  # seconds the fake servos take to answer
+
+
+def make_control(packetHandler):
+    def control(states, cycle):
+        phase = 2 * math.pi * cycle / RATE
+        for sts_id in states:
+            packetHandler.SyncWritePosEx(sts_id, int(2048 + 500 * math.sin(phase + sts_id)), 2400, 50)
+    return control
+
+
+def run_sleep_loop(packetHandler, control):
+    # the ad-hoc loop: fixed sleep after the work, the work time adds drift
+    cycles = 0
+    start = time.monotonic()
+    while time.monotonic() - start < DURATION:
+        states, _ = packetHandler.SyncReadState(SERVO_IDS)
+        control(states, cycles)
+        packetHandler.groupSyncWrite.txPacket()
+        packetHandler.groupSyncWrite.clearParam()
+        cycles += 1
+        time.sleep(1.0 / RATE)
+    return cycles / (time.monotonic() - start)
+
+
+def run():
+    servo = PtyServo(REPLY_DELAY)
+    portHandler = PortHandler(servo.port_name, blocking=True)
+    portHandler.openPort()
+    packetHandler = sts(portHandler)
+    control = make_control(packetHandler)
+
+    results = {"sleep_rate": run_sleep_loop(packetHandler, control)}
+
+    loop = ControlLoop(packetHandler, SERVO_IDS, control, rate=RATE)
+    loop.run(duration=DURATION)
+    results["loop"] = loop.getStats()
+
+    overload = ControlLoop(packetHandler, SERVO_IDS, control, rate=1000, policy=LOOP_SKIP)
+    overload.run(duration=0.5)
+    results["overload"] = overload.getStats()
+
+    portHandler.closePort()
+    servo.close()
+    return results
+
+
+def describe(name, snapshot):
+    return "%s p50 %.2f ms  p99 %.2f ms  max %.2f ms" % (name, snapshot["p50"], snapshot["p99"], snapshot["max"])
+
+
+if __name__ == "__main__":
+    results = run()
+    stats = results["loop"]
+    print("target %d Hz: sleep loop %.1f Hz, ControlLoop %.1f Hz (%d cycles, %d overruns)"
+          % (RATE, results["sleep_rate"], stats["rate"], stats["cycles"], stats["overruns"]))
+    for name, key in (("jitter", "jitter_ms"), ("bus   ", "bus_ms"), ("cycle ", "cycle_ms")):
+        print("  " + describe(name, stats[key]))
+    stats = results["overload"]
+    print("target 1000 Hz: %.1f Hz, %d overruns, %d cycles skipped"
+          % (stats["rate"], stats["overruns"], stats["skipped"]))
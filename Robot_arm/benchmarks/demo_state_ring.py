@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+#
+# *********     Shared-Memory State Ring      *********
+#
+# The bus process runs a 200 Hz ControlLoop on 6 emulated servos and
+# publishes every cycle's states into a StateRingWriter. 1, 2 and 4 reader
+# processes then poll StateRingReader.getLatest() as fast as they can for
+# 2 s. Reports snapshots read per process, torn snapshots (servos of one
+# cycle with different timestamps), the age of the data read, and the bus
+# requests per second, which stay at the loop rate whatever the number of
+# readers.
+#
+
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from STservo_sdk import *  # Uses STServo SDK library
+
+SERVO_IDS = [1, 2, 3, 4, 5, 6]
+LOOP_RATE = 200
+DURATION = 2.0
+READER_COUNTS = [1, 2, 4]
+
+
+def reader(name, duration, results):
+    ring = StateRingReader(name)
+    snapshots = torn = 0
+    age = 0.0
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        cycle, snapshot = ring.getLatest()
+        if snapshot is None:
+            continue
+        snapshots += 1
+        timestamps = snapshot["timestamp"]
+        torn += timestamps.min() != timestamps.max()
+        age += time.monotonic() - timestamps.max()
+    ring.close()
+    results.put((snapshots, torn, age / max(snapshots, 1) * 1000.0))
+
+
+def main():
+    for readers in READER_COUNTS:
+        bus = VirtualBus(SERVO_IDS)
+        portHandler = VirtualPortHandler(bus)
+        portHandler.openPort()
+        packetHandler = sts(portHandler)
+        ring = StateRingWriter(SERVO_IDS)
+
+        def control(states, cycle):
+            for sts_id in SERVO_IDS:
+                packetHandler.SyncWritePosEx(sts_id, 2048 + (cycle % 400), 3400, 50)
+
+        loop = ControlLoop(packetHandler, SERVO_IDS, control, rate=LOOP_RATE)
+        loop.setPublisher(ring)
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=reader, args=(ring.getName(), DURATION, results))
+                     for _ in range(readers)]
+        loop.start()
+        for process in processes:
+            process.start()
+        outcomes = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        loop.stop()
+        requests_per_second = bus.stats["requests"] / loop.getStats()["cycles"] * LOOP_RATE
+        ring.close()
+
+        print("%d reader(s): %s snapshots/s per reader, %d torn, %.2f ms mean age, %.0f bus requests/s"
+              % (readers, "/".join("%.0f" % (snapshots / DURATION) for snapshots, _, _ in outcomes),
+                 sum(torn for _, torn, _ in outcomes), sum(age for _, _, age in outcomes) / readers,
+                 requests_per_second))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+#
+# *********     Virtual Servo Bus      *********
+#
+# Runs the usual SDK calls against 6 emulated servos, no hardware: ping,
+# ReadState, WritePosEx and the motion it starts, a sync write, a sync read,
+# reg write + action, once on the in-process VirtualPortHandler and once on
+# a pty through the unchanged pySerial PortHandler. Then times a 2 byte
+# read at 115200, 500000 and 1000000 baud on the virtual bus against the
+# wire time of its 8 + 8 bytes plus the servo response time, and shows
+# dropped, corrupted and slow replies from the fault injection.
+#
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from STservo_sdk import *  # Uses STServo SDK library
+
+SERVO_IDS = [1, 2, 3, 4, 5, 6]
+BAUDRATES = [115200, 500000, 1000000]
+ROUNDS = 300
+
+
+def exercise(packetHandler):
+    checks = {}
+    checks["ping"] = packetHandler.ping(1)[0] == STS3215_MODEL
+    state, result, _ = packetHandler.ReadState(2)
+    checks["ReadState"] = result == COMM_SUCCESS and state.position == 2048 and state.voltage == 12.0
+
+    packetHandler.WritePosEx(1, 2448, 3400, 50)
+    time.sleep(0.2)
+    checks["WritePosEx"] = packetHandler.ReadPos(1)[0] == 2448
+
+    for sts_id in SERVO_IDS:
+        packetHandler.SyncWritePosEx(sts_id, 1848, 3400, 50)
+    packetHandler.groupSyncWrite.txPacket()
+    packetHandler.groupSyncWrite.clearParam()
+    time.sleep(0.3)
+    positions, result = packetHandler.SyncReadPosSpeed(SERVO_IDS)
+    checks["sync write/read"] = result == COMM_SUCCESS and \
+        all(position == 1848 for position, _, _ in positions.values())
+
+    packetHandler.RegWritePosEx(3, 2048, 3400, 50)
+    unchanged = packetHandler.ReadPos(3)[0] == 1848
+    packetHandler.RegAction()
+    time.sleep(0.2)
+    checks["reg write/action"] = unchanged and packetHandler.ReadPos(3)[0] == 2048
+    return checks
+
+
+def time_reads(baudrate):
+    bus = VirtualBus(SERVO_IDS)
+    bus.setServoBaudRate(baudrate)
+    portHandler = VirtualPortHandler(bus)
+    portHandler.setBaudRate(baudrate)
+    packetHandler = sts(portHandler)
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        packetHandler.ReadPos(1)
+    return (time.perf_counter() - start) / ROUNDS * 1e3
+
+
+def faults():
+    bus = VirtualBus(SERVO_IDS, seed=7)
+    bus.setFaults(4, drop_rate=0.2)
+    bus.setFaults(5, corrupt_rate=0.2)
+    bus.setFaults(6, extra_delay=5.0)
+    portHandler = VirtualPortHandler(bus)
+    portHandler.openPort()
+    packetHandler = sts(portHandler)
+
+    results = {}
+    for sts_id in (4, 5, 6):
+        outcomes = {}
+        start = time.perf_counter()
+        for _ in range(50):
+            _, result, _ = packetHandler.ReadPos(sts_id)
+            outcomes[packetHandler.getTxRxResult(result)] = outcomes.get(packetHandler.getTxRxResult(result), 0) + 1
+        results[sts_id] = (outcomes, (time.perf_counter() - start) / 50 * 1e3)
+    return results
+
+
+if __name__ == "__main__":
+    portHandler = VirtualPortHandler(VirtualBus(SERVO_IDS))
+    portHandler.openPort()
+    print("in process:", exercise(sts(portHandler)))
+
+    pty = VirtualBus(SERVO_IDS).openPty()
+    portHandler = PortHandler(pty.port_name, blocking=True)
+    portHandler.openPort()
+    print("pty       :", exercise(sts(portHandler)))
+    portHandler.closePort()
+    pty.close()
+
+    for baudrate in BAUDRATES:
+        wire = 16 * 10000.0 / baudrate + VIRTUAL_RESPONSE_TIME
+        print("%7d baud   ReadPos %.3f ms   wire time %.3f ms" % (baudrate, time_reads(baudrate), wire))
+
+    for sts_id, (outcomes, elapsed) in faults().items():
+        print("servo %d   %5.2f ms per read   %s" % (sts_id, elapsed, outcomes))
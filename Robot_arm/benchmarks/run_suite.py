@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+#
+# *********     SDK Benchmark Suite      *********
+#
+# Runs the offline benchmarks in one go and writes the results to JSON:
+#
+#   packet_encode   instruction packet assembly (bench_packet_encode)
+#   rx_decode       rxPacket on clean and noisy streams (bench_rx_decode)
+#   sync_demux      sync read response demultiplexing (bench_sync_read_demux)
+#   sync_groups     GroupSyncWrite / GroupSyncRead transactions against
+#                   5 to 30 servos on the virtual bus at 1 Mbps
+#   end_to_end      read and write transactions per second and CPU per
+#                   transaction at 115200, 500000 and 1000000 baud on the
+#                   virtual bus
+#
+# --baseline compares against an earlier JSON file and lists every metric
+# that moved by more than --threshold; metrics ending in _us, _ms or
+# cpu_us count as better when lower, everything else when higher.
+#
+#   python run_suite.py --output before.json
+#   python run_suite.py --output after.json --baseline before.json
+#
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from STservo_sdk import *  # Uses STServo SDK library
+import bench_packet_encode
+import bench_rx_decode
+import bench_sync_read_demux
+
+SYNC_SERVO_COUNTS = [5, 10, 20, 30]  # 30 PosEx goals: 248 of TXPACKET_MAX_LEN bytes
+BAUDRATES = [115200, 500000, 1000000]
+TRANSACTIONS = 500
+
+
+def time_calls(call, count):
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    for _ in range(count):
+        call()
+    return (time.perf_counter() - wall) / count, (time.process_time() - cpu) / count
+
+
+def make_handler(sts_ids, baudrate=DEFAULT_BAUDRATE):
+    bus = VirtualBus(sts_ids)
+    bus.setServoBaudRate(baudrate)
+    portHandler = VirtualPortHandler(bus)
+    portHandler.setBaudRate(baudrate)
+    return sts(portHandler)
+
+
+def bench_sync_groups(servo_counts=SYNC_SERVO_COUNTS, transactions=TRANSACTIONS):
+    results = {}
+    for count in servo_counts:
+        sts_ids = list(range(1, count + 1))
+        packetHandler = make_handler(sts_ids)
+
+        def sync_write():
+            for sts_id in sts_ids:
+                packetHandler.SyncWritePosEx(sts_id, 2048, 2400, 50)
+            result = packetHandler.groupSyncWrite.txPacket()
+            packetHandler.groupSyncWrite.clearParam()
+            assert result == COMM_SUCCESS
+
+        def sync_read():
+            positions, result = packetHandler.SyncReadPosSpeed(sts_ids)
+            assert result == COMM_SUCCESS and len(positions) == count
+
+        write_time, write_cpu = time_calls(sync_write, transactions // 5)
+        read_time, read_cpu = time_calls(sync_read, transactions // 5)
+        results[count] = {
+            "write_us": write_time * 1e6,
+            "write_cpu_us": write_cpu * 1e6,
+            "read_us": read_time * 1e6,
+            "read_cpu_us": read_cpu * 1e6,
+            "servo_updates_per_s": count / (write_time + read_time),
+        }
+    return results
+
+
+def bench_end_to_end(baudrates=BAUDRATES, transactions=TRANSACTIONS):
+    results = {}
+    for baudrate in baudrates:
+        packetHandler = make_handler([1], baudrate)
+
+        def read():
+            _, result, _ = packetHandler.ReadPos(1)
+            assert result == COMM_SUCCESS
+
+        def write():
+            result, _ = packetHandler.WritePosEx(1, 2048, 2400, 50)
+            assert result == COMM_SUCCESS
+
+        read_time, read_cpu = time_calls(read, transactions)
+        write_time, write_cpu = time_calls(write, transactions)
+        results[baudrate] = {
+            "reads_per_s": 1.0 / read_time,
+            "read_cpu_us": read_cpu * 1e6,
+            "writes_per_s": 1.0 / write_time,
+            "write_cpu_us": write_cpu * 1e6,
+        }
+    return results
+
+
+def run(quick=False):
+    scale = 10 if quick else 1
+    return {
+        "packet_encode": bench_packet_encode.run(rounds=bench_packet_encode.ROUNDS // scale),
+        "rx_decode": bench_rx_decode.run(packets=bench_rx_decode.PACKETS // scale),
+        "sync_demux": bench_sync_read_demux.run(rounds=bench_sync_read_demux.ROUNDS // scale),
+        "sync_groups": bench_sync_groups(transactions=TRANSACTIONS // scale),
+        "end_to_end": bench_end_to_end(transactions=TRANSACTIONS // scale),
+    }
+
+
+def getMeta():
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                         cwd=os.path.dirname(os.path.abspath(__file__)),
+                                         stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+    }
+
+
+def flatten(results, prefix=""):
+    metrics = {}
+    for key, value in results.items():
+        name = "%s/%s" % (prefix, key) if prefix else str(key)
+        if isinstance(value, dict):
+            metrics.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[name] = value
+    return metrics
+
+
+def isLowerBetter(name):
+    return name.endswith(("_us", "_ms"))
+
+
+def compare(results, baseline, threshold):
+    # [(metric, before, after, change), ...] of the metrics that got worse or
+    # better by more than threshold, change > 0 meaning better
+    current = flatten(results)
+    changes = []
+    for name, before in sorted(flatten(baseline).items()):
+        after = current.get(name)
+        if after is None or before == 0:
+            continue
+        change = (after - before) / abs(before)
+        if isLowerBetter(name):
+            change = -change
+        if abs(change) > threshold:
+            changes.append((name, before, after, change))
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="STServo SDK benchmark suite")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file to write")
+    parser.add_argument("--baseline", help="JSON file of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change to report")
+    parser.add_argument("--quick", action="store_true", help="a tenth of the rounds")
+    args = parser.parse_args()
+
+    report = {"meta": getMeta(), "results": run(args.quick)}
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2, sort_keys=True)
+    print("%d metrics written to %s" % (len(flatten(report["results"])), args.output))
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            baseline = json.load(baseline)
+        # JSON object keys are strings, compare like with like
+        results = json.loads(json.dumps(report["results"]))
+        changes = compare(results, baseline["results"], args.threshold)
+        print("against %s (commit %s): %d metrics changed by more than %d%%"
+              % (args.baseline, baseline["meta"].get("commit"), len(changes), args.threshold * 100))
+        for name, before, after, change in changes:
+            print("  %-8s %-50s %12.3f -> %12.3f  (%+.0f%%)"
+                  % ("better" if change > 0 else "WORSE", name, before, after, change * 100))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+#
+# *********     Bus Scan      *********
+#
+# Lists the servos on a bus: ID, model number, baud rate and firmware.
+# With --cache the topology is saved and the next run only checks it, a
+# full scan happens again when a servo is missing or changed (or --rescan).
+#
+#   python scan_bus.py /dev/ttyUSB0
+#   python scan_bus.py /dev/ttyUSB0 --baud 1000000 --baud 115200 --cache topology.json
+#
+
+import argparse
+import time
+
+from STservo_sdk import *  # Uses STServo SDK library
+
+parser = argparse.ArgumentParser(description="Find the STServos on a bus")
+parser.add_argument("port", help="serial port, ex) /dev/ttyUSB0, COM1")
+parser.add_argument("--baud", type=int, action="append",
+                    help="baud rate to scan, repeat for several (default 1000000)")
+parser.add_argument("--timeout", type=float, default=SCAN_TIMEOUT, help="ms each ID gets to answer")
+parser.add_argument("--first", type=int, default=0, help="first ID")
+parser.add_argument("--last", type=int, default=MAX_ID + 1, help="last ID")
+parser.add_argument("--cache", help="topology file, checked instead of scanning when it still matches")
+parser.add_argument("--rescan", action="store_true", help="scan even if the cache matches")
+args = parser.parse_args()
+
+baudrates = args.baud or [DEFAULT_BAUDRATE]
+
+portHandler = PortHandler(args.port, blocking=True)
+packetHandler = sts(portHandler)
+if not portHandler.openPort() or not portHandler.setBaudRate(baudrates[0]):
+    print("Failed to open the port")
+    quit()
+
+scanner = BusScanner(packetHandler, args.timeout)
+start = time.monotonic()
+sts_ids = range(args.first, args.last + 1)
+if args.cache:
+    topology, scanned = scanner.discover(args.cache, baudrates, args.rescan, sts_ids)
+else:
+    topology, scanned = scanner.scan(baudrates, sts_ids), True
+elapsed = time.monotonic() - start
+
+for sts_id, servo in sorted(topology.items()):
+    print("[ID:%03d] model %d   %d baud   firmware %s" % (sts_id, servo["model"], servo["baudrate"], servo["firmware"]))
+for sts_id in scanner.corrupt_ids:
+    print("[ID:%03d] corrupt reply, two servos with the same ID?" % sts_id)
+print("%d servos, %s in %.2f s" % (len(topology), "scanned" if scanned else "verified from cache", elapsed))
+
+portHandler.closePort()
@@ -30,7 +30,6 @@ STS_TORQUE_ENABLE_ADDR = 40  # Torque enable address
 STS_MIN_ANGLE_LIMIT_ADDR = 9  # Min angle limit address
 STS_MAX_ANGLE_LIMIT_ADDR = 11  # Max angle limit address
 STS_LOCK_ADDR = 55        # Lock register address
-STS_STATUS_ADDR = 65      # Servo status address
 
 # Initialize PortHandler and PacketHandler
 portHandler = PortHandler(DEVICENAME)
@@ -175,19 +174,17 @@ def update_servo_position(*args):
 # Function to read servo status and update GUI
 def read_and_update_status():
     with port_lock:
-        # Read position and speed
-        sts_present_position, sts_present_speed, sts_comm_result, sts_error = packetHandler.ReadPosSpeed(STS_ID)
-        # Read servo status
-        status_value, status_result, status_error = packetHandler.read1ByteTxRx(STS_ID, STS_STATUS_ADDR)
+        # Read position, speed and status in one transaction
+        state, sts_comm_result, sts_error = packetHandler.ReadState(STS_ID)
         
-        if sts_comm_result == COMM_SUCCESS and sts_error == 0 and status_result == COMM_SUCCESS:
-            status_text = f"Current Position: {sts_present_position}, Speed: {sts_present_speed}, Status: {status_value}"
+        if sts_comm_result == COMM_SUCCESS and sts_error == 0:
+            status_text = f"Current Position: {state.position}, Speed: {state.speed}, Status: {state.status}"
             status_label.config(text=status_text)
-            if status_value != 0:
-                print(f"Servo status error detected: {status_value}")
+            if state.status != 0:
+                print(f"Servo status error detected: {state.status}")
         else:
             status_label.config(text="Error reading position or status")
-            print(f"ReadPosSpeed error: {packetHandler.getTxRxResult(sts_comm_result)} or Status error: {packetHandler.getTxRxResult(status_result)}")
+            print(f"ReadState error: {packetHandler.getTxRxResult(sts_comm_result)}")
     root.after(100, read_and_update_status)
 
 # Bind slider to update position on release
@@ -122,11 +122,14 @@ def update_servos_from_simulation():
 
 # Update status labels
 def update_status():
+    servo_ids = [i + 2 for i in range(5)]
     while True:
-        for i in range(5):
-            servo_id = i + 2
-            pos, speed, comm_result, error = packetHandler.ReadPosSpeed(servo_id)
-            if comm_result == COMM_SUCCESS and error == 0:
+        present_position_speed, _ = packetHandler.SyncReadPosSpeed(servo_ids)  # one transaction for all joints
+        for i, servo_id in enumerate(servo_ids):
+            if servo_id not in present_position_speed:
+                continue
+            pos, speed, error = present_position_speed[servo_id]
+            if error == 0:
                 relative_position = pos - initial_positions[i]
                 status_labels[i].config(text=f"Servo {servo_id}: Position: {relative_position}, Speed: {speed}")
         time.sleep(0.1)
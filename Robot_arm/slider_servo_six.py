@@ -149,16 +149,17 @@ def update_servo_position(servo_id):
 
 # Function to read and update current positions and speeds for all servos
 def update_status():
+    servo_ids = [i + 2 for i in range(5)]
     while True:
-        for i in range(5):
-            servo_id = i + 2
-            sts_present_position, sts_present_speed, sts_comm_result, sts_error = packetHandler.ReadPosSpeed(servo_id)
-            if sts_comm_result == COMM_SUCCESS and sts_error == 0:
+        present_position_speed, sts_comm_result = packetHandler.SyncReadPosSpeed(servo_ids)  # one transaction for all joints
+        for i, servo_id in enumerate(servo_ids):
+            if servo_id in present_position_speed and present_position_speed[servo_id][2] == 0:
+                sts_present_position, sts_present_speed, _ = present_position_speed[servo_id]
                 relative_position = sts_present_position - initial_positions[i]
                 status_labels[i].config(text=f"Servo {servo_id}: Position: {relative_position}, Speed: {sts_present_speed}")
             else:
                 status_labels[i].config(text=f"Servo {servo_id}: Error")
-                print(f"ReadPosSpeed error for ID {servo_id}: {packetHandler.getTxRxResult(sts_comm_result)}")
+                print(f"SyncReadPosSpeed error for ID {servo_id}: {packetHandler.getTxRxResult(sts_comm_result)}")
         time.sleep(0.1)  # Update every 100ms
 
 # Start background thread for position updates
@@ -36,7 +36,8 @@ STS_ID_MAX = 253           # Max ID
 portHandler = PortHandler(DEVICENAME)
 packetHandler = sts(portHandler)
 
-# Global lock for thread-safe access to packetHandler
+# Lock for the multi-step ID operations; single transactions are
+# serialized by the SDK bus scheduler (writes go ahead of status reads)
 packet_lock = Lock()
 
 # Open port
@@ -52,6 +53,11 @@ if not portHandler.setBaudRate(BAUDRATE):
     sys.exit(1)
 print("Succeeded to change the baudrate")
 
+# Slider goals go through a mailbox: only the newest goal per servo is kept
+# and all of them are sent as one sync write per tick
+mailbox = CommandMailbox(packetHandler)
+mailbox.start()
+
 # GUI setup
 root = tk.Tk()
 root.title("Multi-Servo Control")
@@ -150,33 +156,23 @@ def create_slider_frame(slider_num):
 
     # Function to write position to servo
     def update_servo_position(*args):
-        
-        with packet_lock:
-            pos = goal_position.get()
-            sts_comm_result, sts_error = packetHandler.WritePosEx(servo_id.get(), pos, STS_MOVING_SPEED, STS_MOVING_ACC)
-            if sts_comm_result != COMM_SUCCESS:
-                print(f"WritePosEx error: {packetHandler.getTxRxResult(sts_comm_result)}")
-            elif sts_error != 0:
-                print(f"Servo error: {packetHandler.getRxPacketError(sts_error)}")
+        pos = goal_position.get()
+        mailbox.postPosEx(servo_id.get(), pos, STS_MOVING_SPEED, STS_MOVING_ACC)
+        if mailbox.last_result not in (COMM_SUCCESS, COMM_NOT_AVAILABLE):
+            print(f"Sync write error: {packetHandler.getTxRxResult(mailbox.last_result)}")
 
     # Function to read and update current position continuously
     def update_status():
         while True:
-            if packet_lock.acquire(blocking=False):  # Try to acquire lock without blocking
-                try:
-                    sts_present_position, sts_present_speed, sts_comm_result, sts_error = packetHandler.ReadPosSpeed(servo_id.get())
-                    if sts_comm_result == COMM_SUCCESS and sts_error == 0:
-                        status_label.config(text=f"Current Position: {sts_present_position}, Speed: {sts_present_speed}")
-                    else:
-                        status_label.config(text="Error reading position")
-                        print(f"ReadPosSpeed error for ID {servo_id.get()}: {packetHandler.getTxRxResult(sts_comm_result)}")
-                except Exception as e:
-                    print(f"Exception in update_status for slider {slider_num}: {e}")
-                finally:
-                    packet_lock.release()  # Always release the lock if acquired
-            # Optional: Uncomment to debug skipped updates
-            # else:
-            #     print(f"Slider {slider_num}: Skipped status update due to lock")
+            try:
+                sts_present_position, sts_present_speed, sts_comm_result, sts_error = packetHandler.ReadPosSpeed(servo_id.get())
+                if sts_comm_result == COMM_SUCCESS and sts_error == 0:
+                    status_label.config(text=f"Current Position: {sts_present_position}, Speed: {sts_present_speed}")
+                elif sts_comm_result != COMM_PORT_BUSY:  # busy: the bus stayed with slider writes
+                    status_label.config(text="Error reading position")
+                    print(f"ReadPosSpeed error for ID {servo_id.get()}: {packetHandler.getTxRxResult(sts_comm_result)}")
+            except Exception as e:
+                print(f"Exception in update_status for slider {slider_num}: {e}")
             time.sleep(0.2)  # Increase to 0.2s for less frequent updates
 
     # Bind slider movement to servo update
@@ -195,6 +191,7 @@ for i in range(1, 4):
 
 # Cleanup on window close
 def on_closing():
+    mailbox.stop()
     portHandler.closePort()
     root.destroy()
 